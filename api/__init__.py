@@ -0,0 +1,19 @@
+"""
+FastAPI service over the ETL's database (`uvicorn api.main:app`, or `api.main:create_app()`).
+
+Importing the package loads `.env` once, before any settings are read, and makes the ETL's
+and the price model's modules importable: etl/ and ml/ are directories of scripts whose
+modules import one another by their top-level names (`from models import ...`), so they
+are added to the path here, once, rather than wherever the API needs them.
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('etl', 'ml'):
+    if os.path.join(ROOT, directory) not in sys.path:
+        sys.path.append(os.path.join(ROOT, directory))
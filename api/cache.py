@@ -0,0 +1,146 @@
+"""
+Response cache for read endpoints whose data only changes when the ETL commits a load.
+
+Entries are keyed on (data version, path, query params). The ETL bumps the version in the
+`data_version` table on every commit, so a new load makes all older entries unreachable;
+the in-process backend also drops them as soon as the change is seen. Each response carries
+an ETag derived from the same key, and a matching If-None-Match gets an empty 304.
+
+The in-process backend's size and TTL and the version check interval come from
+api/settings.py (RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, DATA_VERSION_TTL): the lifespan
+configures the cache, or its first use does when the app is served without one.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from models import DataVersion
+from api.metrics import render_json
+from api.settings import get_settings
+
+
+class CacheBackend:
+    """Storage interface; implement it to share the cache between workers (e.g. Redis)."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class TTLCache(CacheBackend):
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize=512, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend = None, version_ttl=None):
+        """`backend` defaults to a TTLCache sized from the settings; `version_ttl` to DATA_VERSION_TTL."""
+        self._backend = backend
+        self.version_ttl = version_ttl
+        self._version = None
+        self._version_checked_at = 0.0
+
+    def configure(self, settings):
+        """Fill in what was not given to the constructor from the API settings."""
+        if self._backend is None:
+            self._backend = TTLCache(settings.response_cache_size, settings.response_cache_ttl)
+        if self.version_ttl is None:
+            self.version_ttl = settings.data_version_ttl
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self.configure(get_settings())
+        return self._backend
+
+    async def data_version(self, session):
+        """Current data version, re-read from the database at most every `version_ttl` seconds."""
+        if self.version_ttl is None:
+            self.configure(get_settings())
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked_at >= self.version_ttl:
+            version = (await session.execute(
+                select(DataVersion.version).where(DataVersion.id == 1)
+            )).scalar() or 0
+            if self._version is not None and version != self._version:
+                self.backend.clear()
+            self._version = version
+            self._version_checked_at = now
+        return self._version
+
+    @staticmethod
+    def etag_matches(request, etag):
+        header = request.headers.get('if-none-match')
+        if not header:
+            return False
+        candidates = {tag.strip() for tag in header.split(',')}
+        return '*' in candidates or etag in candidates or etag.removeprefix('W/') in candidates
+
+    async def respond(self, request, session, compute):
+        """Serve from cache (or 304) when possible, otherwise await compute() and store its JSON."""
+        version = await self.data_version(session)
+        query = '&'.join(f'{k}={v}' for k, v in sorted(request.query_params.multi_items()))
+        key = f'{version}:{request.url.path}?{query}'
+        etag = 'W/"%s"' % hashlib.sha1(key.encode()).hexdigest()[:20]
+        headers = {'ETag': etag, 'X-Data-Version': str(version), 'Cache-Control': 'no-cache'}
+        if self.etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        body = self.backend.get(key)
+        if body is None:
+            body = render_json(jsonable_encoder(await compute()))
+            self.backend.set(key, body)
+        return Response(content=body, media_type='application/json', headers=headers)
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(endpoint):
+    """Cache an endpoint's JSON by data version and query params.
+
+    The endpoint must take `request: Request` and `session: AsyncSession` parameters.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        return await response_cache.respond(
+            kwargs['request'], kwargs['session'], lambda: endpoint(*args, **kwargs)
+        )
+    return wrapper
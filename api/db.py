@@ -0,0 +1,97 @@
+"""
+Async database engine and session dependency for the API.
+
+The engine and its pool are created on first use (get_engine) from api/settings.py, so
+importing the API neither reads the database configuration nor loads a driver. Hooks
+registered with on_engine_created (the metrics instrumentation) run on the new engine.
+"""
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from api.settings import get_settings
+
+# Sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+_engine = None
+_sessions = None
+_engine_hooks = []
+
+
+def async_database_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def pool_options(url, settings):
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}  # in-memory SQLite must share one connection (StaticPool)
+        # aiosqlite defaults to NullPool for files; use a real pool so the settings apply
+        options = {'poolclass': AsyncAdaptedQueuePool}
+    else:
+        options = {}
+    options.update(
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+    )
+    return options
+
+
+def on_engine_created(hook):
+    """Run hook(engine) on the API engine: now if it exists, otherwise when it is created."""
+    if hook not in _engine_hooks:
+        _engine_hooks.append(hook)
+        if _engine is not None:
+            hook(_engine)
+
+
+def get_engine():
+    global _engine, _sessions
+    if _engine is None:
+        settings = get_settings()
+        url = async_database_url(settings.database_url)
+        engine = create_async_engine(url, echo=settings.sql_echo, **pool_options(url, settings))
+        for hook in _engine_hooks:
+            hook(engine)
+        _sessions = async_sessionmaker(engine, expire_on_commit=False)
+        _engine = engine
+    return _engine
+
+
+def open_session() -> AsyncSession:
+    """A new AsyncSession on the API engine (use as `async with open_session() as session`)."""
+    get_engine()
+    return _sessions()
+
+
+async def get_session():
+    """FastAPI dependency: one pooled AsyncSession per request."""
+    async with open_session() as session:
+        yield session
+
+
+async def warm_pool(connections):
+    """Open up to `connections` pooled connections concurrently, so first requests skip connecting."""
+    engine = get_engine()
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+    size = engine.pool.size() if hasattr(engine.pool, 'size') else 1  # StaticPool: one connection
+    await asyncio.gather(*(ping() for _ in range(max(min(connections, size), 1))))
+
+
+async def dispose_engine():
+    """Close the pooled connections (they belong to the current event loop); the engine stays usable."""
+    if _engine is not None:
+        await _engine.dispose()
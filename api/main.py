@@ -1,284 +1,769 @@
-import os
-print("DEBUG: Current working directory =", os.getcwd())
-print("DEBUG: .env exists =", os.path.isfile('.env'))
+"""
+Price Intelligence API: routes, and the application factory (create_app).
 
-from dotenv import load_dotenv
-load_dotenv()
-
-from fastapi import FastAPI, Query, HTTPException
+`uvicorn api.main:app` serves the module-level app; `uvicorn --factory api.main:create_app`
+builds a fresh one. Settings are read once (api/settings.py) and the database engine is
+created on first use (api/db.py). The lifespan warms the pool and the data version before
+serving, then loads the price model and builds the /predict features and /search index in
+the background, so startup does not wait for scikit-learn or a catalog scan.
+"""
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Query, HTTPException, Depends, Request, Response
 from typing import Optional
-from datetime import datetime
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'etl'))
-from models import Product, PriceHistory, SessionLocal
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-
-app = FastAPI(title="Price Intelligence API")
-
-@app.get('/')
-def root():
+from datetime import date, datetime, timedelta
+from models import ALERT_KINDS, Alert, Product, PriceHistory, PriceRollup, LatestPrice
+from api.settings import get_settings
+from api.db import dispose_engine, get_session, on_engine_created, open_session, warm_pool
+from api.cache import cached_response, response_cache
+from api.pagination import decode_cursor, set_next_cursor, stream_export
+from api.series import AGGREGATES, aggregate, downsample_columns, lttb_indices, serialize_buckets
+from api.predict import MAX_PREDICT_ROWS, predictor
+from api.search import search_index
+from api.metrics import InstrumentedJSONResponse, MetricsMiddleware, instrument_engine, render_json, render_metrics
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Float, and_, func, or_, select, type_coerce
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List
+import numpy as np
+
+router = APIRouter(default_response_class=InstrumentedJSONResponse)
+
+
+async def warm_caches():
+    """Load the price model, then build the /predict features and the /search index."""
+    try:
+        await asyncio.to_thread(predictor.load)
+        async with open_session() as session:
+            version = await response_cache.data_version(session)
+            if predictor.ready:
+                await predictor.refresh(session, version)
+            await search_index.refresh(session, version)
+    except Exception as e:  # requests build what they need themselves
+        print("Cache warm-up failed:", e)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    settings = get_settings()
+    response_cache.configure(settings)
+    warming = None
+    if settings.warmup:
+        await warm_pool(settings.warmup_connections)
+        async with open_session() as session:
+            await response_cache.data_version(session)
+        warming = asyncio.create_task(warm_caches())
+    yield
+    if warming is not None:
+        warming.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await warming
+    # Close pooled connections (aiosqlite/aiomysql) on shutdown
+    await dispose_engine()
+
+
+def create_app():
+    app = FastAPI(title="Price Intelligence API", lifespan=lifespan, default_response_class=InstrumentedJSONResponse)
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router)
+    on_engine_created(instrument_engine)
+    return app
+
+@router.get('/')
+async def root():
     """Health check for API. Business value: Allows monitoring tools and users to verify the API is running."""
     return {"message": "API running"}
 
-@app.get('/products')
-def get_products(
+@router.get('/metrics')
+async def metrics():
+    """Per-route latency, DB query count/time, rows and serialization time in Prometheus text format.
+    Business value: Shows where request time goes, so performance work targets the real hot paths.
+    """
+    return Response(content=render_metrics(), media_type='text/plain; version=0.0.4')
+
+@router.get('/data-version')
+async def get_data_version(session: AsyncSession = Depends(get_session)):
+    """Current ETL data version; it changes whenever a new load is committed.
+    Business value: Lets dashboards and clients skip refetching when nothing has changed.
+    """
+    return {"data_version": await response_cache.data_version(session)}
+
+PRODUCT_COLUMNS = ['product_id', 'name', 'brand', 'category', 'link', 'created_at', 'updated_at']
+PRICE_COLUMNS = ['price_id', 'product_id', 'price', 'discount_pct', 'in_stock', 'rating', 'reviews', 'scraped_at',
+                 'valid_to']
+
+
+def serialize_product(p):
+    return {
+        'product_id': p.product_id,
+        'name': p.name,
+        'brand': p.brand,
+        'category': p.category,
+        'link': p.link,
+        'created_at': str(p.created_at),
+        'updated_at': str(p.updated_at)
+    }
+
+
+def serialize_price(ph, valid_to=None):
+    return {
+        'price_id': ph.price_id,
+        'product_id': ph.product_id,
+        'price': float(ph.price),
+        'discount_pct': float(ph.discount_pct) if ph.discount_pct is not None else None,
+        'in_stock': ph.in_stock,
+        'rating': ph.rating,
+        'reviews': ph.reviews,
+        'scraped_at': ph.scraped_at.isoformat() if ph.scraped_at else None,
+        'valid_to': valid_to.isoformat() if valid_to else None
+    }
+
+
+def serialize_series(valid_to):
+    """Serializer for one product's history, newest first: each row is valid until the next newer one."""
+    def serialize(ph):
+        nonlocal valid_to
+        row = serialize_price(ph, valid_to)
+        valid_to = ph.scraped_at
+        return row
+    return serialize
+
+
+async def series_ends(session, pids, end_date):
+    """valid_to of each product's newest row in range: the next change after end_date, else the
+    last time the product's current values were observed."""
+    ends = {}
+    if end_date:
+        ends.update((await session.execute(
+            select(PriceHistory.product_id, func.min(PriceHistory.scraped_at))
+            .where(PriceHistory.product_id.in_(pids), PriceHistory.scraped_at > end_date)
+            .group_by(PriceHistory.product_id)
+        )).all())
+    missing = [pid for pid in pids if pid not in ends]
+    if missing:
+        ends.update((await session.execute(
+            select(LatestPrice.product_id, func.coalesce(LatestPrice.last_seen_at, LatestPrice.scraped_at))
+            .where(LatestPrice.product_id.in_(missing))
+        )).all())
+    return ends
+
+
+def last_observed(lp):
+    """When the ETL last observed a latest_price snapshot (its scraped_at is when the values were first seen)."""
+    seen = lp.last_seen_at or lp.scraped_at
+    return seen.isoformat() if seen else None
+
+
+def downsample_history(rows, valid_to, max_points):
+    """LTTB over one product's raw rows (newest first); only the rows kept are serialized."""
+    times = np.array([ph.scraped_at for ph in reversed(rows)], dtype='datetime64[us]')
+    prices = np.array([ph.price for ph in reversed(rows)], dtype=np.float64)
+    keep = sorted(len(rows) - 1 - lttb_indices(times.astype(np.int64), prices, max_points))
+    return [serialize_price(rows[i], rows[i - 1].scraped_at if i else valid_to) for i in keep]
+
+
+async def bucketed_series(session, pids, start_date, end_date, bucket, agg, max_points):
+    """{product_id: bucket rows} aggregated with numpy over (product_id, scraped_at, price) columns."""
+    query = (
+        # type_coerce skips the per-row Decimal conversion; numpy wants floats anyway
+        select(PriceHistory.product_id, PriceHistory.scraped_at, type_coerce(PriceHistory.price, Float))
+        .where(PriceHistory.product_id.in_(pids))
+        .order_by(PriceHistory.product_id, PriceHistory.scraped_at, PriceHistory.price_id)
+    )
+    if start_date:
+        query = query.where(PriceHistory.scraped_at >= start_date)
+    if end_date:
+        query = query.where(PriceHistory.scraped_at <= end_date)
+    rows = (await session.execute(query)).all()
+    if not rows:
+        return {}
+    product_ids, times, prices = zip(*rows)
+    grouped = aggregate(np.array(product_ids), np.array(times, dtype='datetime64[us]'),
+                        np.array(prices, dtype=np.float64), bucket, agg)
+    value = 'close' if agg == 'ohlc' else 'price'
+    return {
+        pid: serialize_buckets(downsample_columns(columns, max_points, value) if max_points else columns)
+        for pid, columns in grouped.items()
+    }
+
+
+async def raw_series(session, pids, start_date, end_date, limit, max_points):
+    """{product_id: raw rows, newest first}: LTTB-downsampled with max_points, else the newest `limit`."""
+    # Plain rows (attribute access like the ORM objects serialize_price expects), no identity map
+    newest_first = (PriceHistory.scraped_at.desc(), PriceHistory.price_id.desc())
+    filters = [PriceHistory.product_id.in_(pids)]
+    if start_date:
+        filters.append(PriceHistory.scraped_at >= start_date)
+    if end_date:
+        filters.append(PriceHistory.scraped_at <= end_date)
+    if max_points:
+        query = select(PriceHistory.__table__).where(*filters).order_by(PriceHistory.product_id, *newest_first)
+    else:
+        # only each product's newest `limit` rows leave the database
+        ranked = select(
+            PriceHistory.__table__,
+            func.row_number().over(partition_by=PriceHistory.product_id, order_by=newest_first).label('rn'),
+        ).where(*filters).subquery()
+        query = (
+            select(*(ranked.c[column.name] for column in PriceHistory.__table__.columns))
+            .where(ranked.c.rn <= limit)
+            .order_by(ranked.c.product_id, ranked.c.scraped_at.desc(), ranked.c.price_id.desc())
+        )
+    by_product = {}
+    for ph in (await session.execute(query)).all():
+        by_product.setdefault(ph.product_id, []).append(ph)
+    ends = await series_ends(session, list(by_product), end_date)
+    series = {}
+    for pid, rows in by_product.items():
+        if max_points:
+            series[pid] = downsample_history(rows, ends.get(pid), max_points)
+        else:
+            serialize = serialize_series(ends.get(pid))
+            series[pid] = [serialize(ph) for ph in rows]
+    return series
+
+
+@router.get('/products')
+async def get_products(
+    request: Request,
+    response: Response,
     category: Optional[str] = Query(None, description='Filter by category'),
     brand: Optional[str] = Query(None, description='Filter by brand'),
     min_price: Optional[float] = Query(None, description='Minimum price'),
     max_price: Optional[float] = Query(None, description='Maximum price'),
-    limit: int = Query(100, ge=1, le=1000, description='Max number of results')
+    limit: int = Query(100, ge=1, le=1000, description='Max number of results per page'),
+    cursor: Optional[str] = Query(None, description='Opaque cursor from the X-Next-Cursor header of the previous page'),
+    format: str = Query('json', pattern='^(json|ndjson|csv)$',
+                        description='json: one page; ndjson/csv: stream every matching product'),
+    session: AsyncSession = Depends(get_session)
 ):
-    """Fetch products with optional filters from MySQL.
+    """Fetch products with optional filters from MySQL, ordered by product_id.
+    Pages are keyset-paginated: pass the X-Next-Cursor value back as `cursor`.
     Business value: Enables product search, catalog exploration, and inventory analysis.
     """
-    session: Session = SessionLocal()
     try:
-        query = session.query(Product)
+        query = select(Product)
         filters = []
         if category:
             filters.append(Product.category == category)
         if brand:
             filters.append(Product.brand == brand)
         if min_price is not None or max_price is not None:
-            query = query.join(PriceHistory)
+            # EXISTS rather than a join so each product appears once per page
+            price_filters = [PriceHistory.product_id == Product.product_id]
             if min_price is not None:
-                filters.append(PriceHistory.price >= min_price)
+                price_filters.append(PriceHistory.price >= min_price)
             if max_price is not None:
-                filters.append(PriceHistory.price <= max_price)
+                price_filters.append(PriceHistory.price <= max_price)
+            filters.append(select(PriceHistory.price_id).where(*price_filters).exists())
+        if cursor:
+            filters.append(Product.product_id > decode_cursor(cursor, {'id': int})['id'])
         if filters:
-            query = query.filter(and_(*filters))
-        products = query.limit(limit).all()
-        # Serialize results
-        def serialize_product(p):
-            return {
-                'product_id': p.product_id,
-                'name': p.name,
-                'brand': p.brand,
-                'category': p.category,
-                'link': p.link,
-                'created_at': str(p.created_at),
-                'updated_at': str(p.updated_at)
-            }
+            query = query.where(and_(*filters))
+        query = query.order_by(Product.product_id)
+        if format != 'json':
+            return stream_export(query, serialize_product, PRODUCT_COLUMNS, format, 'products')
+        products = (await session.execute(query.limit(limit))).scalars().all()
+        if len(products) == limit:
+            set_next_cursor(request, response, {'id': products[-1].product_id})
         return [serialize_product(p) for p in products]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
 
-from datetime import datetime
-from fastapi import Query
+MAX_BATCH_PRODUCTS = 100
 
-@app.get('/price-history')
-def get_price_history(
+
+@router.get('/search')
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description='Words or parts of words from the product name, brand or category'),
+    category: Optional[str] = Query(None, description='Filter by category'),
+    brand: Optional[str] = Query(None, description='Filter by brand'),
+    limit: int = Query(20, ge=1, le=100, description='Max number of results'),
+    session: AsyncSession = Depends(get_session)
+):
+    """Ranked product search over an in-memory word index of the catalog (api/search.py).
+    Partial words match; misspelled words still find products sharing most of their letters.
+    Each result carries the latest price snapshot and a relevance `score` (higher is better).
+    Business value: Lets analysts find products without knowing their exact catalog names.
+    """
+    try:
+        await search_index.refresh(session, await response_cache.data_version(session))
+        ranked = search_index.search(q, limit, category, brand)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ranked:
+        return []
+    rows = (await session.execute(
+        select(Product, LatestPrice)
+        .outerjoin(LatestPrice, Product.product_id == LatestPrice.product_id)
+        .where(Product.product_id.in_([product_id for product_id, _ in ranked]))
+    )).all()
+    found = {p.product_id: (p, lp) for p, lp in rows}
+    results = []
+    for product_id, score in ranked:
+        if product_id not in found:
+            continue
+        p, lp = found[product_id]
+        results.append({
+            **serialize_product(p),
+            'price': float(lp.price) if lp is not None and lp.price is not None else None,
+            'discount_pct': float(lp.discount_pct) if lp is not None and lp.discount_pct is not None else None,
+            'rating': lp.rating if lp is not None else None,
+            'in_stock': lp.in_stock if lp is not None else None,
+            'score': round(score, 4),
+        })
+    return results
+
+
+@router.get('/price-history')
+async def get_price_history(
+    request: Request,
+    response: Response,
     product_id: Optional[int] = Query(None, description='Product ID to fetch price history for'),
     product_name: Optional[str] = Query(None, description='Product name to fetch price history for (used only if product_id is not provided)'),
+    product_ids: Optional[str] = Query(None, pattern=r'^\d+(,\d+)*$',
+                                       description='Comma-separated product IDs: one series per product in one response'),
     start_date: Optional[datetime] = Query(None, description='Start date (ISO 8601)'),
     end_date: Optional[datetime] = Query(None, description='End date (ISO 8601)'),
-    limit: int = Query(1000, ge=1, le=5000, description='Max number of records to return')
+    limit: int = Query(1000, ge=1, le=5000, description='Max number of records per page (per product with product_ids)'),
+    cursor: Optional[str] = Query(None, description='Opaque cursor from the X-Next-Cursor header of the previous page'),
+    format: str = Query('json', pattern='^(json|ndjson|csv)$',
+                        description='json: one page; ndjson/csv: stream the whole history'),
+    bucket: Optional[str] = Query(None, pattern='^(hour|day|week)$',
+                                  description='Aggregate the whole date range into hour/day/week buckets'),
+    agg: str = Query('last', pattern=f"^({'|'.join(AGGREGATES)})$",
+                     description='Bucket aggregate: last, min, max, avg or ohlc (open/high/low/close)'),
+    max_points: Optional[int] = Query(None, ge=2, le=5000,
+                                      description='Return the whole date range downsampled (LTTB) to at most this many points'),
+    session: AsyncSession = Depends(get_session)
 ):
-    """Fetch price history for a product by product_id (preferred) or product_name (optional).
+    """Fetch price history for a product by product_id (preferred) or product_name (optional), newest first.
+    Pages are keyset-paginated on (scraped_at, price_id): pass the X-Next-Cursor value back as `cursor`.
+    History is stored run-length style (the ETL's --changes-only mode skips unchanged observations), so
+    each row carries `valid_to`: the values held from `scraped_at` until then. For the newest row it is
+    the last time the values were observed.
+    For charts (json only, no paging): `bucket` + `agg` return one aggregated row per time bucket, and
+    `max_points` keeps the points that best preserve the series' shape (Largest-Triangle-Three-Buckets).
+    `product_ids` returns [{product_id, series}] for many products in one round trip.
     Business value: Supports price trend analysis and pricing strategy decisions.
     """
-    session = SessionLocal()
-    try:
+    batch = product_ids is not None
+    if batch:
+        pids = list(dict.fromkeys(int(p) for p in product_ids.split(',')))
+        if len(pids) > MAX_BATCH_PRODUCTS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PRODUCTS} product_ids per request.")
+    else:
         pid = product_id
         if pid is None:
             if not product_name:
                 raise HTTPException(status_code=400, detail="Either product_id or product_name must be provided.")
-            product = session.query(Product).filter(Product.name == product_name).first()
-            if not product:
+            pid = (await session.execute(
+                select(Product.product_id).where(Product.name == product_name).limit(1)
+            )).scalar()
+            if pid is None:
                 raise HTTPException(status_code=404, detail=f"Product with name '{product_name}' not found.")
-            pid = product.product_id
-        query = session.query(PriceHistory).filter(PriceHistory.product_id == pid)
-        if start_date:
-            query = query.filter(PriceHistory.scraped_at >= start_date)
-        if end_date:
-            query = query.filter(PriceHistory.scraped_at <= end_date)
-        query = query.order_by(PriceHistory.scraped_at.desc()).limit(limit)
-        results = query.all()
-        return [
-            {
-                'price_id': ph.price_id,
-                'product_id': ph.product_id,
-                'price': float(ph.price),
-                'discount_pct': float(ph.discount_pct) if ph.discount_pct is not None else None,
-                'in_stock': ph.in_stock,
-                'rating': ph.rating,
-                'reviews': ph.reviews,
-                'scraped_at': ph.scraped_at.isoformat() if ph.scraped_at else None
-            }
-            for ph in results
-        ]
-    finally:
-        session.close()
-
-
-@app.get('/categories')
-def get_categories():
-    """List all categories with product count and price stats.
+        pids = [pid]
+    if batch or bucket or max_points:
+        if format != 'json' or cursor:
+            raise HTTPException(status_code=400,
+                                detail="format and cursor apply only to a single product's raw history.")
+        if bucket:
+            series = await bucketed_series(session, pids, start_date, end_date, bucket, agg, max_points)
+        else:
+            series = await raw_series(session, pids, start_date, end_date, limit, max_points)
+        if batch:
+            return [{'product_id': pid, 'series': series.get(pid, [])} for pid in pids]
+        return series.get(pid, [])
+
+    query = select(PriceHistory).where(PriceHistory.product_id == pid)
+    if start_date:
+        query = query.where(PriceHistory.scraped_at >= start_date)
+    if end_date:
+        query = query.where(PriceHistory.scraped_at <= end_date)
+    if cursor:
+        key = decode_cursor(cursor, {'t': str, 'id': int})
+        try:
+            last_scraped_at = datetime.fromisoformat(key['t'])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+        valid_to = last_scraped_at  # the previous page's last row is the next newer observation
+        query = query.where(or_(
+            PriceHistory.scraped_at < last_scraped_at,
+            and_(PriceHistory.scraped_at == last_scraped_at, PriceHistory.price_id < key['id'])
+        ))
+    else:
+        valid_to = (await series_ends(session, [pid], end_date)).get(pid)
+    query = query.order_by(PriceHistory.scraped_at.desc(), PriceHistory.price_id.desc())
+    if format != 'json':
+        return stream_export(query, serialize_series(valid_to), PRICE_COLUMNS, format, f'price_history_{pid}')
+    results = (await session.execute(query.limit(limit))).scalars().all()
+    if len(results) == limit and results[-1].scraped_at is not None:
+        last = results[-1]
+        set_next_cursor(request, response, {'t': last.scraped_at.isoformat(), 'id': last.price_id})
+    serialize = serialize_series(valid_to)
+    return [serialize(ph) for ph in results]
+
+
+def rollup_stats():
+    """Aggregates of price_rollup rows: products, observations and price/stock statistics."""
+    return [
+        func.sum(PriceRollup.products_added).label('product_count'),
+        func.sum(PriceRollup.observations).label('observations'),
+        func.sum(PriceRollup.price_sum).label('price_sum'),
+        func.min(PriceRollup.price_min).label('min_price'),
+        func.max(PriceRollup.price_max).label('max_price'),
+        func.sum(PriceRollup.discount_sum).label('discount_sum'),
+        func.sum(PriceRollup.in_stock).label('in_stock'),
+    ]
+
+
+ROLLUP_SUMS = ('product_count', 'observations', 'price_sum', 'discount_sum', 'in_stock')
+
+
+def combine_rollup(rows):
+    """One rollup_stats() row from several (sums added, min of the mins, max of the maxes)."""
+    return {
+        **{column: sum(row[column] or 0 for row in rows) for column in ROLLUP_SUMS},
+        'min_price': min((row['min_price'] for row in rows if row['min_price'] is not None), default=None),
+        'max_price': max((row['max_price'] for row in rows if row['max_price'] is not None), default=None),
+    }
+
+
+def serialize_rollup(stats, products_key='product_count'):
+    observations = int(stats['observations'] or 0)
+    return {
+        products_key: int(stats['product_count'] or 0),
+        'observations': observations,
+        'avg_price': round(float(stats['price_sum']) / observations, 2) if observations else None,
+        'min_price': float(stats['min_price']) if stats['min_price'] is not None else None,
+        'max_price': float(stats['max_price']) if stats['max_price'] is not None else None,
+        'avg_discount_pct': round(float(stats['discount_sum']) / observations, 2) if observations else None,
+        'in_stock_ratio': round(int(stats['in_stock']) / observations, 4) if observations else None,
+    }
+
+
+@router.get('/categories')
+@cached_response
+async def get_categories(request: Request, session: AsyncSession = Depends(get_session)):
+    """List all categories with product count and price stats over their whole price history.
+    Served from the price_rollup cube the ETL maintains, so the cost does not grow with history depth.
     Business value: Helps identify popular categories and pricing opportunities.
     """
-    session = SessionLocal()
-    try:
-        from sqlalchemy import func
-        # Join products and price_history to get stats
-        results = (
-            session.query(
-                Product.category,
-                func.count(Product.product_id).label('product_count'),
-                func.avg(PriceHistory.price).label('avg_price'),
-                func.min(PriceHistory.price).label('min_price'),
-                func.max(PriceHistory.price).label('max_price')
-            )
-            .join(PriceHistory, PriceHistory.product_id == Product.product_id)
-            .group_by(Product.category)
-            .order_by(Product.category)
-            .all()
-        )
-        categories = [
-            {
-                'category': row.category,
-                'product_count': row.product_count,
-                'avg_price': float(row.avg_price) if row.avg_price is not None else None,
-                'min_price': float(row.min_price) if row.min_price is not None else None,
-                'max_price': float(row.max_price) if row.max_price is not None else None
-            }
-            for row in results
-        ]
-        return categories
-    finally:
-        session.close()
-
-@app.get('/top-rated')
-def get_top_rated(limit: int = 20, category: Optional[str] = None):
+    results = (await session.execute(
+        select(PriceRollup.category, *rollup_stats())
+        .group_by(PriceRollup.category)
+        .order_by(PriceRollup.category)
+    )).all()
+    return [{'category': row.category, **serialize_rollup(row._mapping)} for row in results]
+
+
+@router.get('/brands')
+@cached_response
+async def get_brands(
+    request: Request,
+    category: Optional[str] = Query(None, description='Only brands within this category'),
+    limit: int = Query(100, ge=1, le=1000, description='Max number of brands, most products first'),
+    session: AsyncSession = Depends(get_session)
+):
+    """List brands with product count and price stats over their whole price history (price_rollup cube).
+    Business value: Shows which brands dominate a category and how they are priced.
+    """
+    stats = rollup_stats()
+    query = select(PriceRollup.brand, *stats).group_by(PriceRollup.brand)
+    if category:
+        query = query.where(PriceRollup.category == category)
+    results = (await session.execute(
+        query.order_by(stats[0].desc(), PriceRollup.brand).limit(limit)
+    )).all()
+    return [{'brand': row.brand, **serialize_rollup(row._mapping)} for row in results]
+
+
+def period_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+@router.get('/analytics/trends')
+@cached_response
+async def analytics_trends(
+    request: Request,
+    category: Optional[str] = Query(None),
+    brand: Optional[str] = Query(None),
+    bucket: str = Query('day', pattern='^(day|week|month)$', description='One row per day, week or month'),
+    start_date: Optional[date] = Query(None, description='First day (ISO 8601)'),
+    end_date: Optional[date] = Query(None, description='Last day (ISO 8601)'),
+    session: AsyncSession = Depends(get_session)
+):
+    """Price, discount, stock and new-product trends per day/week/month, oldest first (price_rollup cube).
+    Business value: Tracks how a category's or brand's pricing and availability move over time.
+    """
+    query = select(PriceRollup.day, *rollup_stats()).group_by(PriceRollup.day).order_by(PriceRollup.day)
+    if category:
+        query = query.where(PriceRollup.category == category)
+    if brand:
+        query = query.where(PriceRollup.brand == brand)
+    if start_date:
+        query = query.where(PriceRollup.day >= start_date)
+    if end_date:
+        query = query.where(PriceRollup.day <= end_date)
+    periods = {}
+    for row in (await session.execute(query)).all():
+        periods.setdefault(period_start(row.day, bucket), []).append(row._mapping)
+    # per period, products_added counts the products first observed in it
+    return [{'period': start.isoformat(), **serialize_rollup(combine_rollup(rows), 'products_added')}
+            for start, rows in periods.items()]
+
+
+@router.get('/top-rated')
+@cached_response
+async def get_top_rated(request: Request, limit: int = 20, category: Optional[str] = None,
+                        session: AsyncSession = Depends(get_session)):
     """List products with the highest ratings (latest record per product).
     Business value: Identify trending and high-quality products for promotion or analysis.
     """
-    session = SessionLocal()
-    try:
-        from sqlalchemy import func
-        subq = (
-            session.query(
-                PriceHistory.product_id,
-                func.max(PriceHistory.scraped_at).label('latest_scraped_at')
-            )
-            .group_by(PriceHistory.product_id)
-            .subquery()
-        )
-        query = (
-            session.query(Product, PriceHistory)
-            .join(PriceHistory, Product.product_id == PriceHistory.product_id)
-            .join(subq, (PriceHistory.product_id == subq.c.product_id) & (PriceHistory.scraped_at == subq.c.latest_scraped_at))
-        )
-        if category:
-            query = query.filter(Product.category == category)
-        query = query.order_by(PriceHistory.rating.desc(), PriceHistory.reviews.desc()).limit(limit)
-        results = query.all()
-        top_rated = [
-            {
-                'product_id': p.product_id,
-                'name': p.name,
-                'category': p.category,
-                'rating': ph.rating,
-                'reviews': ph.reviews,
-                'price': float(ph.price) if ph.price is not None else None,
-                'scraped_at': ph.scraped_at.isoformat() if ph.scraped_at else None
-            }
-            for p, ph in results
-        ]
-        return top_rated
-    finally:
-        session.close()
-
-
-@app.get('/most-reviewed')
-def get_most_reviewed(limit: int = 20, category: Optional[str] = None):
+    query = (
+        select(Product, LatestPrice)
+        .join(LatestPrice, Product.product_id == LatestPrice.product_id)
+    )
+    if category:
+        query = query.where(Product.category == category)
+    query = query.order_by(LatestPrice.rating.desc(), LatestPrice.reviews.desc()).limit(limit)
+    results = (await session.execute(query)).all()
+    top_rated = [
+        {
+            'product_id': p.product_id,
+            'name': p.name,
+            'category': p.category,
+            'rating': lp.rating,
+            'reviews': lp.reviews,
+            'price': float(lp.price) if lp.price is not None else None,
+            'scraped_at': last_observed(lp),
+        }
+        for p, lp in results
+    ]
+    return top_rated
+
+
+@router.get('/most-reviewed')
+@cached_response
+async def get_most_reviewed(request: Request, limit: int = 20, category: Optional[str] = None,
+                            session: AsyncSession = Depends(get_session)):
     """List products with the most reviews (latest record per product, deduplicated).
     Business value: Surface popular and widely-discussed products for marketing or insights.
     """
-    session = SessionLocal()
-    try:
-        from sqlalchemy import func
-        subq = (
-            session.query(
-                PriceHistory.product_id,
-                func.max(PriceHistory.scraped_at).label('latest_scraped_at')
-            )
-            .group_by(PriceHistory.product_id)
-            .subquery()
-        )
-        query = (
-            session.query(Product, PriceHistory)
-            .join(PriceHistory, Product.product_id == PriceHistory.product_id)
-            .join(subq, (PriceHistory.product_id == subq.c.product_id) & (PriceHistory.scraped_at == subq.c.latest_scraped_at))
-        )
-        if category:
-            query = query.filter(Product.category == category)
-        query = query.order_by(PriceHistory.reviews.desc(), PriceHistory.rating.desc()).limit(limit * 2)
-        results = query.all()
-        unique = {}
-        for p, ph in results:
-            if p.product_id not in unique:
-                unique[p.product_id] = {
-                    'product_id': p.product_id,
-                    'name': p.name,
-                    'category': p.category,
-                    'reviews': ph.reviews,
-                    'rating': ph.rating,
-                    'price': float(ph.price) if ph.price is not None else None,
-                    'scraped_at': ph.scraped_at.isoformat() if ph.scraped_at else None
-                }
-        most_reviewed = list(unique.values())[:limit]
-        return most_reviewed
-    finally:
-        session.close()
-
-
-@app.get('/analytics/summary')
-def analytics_summary():
+    query = (
+        select(Product, LatestPrice)
+        .join(LatestPrice, Product.product_id == LatestPrice.product_id)
+    )
+    if category:
+        query = query.where(Product.category == category)
+    query = query.order_by(LatestPrice.reviews.desc(), LatestPrice.rating.desc()).limit(limit)
+    results = (await session.execute(query)).all()
+    most_reviewed = [
+        {
+            'product_id': p.product_id,
+            'name': p.name,
+            'category': p.category,
+            'reviews': lp.reviews,
+            'rating': lp.rating,
+            'price': float(lp.price) if lp.price is not None else None,
+            'scraped_at': last_observed(lp),
+        }
+        for p, lp in results
+    ]
+    return most_reviewed
+
+
+@router.get('/analytics/summary')
+@cached_response
+async def analytics_summary(
+    request: Request,
+    group_by: Optional[str] = Query(None, pattern='^(category|brand)$',
+                                    description='Return KPIs per category or per brand instead of catalog-wide'),
+    session: AsyncSession = Depends(get_session)
+):
     """Return key performance indicators (KPIs) for the catalog (latest record per product).
+    Aggregation runs in the database over latest_price; with group_by, one row per segment is returned.
     Business value: Provides at-a-glance business health metrics for the product catalog.
     """
-    session = SessionLocal()
-    try:
-        from sqlalchemy import func
-        subq = (
-            session.query(
-                PriceHistory.product_id,
-                func.max(PriceHistory.scraped_at).label('latest_scraped_at')
-            )
-            .group_by(PriceHistory.product_id)
-            .subquery()
-        )
-        query = (
-            session.query(Product, PriceHistory)
-            .join(PriceHistory, Product.product_id == PriceHistory.product_id)
-            .join(subq, (PriceHistory.product_id == subq.c.product_id) & (PriceHistory.scraped_at == subq.c.latest_scraped_at))
-        )
-        results = query.all()
-        total_products = 0
-        total_reviews = 0
-        total_rating = 0.0
-        total_price = 0.0
-        categories = set()
-        for p, ph in results:
-            total_products += 1
-            total_reviews += ph.reviews or 0
-            total_rating += ph.rating or 0.0
-            total_price += float(ph.price) if ph.price is not None else 0.0
-            if p.category:
-                categories.add(p.category)
-        avg_rating = total_rating / total_products if total_products else 0.0
-        avg_price = total_price / total_products if total_products else 0.0
+    kpis = [
+        func.count(LatestPrice.product_id).label('total_products'),
+        func.count(func.distinct(Product.category)).label('total_categories'),
+        func.avg(func.coalesce(LatestPrice.price, 0)).label('average_price'),
+        func.avg(func.coalesce(LatestPrice.rating, 0)).label('average_rating'),
+        func.coalesce(func.sum(LatestPrice.reviews), 0).label('total_reviews')
+    ]
+    segment = getattr(Product, group_by) if group_by else None
+    query = (
+        select(*([segment] if group_by else []), *kpis)
+        .select_from(Product)
+        .join(LatestPrice, Product.product_id == LatestPrice.product_id)
+    )
+    if group_by:
+        query = query.group_by(segment).order_by(segment)
+    result = await session.execute(query)
+
+    def serialize(row):
         return {
-            'total_products': total_products,
-            'total_categories': len(categories),
-            'average_price': round(avg_price, 2),
-            'average_rating': round(avg_rating, 2),
-            'total_reviews': total_reviews
+            'total_products': row.total_products,
+            'total_categories': row.total_categories,
+            'average_price': round(float(row.average_price or 0), 2),
+            'average_rating': round(float(row.average_rating or 0), 2),
+            'total_reviews': int(row.total_reviews)
         }
-    finally:
-        session.close()
+    if not group_by:
+        return serialize(result.one())
+    return [{group_by: row[0], **serialize(row)} for row in result.all()]
+
+
+def serialize_alert(alert, product):
+    return {
+        'alert_id': alert.alert_id,
+        'product_id': alert.product_id,
+        'name': product.name,
+        'brand': product.brand,
+        'category': product.category,
+        'kind': alert.kind,
+        'old_value': float(alert.old_value) if alert.old_value is not None else None,
+        'new_value': float(alert.new_value) if alert.new_value is not None else None,
+        'change_pct': round(alert.change_pct, 2) if alert.change_pct is not None else None,
+        'zscore': round(alert.zscore, 2) if alert.zscore is not None else None,
+        'scraped_at': alert.scraped_at.isoformat() if alert.scraped_at else None,
+    }
+
+
+@router.get('/alerts')
+async def get_alerts(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description='Opaque cursor from the X-Next-Cursor header of the previous poll'),
+    since: Optional[datetime] = Query(None, description='Only alerts for observations scraped at or after this time (ISO 8601)'),
+    kind: Optional[str] = Query(None, pattern=f"^({'|'.join(ALERT_KINDS)})$", description='Filter by alert kind'),
+    product_id: Optional[int] = Query(None, description='Filter by product'),
+    category: Optional[str] = Query(None, description='Filter by category'),
+    limit: int = Query(100, ge=1, le=1000, description='Max number of alerts per response'),
+    session: AsyncSession = Depends(get_session)
+):
+    """Price drops/spikes, discount jumps and stock flips detected by the ETL, oldest first.
+    Poll with the X-Next-Cursor value as `cursor` to get only alerts raised since the previous call;
+    the header is set on every response, also when there is nothing new.
+    Business value: Turns each scrape into actionable price and availability signals.
+    """
+    after = decode_cursor(cursor, {'id': int})['id'] if cursor else 0
+    query = (
+        select(Alert, Product)
+        .join(Product, Product.product_id == Alert.product_id)
+        .where(Alert.alert_id > after)
+    )
+    if since:
+        query = query.where(Alert.scraped_at >= since)
+    if kind:
+        query = query.where(Alert.kind == kind)
+    if product_id is not None:
+        query = query.where(Alert.product_id == product_id)
+    if category:
+        query = query.where(Product.category == category)
+    results = (await session.execute(query.order_by(Alert.alert_id).limit(limit))).all()
+    set_next_cursor(request, response, {'id': results[-1][0].alert_id if results else after})
+    return [serialize_alert(alert, product) for alert, product in results]
+
+
+class PredictBatch(BaseModel):
+    product_ids: Optional[List[int]] = None
+    # values are checked when the feature matrix is built
+    rows: Optional[List[Dict[str, Any]]] = None
+
+
+def json_response(content):
+    # Plain floats/ints only: skip jsonable_encoder's per-value walk
+    return Response(content=render_json(content), media_type='application/json')
+
+
+def serialize_predictions(pids, prices, predicted):
+    return [
+        {'product_id': pid, 'price': round(price, 2), 'predicted_price': round(value, 2)}
+        for pid, price, value in zip(pids.tolist(), prices.tolist(), predicted.tolist())
+    ]
+
+
+def loaded_predictor():
+    if not predictor.ready and not predictor.load():
+        raise HTTPException(status_code=503, detail="No trained price model. Run ml/model.py first.")
+    return predictor
+
+
+async def ready_predictor(session):
+    """The loaded model with features for the current data version."""
+    model = loaded_predictor()
+    await model.refresh(session, await response_cache.data_version(session))
+    return model
+
+
+def check_batch_size(n):
+    if n > MAX_PREDICT_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PREDICT_ROWS} products or rows per request.")
+
+
+@router.get('/predict')
+async def predict(
+    product_id: Optional[int] = Query(None, description='Product to predict the next price for'),
+    product_ids: Optional[str] = Query(None, pattern=r'^\d+(,\d+)*$',
+                                       description='Comma-separated product IDs'),
+    session: AsyncSession = Depends(get_session)
+):
+    """Predict the next observed price of one product (product_id) or several (product_ids).
+    Features come from each product's newest price history; predictions use the model trained by ml/model.py.
+    Business value: Anticipates price moves for repricing and buying decisions.
+    """
+    if product_ids is None and product_id is None:
+        raise HTTPException(status_code=400, detail="Either product_id or product_ids must be provided.")
+    pids = [product_id] if product_ids is None else list(dict.fromkeys(int(p) for p in product_ids.split(',')))
+    check_batch_size(len(pids))
+    model = await ready_predictor(session)
+    found, prices, predicted, missing = model.predict_products(pids)
+    predictions = serialize_predictions(found, prices, predicted)
+    if product_ids is None:
+        if not predictions:
+            raise HTTPException(status_code=404, detail=f"No price history for product {product_id}.")
+        return json_response(predictions[0])
+    return json_response({'predictions': predictions, 'missing': missing.tolist()})
+
+
+@router.post('/predict/batch', openapi_extra={'requestBody': {
+    'required': True, 'content': {'application/json': {'schema': PredictBatch.model_json_schema()}}}})
+async def predict_batch(request: Request, session: AsyncSession = Depends(get_session)):
+    """Predict next prices for up to MAX_PREDICT_ROWS products (`product_ids`) or feature rows (`rows`),
+    in a single model call. Rows carry the model's feature columns (`category` may replace `category_code`).
+    Business value: Scores whole catalogs or what-if scenarios in one round trip.
+    """
+    try:
+        # straight from the raw body: about half the cost of FastAPI's parse-then-validate
+        body = PredictBatch.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422,
+                            detail=e.errors(include_url=False, include_context=False, include_input=False))
+    if (body.product_ids is None) == (body.rows is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of product_ids or rows.")
+    if body.rows is not None:
+        check_batch_size(len(body.rows))
+        model = loaded_predictor()
+        try:
+            # scikit-learn's tree evaluation releases the GIL: other requests run meanwhile
+            predicted = await asyncio.to_thread(model.predict_rows, body.rows) if body.rows else np.empty(0)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return json_response({'predictions': [round(value, 2) for value in predicted.tolist()]})
+    check_batch_size(len(body.product_ids))
+    model = await ready_predictor(session)
+    found, prices, predicted, missing = model.predict_products(body.product_ids)
+    return json_response({'predictions': serialize_predictions(found, prices, predicted),
+                          'missing': missing.tolist()})
+
 
+app = create_app()
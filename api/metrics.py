@@ -0,0 +1,241 @@
+"""
+Per-request performance metrics in Prometheus text format, and opt-in request profiling.
+
+MetricsMiddleware (pure ASGI) records, per route template:
+- http_request_duration_seconds: end-to-end latency (also labelled by method and status)
+- http_request_db_queries / http_request_db_seconds: statements run and time spent in them,
+  counted by SQLAlchemy cursor events on the API engine (instrument_engine)
+- http_response_rows / http_response_serialize_seconds: top-level JSON rows (or streamed
+  export rows) and the time spent encoding them (render_json, record_rows)
+
+GET /metrics serves them. The registry is per process: with several workers, each one
+reports its own series.
+
+Profiling is off unless PROFILING_ENABLED=1. A request sent with `X-Profile: cprofile`
+(or `pyinstrument`, if installed) is profiled, and its report is written to PROFILE_DIR
+(default <tmp>/api-profiles). The response names the file in `X-Profile-Report`.
+"""
+import bisect
+import cProfile
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0').lower() in ('1', 'true', 'yes')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'api-profiles'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 5000, 10000, 50000)
+
+
+class Histogram:
+    """Thread-safe labelled histogram rendered in the Prometheus text exposition format."""
+
+    def __init__(self, name, documentation, buckets, labels=('route',)):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{labels}}} {series[-1]}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency.', LATENCY_BUCKETS,
+                            labels=('method', 'route', 'status'))
+DB_QUERIES = Histogram('http_request_db_queries', 'Database statements executed per request.', COUNT_BUCKETS)
+DB_SECONDS = Histogram('http_request_db_seconds', 'Time spent executing database statements per request.',
+                       LATENCY_BUCKETS)
+RESPONSE_ROWS = Histogram('http_response_rows', 'Top-level JSON rows returned per request.', ROW_BUCKETS)
+SERIALIZE_SECONDS = Histogram('http_response_serialize_seconds', 'JSON encoding time per request.',
+                              LATENCY_BUCKETS)
+REGISTRY = [REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, RESPONSE_ROWS, SERIALIZE_SECONDS]
+
+
+def render_metrics():
+    return '\n'.join(line for metric in REGISTRY for line in metric.collect()) + '\n'
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds', 'rows', 'serialize_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+
+
+# Set by the middleware; SQLAlchemy's async greenlets and FastAPI's tasks inherit it
+current_stats = ContextVar('current_stats', default=None)
+
+
+def record_rows(rows, serialize_seconds):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.rows += rows
+        stats.serialize_seconds += serialize_seconds
+
+
+def render_json(content):
+    """Compact JSON bytes, with the encoding time and row count recorded against the current request."""
+    started = time.perf_counter()
+    body = json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode()
+    record_rows(len(content) if isinstance(content, list) else 1, time.perf_counter() - started)
+    return body
+
+
+class InstrumentedJSONResponse(JSONResponse):
+    """The API's default response class: JSONResponse encoded through render_json."""
+
+    def render(self, content):
+        return render_json(content)
+
+
+def instrument_engine(engine):
+    """Count statements and their execution time per request (async engines via .sync_engine)."""
+    engine = getattr(engine, 'sync_engine', engine)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += time.perf_counter() - context._query_started
+
+
+class Profiler:
+    """One profiled request at a time (Python allows a single active profiler)."""
+    _lock = threading.Lock()
+
+    def __init__(self, kind, route):
+        self.kind = kind
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+        suffix = 'html' if kind == 'pyinstrument' else 'prof'
+        self.path = os.path.join(PROFILE_DIR, f'{stamp}-{time.time_ns() % 10**9:09d}-{slug}.{suffix}')
+        self._profiler = None
+
+    def start(self):
+        if not self._lock.acquire(blocking=False):
+            return False
+        if self.kind == 'pyinstrument':
+            from pyinstrument import Profiler as PyinstrumentProfiler
+            self._profiler = PyinstrumentProfiler(async_mode='enabled')
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return True
+
+    def stop(self):
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            if self.kind == 'pyinstrument':
+                self._profiler.stop()
+                with open(self.path, 'w') as f:
+                    f.write(self._profiler.output_html())
+            else:
+                self._profiler.disable()
+                self._profiler.dump_stats(self.path)  # python -m pstats <file>, or snakeviz
+        finally:
+            self._lock.release()
+
+
+def profiler_kind(headers):
+    """cprofile/pyinstrument from the X-Profile header, if profiling is enabled and requested."""
+    if not PROFILING_ENABLED:
+        return None
+    value = headers.get(b'x-profile', b'').decode().strip().lower()
+    if not value:
+        return None
+    if value == 'pyinstrument':
+        try:
+            import pyinstrument  # noqa: F401
+            return 'pyinstrument'
+        except ImportError:
+            pass
+    return 'cprofile'
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        status = 500
+        kind = profiler_kind(dict(scope['headers']))
+        profiler = Profiler(kind, scope['path']) if kind else None
+        if profiler is not None and not profiler.start():
+            profiler = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if profiler is not None:
+                    headers = list(message.get('headers', []))
+                    headers.append((b'x-profile-report', os.path.basename(profiler.path).encode()))
+                    message = {**message, 'headers': headers}
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.stop()
+            current_stats.reset(token)
+            # the router stores the matched route in the scope; the template keeps label cardinality bounded
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            REQUEST_SECONDS.observe(elapsed, scope['method'], route, str(status))
+            DB_QUERIES.observe(stats.queries, route)
+            DB_SECONDS.observe(stats.db_seconds, route)
+            RESPONSE_ROWS.observe(stats.rows, route)
+            SERIALIZE_SECONDS.observe(stats.serialize_seconds, route)
@@ -0,0 +1,146 @@
+"""
+Next-price predictions from the persisted model (ml/model.py), served in-process.
+
+The model is loaded once (memory-mapped), in the background at startup; scikit-learn,
+pandas and the feature pipeline (ml/features.py) are only imported then, not with the
+API. Features for every product's newest
+observation are built once per ETL data version from the last ROLLING_WINDOW price_history
+rows per product, off the event loop, and kept as a float32 matrix indexed by sorted
+product_id together with the model's prediction for every row. A product_ids request is
+then a vectorized searchsorted lookup; only feature rows sent by the client run the model.
+
+Settings: MODEL_PATH (default ml/artifacts/price_model.joblib), MAX_PREDICT_ROWS (5000).
+"""
+import asyncio
+import os
+
+import numpy as np
+from sqlalchemy import Float, func, select, type_coerce
+from models import PriceHistory, Product
+
+# ml/model.py's MODEL_PATH, without importing it (and scikit-learn) with the API
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(os.path.dirname(__file__), '..', 'ml', 'artifacts',
+                                                       'price_model.joblib'))
+MAX_PREDICT_ROWS = int(os.environ.get('MAX_PREDICT_ROWS', 5000))
+
+
+def recent_history_query(window=None):
+    """The newest `window` (default ROLLING_WINDOW) observations of every product (enough for
+    the lag and rolling features)."""
+    from features import HISTORY_COLUMNS, ROLLING_WINDOW
+    ranked = (
+        select(
+            PriceHistory.product_id, Product.category, type_coerce(PriceHistory.price, Float).label('price'),
+            PriceHistory.discount_pct, PriceHistory.in_stock, PriceHistory.rating, PriceHistory.reviews,
+            PriceHistory.scraped_at,
+            func.row_number().over(
+                partition_by=PriceHistory.product_id,
+                order_by=(PriceHistory.scraped_at.desc(), PriceHistory.price_id.desc())
+            ).label('rn'),
+        )
+        .join(Product, Product.product_id == PriceHistory.product_id)
+        .subquery()
+    )
+    return select(*(ranked.c[name] for name in HISTORY_COLUMNS)).where(ranked.c.rn <= (window or ROLLING_WINDOW))
+
+
+class Predictor:
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self.bundle = None
+        self.version = None
+        self.product_ids = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, 0), dtype=np.float32)  # (products, FEATURE_COLUMNS) once built
+        self.current_prices = np.empty(0, dtype=np.float64)
+        self.predicted = np.empty(0, dtype=np.float64)
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self):
+        return self.bundle is not None
+
+    def load(self):
+        """Load the persisted model if there is one; returns whether it was loaded."""
+        if not os.path.exists(self.path):
+            return False
+        import model as price_model
+        self.bundle = price_model.load_model(self.path, mmap=True)
+        # predictions are small batches on a request thread: skip the joblib worker pool
+        self.bundle['model'].n_jobs = 1
+        self.version = None
+        return True
+
+    def built_features(self, history):
+        """The per-product feature attributes for price_history rows or a frame (HISTORY_COLUMNS);
+        the predictor itself is left unchanged."""
+        import pandas as pd
+        from features import FEATURE_COLUMNS, HISTORY_COLUMNS, build_features, latest_features
+        history = pd.DataFrame(history, columns=HISTORY_COLUMNS)
+        features = latest_features(build_features(history, self.bundle['categories']))
+        matrix = np.ascontiguousarray(features[FEATURE_COLUMNS].to_numpy(np.float32))
+        return {
+            'product_ids': features['product_id'].to_numpy(np.int64),
+            'matrix': matrix,
+            'current_prices': features['price'].to_numpy(np.float64),
+            # the model is fixed between loads: predicting the whole catalog once per data
+            # version makes a product_ids request a lookup
+            'predicted': self.bundle['model'].predict(matrix) if len(matrix) else np.empty(0),
+        }
+
+    def set_features(self, history):
+        """Replace the per-product feature matrix and predictions from price_history rows."""
+        vars(self).update(self.built_features(history))
+
+    async def refresh(self, session, version):
+        """Rebuild the features when the ETL data version has changed since the last build."""
+        if self.version == version:
+            return
+        async with self._lock:
+            if self.version == version:
+                return
+            rows = (await session.execute(recent_history_query())).all()
+            # building features and predicting a large catalog takes seconds: do it off the
+            # event loop, then swap the new arrays in between two requests
+            vars(self).update(await asyncio.to_thread(self.built_features, rows))
+            self.version = version
+
+    def lookup(self, product_ids):
+        """Row index of each product in the feature matrix, and a mask of the ones found."""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        if not len(self.product_ids):
+            return np.zeros(len(product_ids), dtype=np.int64), np.zeros(len(product_ids), dtype=bool)
+        idx = np.searchsorted(self.product_ids, product_ids).clip(max=len(self.product_ids) - 1)
+        return idx, self.product_ids[idx] == product_ids
+
+    def predict_products(self, product_ids):
+        """(found product_ids, current prices, predicted prices, missing product_ids)."""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        idx, found = self.lookup(product_ids)
+        idx = idx[found]
+        return product_ids[found], self.current_prices[idx], self.predicted[idx], product_ids[~found]
+
+    def feature_matrix(self, rows):
+        """float32 matrix from feature dicts; `category` may be given instead of category_code."""
+        from features import FEATURE_COLUMNS
+        codes = {category: code for code, category in enumerate(self.bundle['categories'])}
+
+        def values(row):
+            if 'category_code' not in row:
+                row = {**row, 'category_code': codes.get(row.get('category'), -1)}
+            return [row[name] for name in FEATURE_COLUMNS]
+
+        try:
+            matrix = np.array([values(row) for row in rows], dtype=np.float32)
+        except KeyError as e:
+            raise ValueError(f"Feature rows are missing: {e.args[0]}")
+        except (TypeError, ValueError):
+            raise ValueError("Feature rows must give a numeric value for every feature.")
+        if np.isnan(matrix).any():
+            raise ValueError("Feature rows must give a numeric value for every feature.")
+        return matrix
+
+    def predict_rows(self, rows):
+        return self.bundle['model'].predict(self.feature_matrix(rows))
+
+
+predictor = Predictor()
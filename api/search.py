@@ -0,0 +1,245 @@
+"""
+In-process, typo-tolerant product search for /search.
+
+The index is built from the products table on first use and extended with the products
+added since (product_id above the newest indexed one) whenever the ETL data version
+changes. The ETL never renames a product (it keeps the name, brand and category it was
+first seen with), so nothing else needs reindexing; products merged away by a migration
+are dropped from results.
+
+- Every product's words (name, brand and category; case-folded, accents and punctuation
+  removed) go into an inverted index: word -> positions of the products containing it.
+  Each refresh adds a segment; segments are merged once there are more than MAX_SEGMENTS.
+- A query word matches the same word, longer words it is a prefix of (partial words) and,
+  from FUZZY_MIN_LENGTH letters, vocabulary words whose padded trigrams have a Dice
+  similarity of at least FUZZY_MIN_SIMILARITY (misspellings).
+- A product scores, per query word, the similarity x idf of its best-matching word; scores
+  are summed over the query words. Ranking is vectorized over the matching postings only
+  (no per-product Python work, no catalog-sized arrays), so a query costs milliseconds on a
+  1M-product catalog.
+"""
+import asyncio
+import re
+import unicodedata
+
+import numpy as np
+from sqlalchemy import select
+from models import NO_BRAND, Product
+
+MAX_SEGMENTS = 8
+FUZZY_MIN_LENGTH = 4
+FUZZY_MIN_SIMILARITY = 0.5
+MAX_EXPANSIONS = 8  # vocabulary words per query word (prefix or fuzzy matches)
+MAX_QUERY_WORDS = 10
+PRODUCT_COLUMNS = ['product_id', 'name', 'brand', 'category']
+WORD = re.compile(r'\w+')  # Python's \w is Unicode-aware (pyarrow's regex engine is ASCII-only)
+
+
+def words(text):
+    """Case-folded words (Unicode letters, digits and underscores) of a string, accents removed."""
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return WORD.findall(text.casefold())
+
+
+def trigrams(word):
+    padded = f' {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Segment:
+    """CSR postings for one batch of products: positions[offsets[code]:offsets[code + 1]]."""
+    __slots__ = ('offsets', 'positions')
+
+    def __init__(self, codes, positions, n_words):
+        order = np.lexsort((positions, codes))
+        self.positions = positions[order].astype(np.int32)
+        self.offsets = np.searchsorted(codes[order], np.arange(n_words + 1))
+
+    def postings(self, code):
+        if code >= len(self.offsets) - 1:
+            return self.positions[:0]
+        return self.positions[self.offsets[code]:self.offsets[code + 1]]
+
+    def pairs(self):
+        return np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets)), self.positions
+
+
+class SearchIndex:
+    def __init__(self):
+        self.version = None
+        self.product_ids = np.empty(0, dtype=np.int64)
+        self.categories = np.empty(0, dtype=np.int32)  # codes into self.labels
+        self.brands = np.empty(0, dtype=np.int32)
+        self.labels = {}  # category/brand value -> code
+        self.vocab = None  # pandas Index of words, from the first products (pandas stays off the import path)
+        self.doc_freq = np.empty(0, dtype=np.int64)
+        self.segments = []
+        # alphabetic vocabulary words, sorted, for prefix and trigram matching
+        self.alpha_words = np.empty(0, dtype=object)
+        self.alpha_codes = np.empty(0, dtype=np.int64)
+        self.alpha_gram_counts = np.empty(0, dtype=np.int64)
+        self.gram_postings = {}
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    async def refresh(self, session, version):
+        """Index the products added since the last refresh, when the ETL data version changed."""
+        if self.version == version:
+            return
+        async with self._lock:
+            if self.version == version:
+                return
+            newest = int(self.product_ids[-1]) if len(self.product_ids) else 0
+            rows = (await session.execute(
+                select(*(getattr(Product, name) for name in PRODUCT_COLUMNS))
+                .where(Product.product_id > newest).order_by(Product.product_id)
+            )).all()
+            if rows:
+                # tokenizing a large catalog takes seconds: build off the event loop, then swap
+                # the new arrays in between two requests
+                vars(self).update(await asyncio.to_thread(self.extended, rows))
+            self.version = version
+
+    def add_products(self, products):
+        """Index products (PRODUCT_COLUMNS rows or frame) newer than every indexed one."""
+        vars(self).update(self.extended(products))
+
+    def extended(self, products):
+        """The index attributes with `products` added; the index itself is left unchanged."""
+        import pandas as pd
+        frame = pd.DataFrame(products, columns=PRODUCT_COLUMNS)
+        known = self.vocab if self.vocab is not None else pd.Index([], dtype=object)
+        base = len(self.product_ids)
+        brand = frame['brand'].where(frame['brand'] != NO_BRAND).fillna('')  # the placeholder is not indexed
+        text = (frame['name'].fillna('') + ' ' + brand + ' ' + frame['category'].fillna('')).tolist()
+        exploded = pd.Series([words(t) for t in text]).explode().dropna()
+        positions = exploded.index.to_numpy(np.int64) + base
+        local_codes, uniques = pd.factorize(exploded.to_numpy(dtype=object))
+        codes = known.get_indexer(uniques)
+        new = codes < 0
+        codes[new] = np.arange(len(known), len(known) + new.sum())
+        vocab = known.append(pd.Index(uniques[new], dtype=object)) if new.any() else known
+        # one posting per (word, product), however often the word appears in the name
+        pairs = np.sort(codes[local_codes] * (base + len(frame)) + positions)
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]  # np.unique hashes, which is far slower here
+        word_codes, positions = np.divmod(pairs, base + len(frame))
+
+        segments = self.segments + [Segment(word_codes, positions, len(vocab))]
+        if len(segments) > MAX_SEGMENTS:
+            merged = [segment.pairs() for segment in segments]
+            segments = [Segment(np.concatenate([c for c, _ in merged]), np.concatenate([p for _, p in merged]),
+                                len(vocab))]
+        doc_freq = np.bincount(word_codes, minlength=len(vocab))
+        doc_freq[:len(self.doc_freq)] += self.doc_freq
+        labels = dict(self.labels)
+        categories, brands = ([labels.setdefault(value, len(labels)) for value in frame[column].tolist()]
+                              for column in ('category', 'brand'))
+        update = {
+            'product_ids': np.concatenate([self.product_ids, frame['product_id'].to_numpy(np.int64)]),
+            'categories': np.concatenate([self.categories, np.array(categories, dtype=np.int32)]),
+            'brands': np.concatenate([self.brands, np.array(brands, dtype=np.int32)]),
+            'labels': labels, 'vocab': vocab, 'doc_freq': doc_freq, 'segments': segments,
+        }
+        if new.any():
+            update.update(self._alpha_vocabulary(uniques[new], codes[new]))
+        return update
+
+    def _alpha_vocabulary(self, new_words, codes):
+        """Sorted alphabetic words with their trigram postings (the vocabulary is far smaller than the catalog)."""
+        is_alpha = np.array([word.isalpha() for word in new_words], dtype=bool)
+        if not is_alpha.any():
+            return {}
+        all_words = np.concatenate([self.alpha_words, new_words[is_alpha]])
+        all_codes = np.concatenate([self.alpha_codes, codes[is_alpha]])
+        order = np.argsort(all_words, kind='stable')
+        all_words, all_codes = all_words[order], all_codes[order]
+        grams = {}
+        counts = np.empty(len(all_words), dtype=np.int64)
+        for i, word in enumerate(all_words):
+            word_grams = trigrams(word)
+            counts[i] = len(word_grams)
+            for gram in word_grams:
+                grams.setdefault(gram, []).append(i)
+        return {'alpha_words': all_words, 'alpha_codes': all_codes, 'alpha_gram_counts': counts,
+                'gram_postings': {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}}
+
+    def candidates(self, word):
+        """{vocabulary code: similarity} for one normalized query word."""
+        found = {}
+        code = self.vocab.get_indexer([word])[0]
+        if code >= 0:
+            found[code] = 1.0
+        if not word.isalpha() or len(word) < 3:
+            return found
+        lo = np.searchsorted(self.alpha_words, word)
+        hi = np.searchsorted(self.alpha_words, word + '\U0010ffff')
+        if hi > lo:
+            prefixed = np.arange(lo, hi)
+            prefixed = prefixed[np.argsort(-self.doc_freq[self.alpha_codes[prefixed]], kind='stable')[:MAX_EXPANSIONS]]
+            for i in prefixed:
+                found.setdefault(int(self.alpha_codes[i]), len(word) / len(self.alpha_words[i]))
+        if len(word) >= FUZZY_MIN_LENGTH:
+            query_grams = trigrams(word)
+            hits = [self.gram_postings[gram] for gram in query_grams if gram in self.gram_postings]
+            if hits:
+                shared = np.bincount(np.concatenate(hits), minlength=len(self.alpha_words))
+                similarity = 2 * shared / (len(query_grams) + self.alpha_gram_counts)
+                close = np.flatnonzero(similarity >= FUZZY_MIN_SIMILARITY)
+                close = close[np.argsort(-similarity[close], kind='stable')[:MAX_EXPANSIONS]]
+                for i in close:
+                    code = int(self.alpha_codes[i])
+                    found[code] = max(found.get(code, 0.0), float(similarity[i]))
+        return found
+
+    def search(self, query, limit=20, category=None, brand=None):
+        """[(product_id, score)], best first; empty when nothing matches."""
+        query_words = list(dict.fromkeys(words(query)))[:MAX_QUERY_WORDS]
+        if not query_words:
+            raise ValueError('Query has no searchable words')
+        n = len(self.product_ids)
+        if not n:
+            return []
+        positions, scores = [], []
+        for word in query_words:
+            matches = self.candidates(word)
+            if not matches:
+                continue
+            codes = np.fromiter(matches.keys(), dtype=np.int64, count=len(matches))
+            weights = np.fromiter(matches.values(), dtype=np.float64, count=len(matches))
+            weights *= np.log1p(n / self.doc_freq[codes])  # idf
+            # ascending weight, then a stable sort by position: a product containing several
+            # words matching this query word keeps the last, best one (lexsort is much slower)
+            postings = [(segment.postings(code), weight) for weight, code in sorted(zip(weights, codes))
+                        for segment in self.segments]
+            word_positions = np.concatenate([p for p, _ in postings])
+            word_scores = np.concatenate([np.full(len(p), weight) for p, weight in postings])
+            if len(postings) > 1:
+                order = np.argsort(word_positions, kind='stable')
+                word_positions, word_scores = word_positions[order], word_scores[order]
+                last = np.r_[word_positions[1:] != word_positions[:-1], True]
+                word_positions, word_scores = word_positions[last], word_scores[last]
+            positions.append(word_positions)
+            scores.append(word_scores)
+        if not positions:
+            return []
+        # sum over the query words, per product (postings only: no catalog-sized arrays)
+        positions, scores = np.concatenate(positions), np.concatenate(scores)
+        order = np.argsort(positions, kind='stable')
+        positions, scores = positions[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]])
+        hits, total = positions[starts], np.add.reduceat(scores, starts)
+        for value, labels in ((category, self.categories), (brand, self.brands)):
+            if value:
+                code = self.labels.get(value)
+                keep = labels[hits] == code if code is not None else np.zeros(len(hits), dtype=bool)
+                hits, total = hits[keep], total[keep]
+        if len(hits) > limit:
+            top = np.argpartition(-total, limit - 1)[:limit]
+            hits, total = hits[top], total[top]
+        order = np.lexsort((hits, -total))
+        return list(zip(self.product_ids[hits[order]].tolist(), total[order].round(4).tolist()))
+
+search_index = SearchIndex()
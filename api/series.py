@@ -0,0 +1,108 @@
+"""
+Price series shaping for charts, done server-side before serialization.
+
+- Time buckets (hour/day/week) aggregated with last/min/max/avg or OHLC, vectorized with
+  numpy reduceat over rows sorted by (product_id, scraped_at).
+- Largest-Triangle-Three-Buckets (LTTB) downsampling: keeps the points that preserve the
+  visual shape of a series (spikes and drops) instead of every k-th point.
+"""
+import numpy as np
+
+BUCKET_UNITS = {'hour': 'h', 'day': 'D', 'week': 'D'}
+AGGREGATES = ('last', 'min', 'max', 'avg', 'ohlc')
+
+
+def bucket_starts(times, bucket):
+    """Start of the hour/day/week (weeks start on Monday) containing each datetime64 value."""
+    starts = times.astype(f'datetime64[{BUCKET_UNITS[bucket]}]')
+    if bucket == 'week':
+        # 1970-01-01 was a Thursday: (days + 3) % 7 is the weekday with Monday = 0
+        starts = starts - (starts.astype(np.int64) + 3) % 7
+    return starts.astype('datetime64[us]')
+
+
+def _group_bounds(*keys):
+    """First and last index of each run of equal keys."""
+    n = len(keys[0])
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    first = np.flatnonzero(change)
+    last = np.append(first[1:], n) - 1
+    return first, last
+
+
+def aggregate(product_ids, times, prices, bucket, agg):
+    """Bucketed series per product from arrays sorted by (product_id, scraped_at).
+
+    Returns {product_id: columns} where columns holds 'bucket' and 'count' plus 'price'
+    (or 'open', 'high', 'low', 'close' for agg='ohlc'), oldest bucket first.
+    """
+    if len(prices) == 0:
+        return {}
+    starts = bucket_starts(times, bucket)
+    first, last = _group_bounds(product_ids, starts)
+    columns = {'bucket': starts[first], 'count': last - first + 1}
+    if agg == 'ohlc':
+        columns.update(open=prices[first], high=np.maximum.reduceat(prices, first),
+                       low=np.minimum.reduceat(prices, first), close=prices[last])
+    elif agg == 'last':
+        columns['price'] = prices[last]
+    elif agg == 'min':
+        columns['price'] = np.minimum.reduceat(prices, first)
+    elif agg == 'max':
+        columns['price'] = np.maximum.reduceat(prices, first)
+    else:
+        columns['price'] = np.add.reduceat(prices, first) / columns['count']
+    group_ids = product_ids[first]
+    series = {}
+    for lo, hi in zip(*_group_bounds(group_ids)):
+        series[int(group_ids[lo])] = {name: values[lo:hi + 1] for name, values in columns.items()}
+    return series
+
+
+def lttb_indices(x, y, max_points):
+    """Indices of the points LTTB keeps from an x-sorted series (first and last always kept)."""
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1])
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # max_points - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        # twice the area of the triangle (previous selected point, candidate, next bucket's mean)
+        areas = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def downsample_columns(columns, max_points, value='price'):
+    """LTTB over a bucketed series (x = bucket start, y = `value`)."""
+    keep = lttb_indices(columns['bucket'].astype(np.int64), columns[value], max_points)
+    return {name: values[keep] for name, values in columns.items()}
+
+
+def serialize_buckets(columns):
+    """JSON rows for a bucketed series, newest bucket first like the raw history."""
+    rows = []
+    for i in range(len(columns['bucket']) - 1, -1, -1):
+        row = {'bucket': columns['bucket'][i].item().isoformat(), 'count': int(columns['count'][i])}
+        for name in ('price', 'open', 'high', 'low', 'close'):
+            if name in columns:
+                row[name] = round(float(columns[name][i]), 2)
+        rows.append(row)
+    return rows
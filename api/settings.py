@@ -0,0 +1,60 @@
+"""
+API settings, read from the environment once (get_settings); the api package loads .env first.
+
+- DATABASE_URL, or the MySQL settings of etl/config.py, as for the ETL; ASYNC_DATABASE_URL
+  overrides it for the API. The asyncio driver is derived from the URL (api/db.py).
+- DB_POOL_SIZE (default 10), DB_MAX_OVERFLOW (20), DB_POOL_TIMEOUT seconds (30),
+  DB_POOL_RECYCLE seconds (1800), DB_POOL_PRE_PING (1)
+- SQL_ECHO=1 logs every statement
+- RESPONSE_CACHE_SIZE (entries, default 512), RESPONSE_CACHE_TTL seconds (300),
+  DATA_VERSION_TTL seconds between data version checks (1.0): the response cache (api/cache.py)
+- API_WARMUP (1): at startup, open WARMUP_CONNECTIONS (2) pooled connections and read the
+  data version before serving, then load the price model and build the /predict features
+  and the /search index in the background
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+def _flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: str
+    sql_echo: bool = False
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    warmup: bool = True
+    warmup_connections: int = 2
+    response_cache_size: int = 512
+    response_cache_ttl: float = 300
+    data_version_ttl: float = 1.0
+
+    @classmethod
+    def from_env(cls):
+        from models import database_url
+        return cls(
+            database_url=os.environ.get('ASYNC_DATABASE_URL') or database_url(),
+            sql_echo=_flag('SQL_ECHO', '0'),
+            pool_size=int(os.environ.get('DB_POOL_SIZE', 10)),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            pool_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            pool_pre_ping=_flag('DB_POOL_PRE_PING', '1'),
+            warmup=_flag('API_WARMUP', '1'),
+            warmup_connections=int(os.environ.get('WARMUP_CONNECTIONS', 2)),
+            response_cache_size=int(os.environ.get('RESPONSE_CACHE_SIZE', 512)),
+            response_cache_ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 300)),
+            data_version_ttl=float(os.environ.get('DATA_VERSION_TTL', 1.0)),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings():
+    return Settings.from_env()
@@ -0,0 +1,129 @@
+"""
+Benchmark: /analytics/summary computed in Python vs. as a single SQL aggregate.
+
+Compares, on a synthetic SQLite catalog (default 100k products):
+- legacy:    max(scraped_at) subquery join, ORM rows summed in a Python loop
+- snapshot:  latest_price join, ORM rows summed in a Python loop
+- aggregate: the current endpoint (COUNT/AVG/SUM/COUNT DISTINCT in the database)
+
+    python benchmarks/bench_analytics_summary.py --products 100000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, ROOT)
+
+from common import FORCE_POPULATE, timed, use_bench_database  # noqa: E402
+
+use_bench_database('bench_analytics_summary.db')
+
+from sqlalchemy import func  # noqa: E402
+from models import Product, PriceHistory, LatestPrice, SessionLocal, engine  # noqa: E402
+from synthetic_data import populate  # noqa: E402
+from api.db import dispose_engine, open_session  # noqa: E402
+from api.main import analytics_summary  # noqa: E402
+
+
+def python_loop_summary(results):
+    total_products = 0
+    total_reviews = 0
+    total_rating = 0.0
+    total_price = 0.0
+    categories = set()
+    for p, ph in results:
+        total_products += 1
+        total_reviews += ph.reviews or 0
+        total_rating += ph.rating or 0.0
+        total_price += float(ph.price) if ph.price is not None else 0.0
+        if p.category:
+            categories.add(p.category)
+    return {
+        'total_products': total_products,
+        'total_categories': len(categories),
+        'average_price': round(total_price / total_products, 2) if total_products else 0.0,
+        'average_rating': round(total_rating / total_products, 2) if total_products else 0.0,
+        'total_reviews': total_reviews
+    }
+
+
+def legacy_summary():
+    session = SessionLocal()
+    try:
+        subq = (
+            session.query(PriceHistory.product_id,
+                          func.max(PriceHistory.scraped_at).label('latest_scraped_at'))
+            .group_by(PriceHistory.product_id)
+            .subquery()
+        )
+        results = (
+            session.query(Product, PriceHistory)
+            .join(PriceHistory, Product.product_id == PriceHistory.product_id)
+            .join(subq, (PriceHistory.product_id == subq.c.product_id)
+                  & (PriceHistory.scraped_at == subq.c.latest_scraped_at))
+            .all()
+        )
+        return python_loop_summary(results)
+    finally:
+        session.close()
+
+
+def snapshot_summary():
+    session = SessionLocal()
+    try:
+        results = (
+            session.query(Product, LatestPrice)
+            .join(LatestPrice, Product.product_id == LatestPrice.product_id)
+            .all()
+        )
+        return python_loop_summary(results)
+    finally:
+        session.close()
+
+
+# One loop for every endpoint call so pooled async connections are reused between runs
+loop = asyncio.new_event_loop()
+
+
+def endpoint_summary(group_by=None):
+    async def run():
+        async with open_session() as session:
+            return await analytics_summary.__wrapped__(request=None, group_by=group_by, session=session)
+    return loop.run_until_complete(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--observations", type=int, default=5, help="price rows per product")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    populate(engine, args.products, args.observations, force=FORCE_POPULATE)
+
+    candidates = {
+        "legacy (subquery + loop)": legacy_summary,
+        "snapshot + loop": snapshot_summary,
+        "aggregate": endpoint_summary,
+        "aggregate, group_by=category": lambda: endpoint_summary('category'),
+        "aggregate, group_by=brand": lambda: endpoint_summary('brand'),
+    }
+    print(f"{args.products} products, {args.products * args.observations} price rows")
+    baseline = None
+    for label, fn in candidates.items():
+        timings, result = timed(fn, args.repeat)
+        median_ms = statistics.median(timings)
+        baseline = baseline or median_ms
+        print(f"{label:30s} {median_ms:10.1f} ms  {baseline / median_ms:6.1f}x")
+        if isinstance(result, dict):
+            print(f"    {result}")
+    loop.run_until_complete(dispose_engine())
+
+
+if __name__ == '__main__':
+    main()
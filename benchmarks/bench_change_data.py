@@ -0,0 +1,133 @@
+"""
+Benchmark: price_history growth and load time with and without --changes-only.
+
+Loads the same sequence of daily scrapes (default 20k products x 30 runs, ~3% of products
+changing price, discount, stock or reviews per run) into two SQLite databases: one writing
+every observation, one writing only observations that differ from the latest_price
+snapshot. Reports rows stored, compression ratio and load time, and checks that the
+run-length history reconstructs the full series for a sample of products.
+
+    python benchmarks/bench_change_data.py --products 20000 --runs 30 --change-rate 0.03
+"""
+import argparse
+import bisect
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+from common import use_bench_database  # noqa: E402
+
+use_bench_database('bench_change_data.db')
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from models import Base, PriceHistory  # noqa: E402
+from transform import load_bulk  # noqa: E402
+
+CATEGORIES = ["snacks", "beverages", "dairies", "electronics", "fashion-women", "home-living"]
+VALUE_COLUMNS = ["price", "discount_pct", "in_stock", "rating", "reviews"]
+
+
+def daily_scrapes(n_products, n_runs, change_rate, seed=42):
+    """Yield one cleaned scrape DataFrame per run; each run perturbs a random subset of products."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "name": [f"Product {i}" for i in range(n_products)],
+        "brand": pd.Categorical([f"Brand {i % 300}" for i in range(n_products)]),
+        "category": pd.Categorical(np.array(CATEGORIES)[np.arange(n_products) % len(CATEGORIES)]),
+        "link": [f"https://www.jumia.com.ng/p-{i}.html" for i in range(n_products)],
+        "price": np.round(rng.uniform(500, 50000, n_products), 0),
+        "discount_pct": rng.choice([0, 0, 10, 25], n_products).astype("float32"),
+        "rating": np.round(rng.uniform(1, 5, n_products), 1).astype("float32"),
+        "reviews": rng.integers(0, 500, n_products).astype("int32"),
+        "in_stock": rng.random(n_products) > 0.05,
+    })
+    for run in range(n_runs):
+        if run:
+            df = df.copy()
+            changed = rng.random(n_products) < change_rate
+            df.loc[changed, "price"] = np.round(df.loc[changed, "price"] * rng.uniform(0.9, 1.1, changed.sum()), 0)
+            reviewed = rng.random(n_products) < change_rate
+            df.loc[reviewed, "reviews"] += 1
+        yield df
+
+
+def load_runs(engine, scrapes, start, changes_only):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    elapsed = 0.0
+    for run, df in enumerate(scrapes):
+        with Session(engine) as session:
+            started = time.perf_counter()
+            load_bulk(session, df, scraped_at=start + timedelta(days=run), changes_only=changes_only)
+            session.commit()
+            elapsed += time.perf_counter() - started
+    with engine.connect() as conn:
+        rows = conn.execute(select(func.count()).select_from(PriceHistory)).scalar()
+    return elapsed, rows
+
+
+def series(engine, product_ids):
+    """{product_id: [(scraped_at, values), ...]} oldest first."""
+    result = {pid: [] for pid in product_ids}
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(PriceHistory.product_id, PriceHistory.scraped_at,
+                   *[PriceHistory.__table__.c[c] for c in VALUE_COLUMNS])
+            .where(PriceHistory.product_id.in_(product_ids))
+            .order_by(PriceHistory.product_id, PriceHistory.scraped_at)
+        )
+        for product_id, scraped_at, *values in rows:
+            result[product_id].append((scraped_at, tuple(values)))
+    return result
+
+
+def reconstruction_matches(full_engine, dedup_engine, run_times, n_sample=200):
+    """Expand the run-length series onto every run timestamp and compare with the full history."""
+    product_ids = list(range(1, n_sample + 1))
+    full = series(full_engine, product_ids)
+    dedup = series(dedup_engine, product_ids)
+    for pid in product_ids:
+        starts = [t for t, _ in dedup[pid]]
+        expanded = [(t, dedup[pid][bisect.bisect_right(starts, t) - 1][1]) for t in run_times]
+        if expanded != full[pid]:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--change-rate", type=float, default=0.03)
+    args = parser.parse_args()
+
+    start = datetime(2025, 1, 1)
+    run_times = [start + timedelta(days=run) for run in range(args.runs)]
+    scrapes = list(daily_scrapes(args.products, args.runs, args.change_rate))
+    engines = {}
+    results = {}
+    for label, changes_only in (("every observation", False), ("changes only", True)):
+        path = os.path.join(tempfile.gettempdir(), f"bench_change_data_{int(changes_only)}.db")
+        engines[label] = create_engine(f"sqlite:///{path}")
+        results[label] = load_runs(engines[label], scrapes, start, changes_only)
+
+    print(f"{args.products:,} products x {args.runs} runs, change rate {args.change_rate:.0%}")
+    print(f"{'mode':18s} {'price_history rows':>19s} {'load seconds':>13s}")
+    for label, (elapsed, rows) in results.items():
+        print(f"{label:18s} {rows:19,d} {elapsed:13.2f}")
+    (full_time, full_rows), (dedup_time, dedup_rows) = results.values()
+    print(f"compression ratio: {full_rows / dedup_rows:.1f}x, load time saved: {1 - dedup_time / full_time:.0%}")
+    matches = reconstruction_matches(*engines.values(), run_times)
+    print(f"run-length history reconstructs the full series: {'yes' if matches else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
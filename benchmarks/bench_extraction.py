@@ -0,0 +1,101 @@
+"""
+Benchmark: product extraction per catalog page.
+
+- per-element: query_selector/inner_text per field per card (original scraper)
+- evaluate:    one eval_on_selector_all call per page (jumia_extract.extract_page)
+- lxml:        offline parse of the saved HTML (jumia_extract.parse_listing_html)
+
+Fixture pages come from data_collection/fixture_server.py. The browser paths need
+Playwright with Chromium installed; without it only the lxml parser is measured.
+
+    python benchmarks/bench_extraction.py --pages 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+
+from fixture_server import fixture_products, load_sample, render_catalog_page  # noqa: E402
+from jumia_extract import extract_page, parse_listing_html  # noqa: E402
+
+BASE_URL = "https://www.jumia.com.ng"
+
+
+def fixture_pages(n_pages, category="electronics"):
+    sample = load_sample()
+    return [render_catalog_page(fixture_products(sample, category, page_num))
+            for page_num in range(1, n_pages + 1)]
+
+
+def time_per_page(pages, extract):
+    timings = []
+    count = 0
+    for content in pages:
+        started = time.perf_counter()
+        count = len(extract(content))
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), count
+
+
+def browser_extractors():
+    """(label, fn) pairs that load each page into Chromium, or [] when unavailable."""
+    try:
+        from playwright.sync_api import sync_playwright
+        from scrape_jumia_playwright import extract_products_per_element
+        pw = sync_playwright().start()
+        browser = pw.chromium.launch(headless=True)
+    except Exception as e:
+        print(f"Skipping browser extraction ({e.__class__.__name__}: {str(e).splitlines()[0]})")
+        return [], lambda: None
+    page = browser.new_page()
+
+    def timed_in_browser(extract):
+        # set_content is outside the timed region: only extraction round trips are measured
+        def run(content):
+            page.set_content(content)
+            started = time.perf_counter()
+            result = extract(page, "electronics", BASE_URL)
+            run.elapsed.append((time.perf_counter() - started) * 1000)
+            return result
+        run.elapsed = []
+        return run
+
+    def close():
+        browser.close()
+        pw.stop()
+    return [
+        ("per-element (browser)", timed_in_browser(extract_products_per_element)),
+        ("evaluate (browser)", timed_in_browser(extract_page)),
+    ], close
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = fixture_pages(args.pages)
+    results = []
+    extractors, close = browser_extractors()
+    try:
+        for label, run in extractors:
+            _, count = time_per_page(pages, run)
+            results.append((label, statistics.median(run.elapsed), count))
+    finally:
+        close()
+    median_ms, count = time_per_page(pages, lambda content: parse_listing_html(content, "electronics", BASE_URL))
+    results.append(("lxml (offline HTML)", median_ms, count))
+
+    baseline = results[0][1]
+    print(f"{args.pages} fixture pages")
+    print(f"{'extractor':25s} {'ms/page':>9s} {'cards':>6s} {'speedup':>8s}")
+    for label, median_ms, count in results:
+        print(f"{label:25s} {median_ms:9.2f} {count:6d} {baseline / median_ms:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
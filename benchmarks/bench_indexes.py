@@ -0,0 +1,159 @@
+"""
+Benchmark: API query plans and latencies before/after the products/price_history indexes.
+
+Builds a synthetic SQLite database with data_collection/synthetic_data.py (default 50k
+products x 40 observations = 2M price_history rows), runs the queries behind the API endpoints with the model
+indexes dropped, then creates them and runs the same queries again.
+
+    python benchmarks/bench_indexes.py --products 50000 --observations 40
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+
+from common import FORCE_POPULATE, use_bench_database  # noqa: E402
+
+use_bench_database('bench_indexes.db')
+
+from sqlalchemy import create_engine, func, select, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from models import Base, Product, PriceHistory  # noqa: E402
+from synthetic_data import populate  # noqa: E402
+
+def latest_subquery():
+    return (
+        select(PriceHistory.product_id, func.max(PriceHistory.scraped_at).label('latest_scraped_at'))
+        .group_by(PriceHistory.product_id)
+        .subquery()
+    )
+
+
+def endpoint_queries(engine, sample_product):
+    with engine.connect() as conn:
+        name, brand, category = conn.execute(
+            select(Product.name, Product.brand, Product.category).where(Product.product_id == sample_product)
+        ).one()
+    latest = latest_subquery()
+    top_rated = (
+        select(Product.product_id, Product.name, PriceHistory.rating, PriceHistory.reviews)
+        .join(PriceHistory, Product.product_id == PriceHistory.product_id)
+        .join(latest, (PriceHistory.product_id == latest.c.product_id)
+              & (PriceHistory.scraped_at == latest.c.latest_scraped_at))
+        .where(Product.category == category)
+        .order_by(PriceHistory.rating.desc(), PriceHistory.reviews.desc())
+        .limit(20)
+    )
+    return {
+        "/products?category&brand": select(Product)
+        .where(Product.category == category, Product.brand == brand).limit(100),
+        "/products?brand": select(Product).where(Product.brand == brand).limit(100),
+        "/price-history?product_id": select(PriceHistory)
+        .where(PriceHistory.product_id == sample_product)
+        .order_by(PriceHistory.scraped_at.desc()).limit(1000),
+        "/price-history?product_name": select(Product.product_id)
+        .where(Product.name == name).limit(1),
+        "/top-rated?category": top_rated,
+    }
+
+
+def explain(conn, stmt):
+    compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == 'sqlite' else "EXPLAIN "
+    rows = conn.execute(text(prefix + str(compiled))).all()
+    return [" | ".join(str(col) for col in row) for row in rows]
+
+
+@contextmanager
+def statement_timeout(conn, seconds):
+    """Abort statements running longer than `seconds` (unindexed joins can take hours).
+
+    Yields a callable that restarts the clock before each statement.
+    """
+    if conn.dialect.name == 'sqlite':
+        deadline = [0.0]
+        raw = conn.connection.driver_connection
+        raw.set_progress_handler(lambda: time.perf_counter() > deadline[0], 100000)
+        try:
+            yield lambda: deadline.__setitem__(0, time.perf_counter() + seconds)
+        finally:
+            raw.set_progress_handler(None, 0)
+        return
+    if conn.dialect.name == 'mysql':
+        conn.execute(text(f"SET SESSION MAX_EXECUTION_TIME={int(seconds * 1000)}"))
+    yield lambda: None
+
+
+def time_queries(engine, queries, repeat, timeout):
+    results = {}
+    with engine.connect() as conn, statement_timeout(conn, timeout) as restart_clock:
+        for label, stmt in queries.items():
+            timings = []
+            for _ in range(repeat):
+                restart_clock()
+                started = time.perf_counter()
+                try:
+                    conn.execute(stmt).all()
+                except OperationalError:
+                    conn.rollback()
+                    timings = [float('inf')]
+                    break
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = (statistics.median(timings), explain(conn, stmt))
+    return results
+
+
+def report(title, results):
+    print(f"\n=== {title} ===")
+    for label, (median_ms, plan) in results.items():
+        shown = f"{median_ms:10.2f} ms" if median_ms != float('inf') else "   timed out"
+        print(f"{label:32s} {shown}")
+        for line in plan:
+            print(f"    {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--observations", type=int, default=40, help="price rows per product")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-query limit in seconds")
+    parser.add_argument("--reuse", action="store_true", help="reuse the database from a previous run")
+    args = parser.parse_args()
+
+    engine = create_engine(os.environ['DATABASE_URL'])
+    if not args.reuse:
+        started = time.perf_counter()
+        written = populate(engine, args.products, args.observations, force=FORCE_POPULATE)
+        print(f"Generated {args.products} products / {written} price rows in {time.perf_counter() - started:.1f}s")
+
+    indexes = [ix for table in Base.metadata.sorted_tables for ix in table.indexes]
+    with engine.begin() as conn:
+        for index in indexes:
+            index.drop(conn, checkfirst=True)
+    queries = endpoint_queries(engine, sample_product=args.products // 2)
+    before = time_queries(engine, queries, args.repeat, args.timeout)
+    report("Without indexes", before)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for index in indexes:
+            index.create(conn)
+    print(f"\nBuilt {len(indexes)} indexes in {time.perf_counter() - started:.1f}s")
+    after = time_queries(engine, queries, args.repeat, args.timeout)
+    report("With indexes", after)
+
+    print("\n=== Speedup ===")
+    for label in queries:
+        speedup = before[label][0] / max(after[label][0], 1e-6)
+        print(f"{label:32s} {speedup:8.1f}x" if speedup != float('inf') else f"{label:32s}  > timeout")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: /predict and /predict/batch latency (p50/p99) with a preloaded model.
+
+Populates a synthetic SQLite database, trains the price model on its history, then times
+the first request (the feature build and whole-catalog prediction, with the latency of
+requests served meanwhile), the in-process lookup for a batch of products and the
+endpoints end to end (httpx ASGI transport): product_ids, and feature rows.
+
+    python benchmarks/bench_predict.py --products 20000 --batch 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, os.path.join(ROOT, 'ml'))
+sys.path.insert(0, ROOT)
+
+from common import FORCE_POPULATE, measure, percentiles, timed, use_bench_database  # noqa: E402
+
+use_bench_database('bench_predict.db', 'bench_predict.joblib')
+
+import httpx  # noqa: E402
+
+
+def train(engine, trees):
+    from features import HISTORY_COLUMNS
+    from model import train_model
+    from models import PriceHistory, Product
+    from sqlalchemy import select
+    query = (select(*(getattr(PriceHistory, name) for name in HISTORY_COLUMNS if name != 'category'),
+                    Product.category)
+             .join(Product, Product.product_id == PriceHistory.product_id))
+    with engine.connect() as conn:
+        history = pd.DataFrame(conn.execute(query).all(), columns=[c.name for c in query.selected_columns])
+    train_model(history, n_estimators=trees, path=os.environ['MODEL_PATH'])
+
+
+async def main_async(args):
+    from api.db import dispose_engine
+    from api.main import app
+    from api.predict import predictor
+    from features import FEATURE_COLUMNS
+    rng = random.Random(0)
+    batches = [rng.sample(range(1, args.products + 1), args.batch) for _ in range(args.repeats)]
+    results = []
+
+    started = time.perf_counter()
+    predictor.load()
+    results.append(("load model (mmap)", (time.perf_counter() - started) * 1000, None))
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            # other requests keep being served while the features are built off the event loop
+            started = time.perf_counter()
+            build = asyncio.create_task(client.get("/predict", params={"product_id": 1}))
+            during_build = []
+            while not build.done():
+                request_started = time.perf_counter()
+                (await client.get("/")).raise_for_status()
+                during_build.append((time.perf_counter() - request_started) * 1000)
+                await asyncio.sleep(0.005)  # the in-process handler never yields: let the build run
+            (await build).raise_for_status()
+            results.append(("first request (feature build)", (time.perf_counter() - started) * 1000, None))
+            results.append(("GET / during the feature build",) + percentiles(during_build))
+
+            pending = iter(batches)
+            timings, _ = timed(lambda: predictor.predict_products(next(pending)), len(batches))
+            results.append((f"lookup ({args.batch})",) + percentiles(timings))
+
+            ids = ','.join(map(str, batches[0]))
+            timings, _ = await measure(client, "GET", "/predict", args.repeats, params={"product_ids": ids})
+            results.append((f"GET /predict ({args.batch} ids)",) + percentiles(timings))
+            # bodies are encoded once so the timings are the server's
+            headers = {"Content-Type": "application/json"}
+            body = json.dumps({"product_ids": batches[0]})
+            timings, _ = await measure(client, "POST", "/predict/batch", args.repeats, content=body, headers=headers)
+            results.append((f"POST /predict/batch ({args.batch} ids)",) + percentiles(timings))
+            idx, _ = predictor.lookup(batches[0])
+            body = json.dumps({"rows": [dict(zip(FEATURE_COLUMNS, map(float, row))) for row in predictor.matrix[idx]]})
+            timings, _ = await measure(client, "POST", "/predict/batch", args.repeats, content=body, headers=headers)
+            results.append((f"POST /predict/batch ({args.batch} rows)",) + percentiles(timings))
+    finally:
+        await dispose_engine()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--observations", type=int, default=10, help="price rows per product")
+    parser.add_argument("--batch", type=int, default=1000, help="products per request")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--reuse", action="store_true", help="reuse the database and model from a previous run")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        from models import engine
+        from synthetic_data import populate
+        populate(engine, args.products, args.observations, force=FORCE_POPULATE)
+        train(engine, args.trees)
+
+    results = asyncio.run(main_async(args))
+    print(f"{args.products} products x {args.observations} observations, {args.trees} trees, "
+          f"{args.repeats} repeats")
+    print(f"{'step':36s} {'p50 ms':>8s} {'p99 ms':>8s}")
+    for label, p50, p99 in results:
+        print(f"{label:36s} {p50:8.1f} {'' if p99 is None else f'{p99:8.1f}':>8s}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: /price-history payload size and latency for chart-shaped requests.
+
+Compares the raw newest-5000 page with server-side LTTB downsampling (max_points),
+time buckets (bucket/agg) and the product_ids batch form, in-process (httpx ASGI
+transport) on a synthetic SQLite database with long per-product histories.
+
+    python benchmarks/bench_price_series.py --products 20 --observations 8000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, ROOT)
+
+from common import FORCE_POPULATE, timed_async, use_bench_database  # noqa: E402
+
+use_bench_database('bench_price_series.db')
+
+import httpx  # noqa: E402
+
+
+def cases(n_products):
+    ids = ','.join(str(pid) for pid in range(1, n_products + 1))
+    return [
+        ("raw page (limit=5000)", ["/price-history?product_id=1&limit=5000"]),
+        ("max_points=500 (LTTB)", ["/price-history?product_id=1&max_points=500"]),
+        ("bucket=week&agg=ohlc", ["/price-history?product_id=1&bucket=week&agg=ohlc"]),
+        ("bucket=day&max_points=300", ["/price-history?product_id=1&bucket=day&agg=avg&max_points=300"]),
+        (f"{n_products} x raw pages", [f"/price-history?product_id={pid}&limit=5000"
+                                       for pid in range(1, n_products + 1)]),
+        (f"product_ids ({n_products}), week", [f"/price-history?product_ids={ids}&bucket=week"]),
+    ]
+
+
+async def fetch_all(client, urls, repeats):
+    """Median milliseconds to fetch every url in turn, and the bytes received."""
+    async def fetch():
+        size = 0
+        for url in urls:
+            response = await client.get(url)
+            response.raise_for_status()
+            size += len(response.content)
+        return size
+    timings, size = await timed_async(fetch, repeats)
+    return statistics.median(timings), size
+
+
+async def main_async(args):
+    from api.db import dispose_engine
+    from api.main import app
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for label, urls in cases(args.products):
+                results.append((label,) + await fetch_all(client, urls, args.repeats))
+    finally:
+        await dispose_engine()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--observations", type=int, default=8000, help="price rows per product")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="reuse the database from a previous run")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        from models import engine
+        from synthetic_data import populate
+        populate(engine, args.products, args.observations, force=FORCE_POPULATE)
+
+    results = asyncio.run(main_async(args))
+    print(f"{args.products} products x {args.observations} observations")
+    print(f"{'request':32s} {'median ms':>10s} {'payload KiB':>12s}")
+    for label, median_ms, size in results:
+        print(f"{label:32s} {median_ms:10.1f} {size / 1024:12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: category/brand/trend statistics from the price_rollup cube vs. the raw aggregate.
+
+Populates SQLite with --products products x --days daily observations, then times:
+- raw: the aggregates over every price_history row joined to products (what /categories
+  computed per request), per category, per brand within a category and per day
+- cube: the /categories, /brands and /analytics/trends endpoints, reading price_rollup
+- the ETL's cost of keeping the cube current (refresh_rollup for one more day's load), the
+  reconciliation check (rollup.py --check) on the refreshed cube and a full rebuild
+
+    python benchmarks/bench_rollup.py --products 20000 --days 90
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, ROOT)
+
+from common import FORCE_POPULATE, timed, use_bench_database  # noqa: E402
+
+use_bench_database('bench_rollup.db')
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from models import PriceHistory, Product, get_engine  # noqa: E402
+from rollup import high_water_marks, rebuild_rollup, reconcile, refresh_rollup  # noqa: E402
+from api.db import dispose_engine, open_session  # noqa: E402
+from api.main import analytics_trends, get_brands, get_categories  # noqa: E402
+
+# One loop for every endpoint call so pooled async connections are reused between runs
+loop = asyncio.new_event_loop()
+
+
+def endpoint(fn, **params):
+    async def run():
+        async with open_session() as session:
+            return await fn.__wrapped__(request=None, session=session, **params)
+    return lambda: loop.run_until_complete(run())
+
+
+def raw(*keys, **filters):
+    """The statistics straight from price_history, grouped by `keys` (Product columns or 'day')."""
+    columns = [func.date(PriceHistory.scraped_at) if key == 'day' else getattr(Product, key) for key in keys]
+    query = (
+        select(*columns, func.count(func.distinct(PriceHistory.product_id)), func.count(),
+               func.avg(PriceHistory.price), func.min(PriceHistory.price), func.max(PriceHistory.price),
+               func.avg(PriceHistory.discount_pct), func.avg(PriceHistory.in_stock))
+        .join(Product, Product.product_id == PriceHistory.product_id)
+        .group_by(*columns)
+    )
+    for key, value in filters.items():
+        query = query.where(getattr(Product, key) == value)
+
+    def run():
+        with get_engine().connect() as conn:
+            return conn.execute(query).all()
+    return run
+
+
+def median_ms(fn, repeat):
+    return statistics.median(timed(fn, repeat)[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="reuse the database from a previous run")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if not args.reuse:
+        from synthetic_data import populate
+        started = time.perf_counter()
+        written = populate(engine, args.products, args.days, force=FORCE_POPULATE)
+        print(f"Generated {written:,} price rows in {time.perf_counter() - started:.1f}s")
+    with engine.connect() as conn:
+        category, brand = conn.execute(
+            select(Product.category, Product.brand).where(Product.brand != 'Unknown').limit(1)).one()
+        rows = conn.execute(select(func.count()).select_from(PriceHistory)).scalar()
+
+    try:
+        print(f"{rows:,} price rows; category {category!r}, brand {brand!r}")
+        print(f"{'statistics':28s} {'raw ms':>10s} {'cube ms':>10s} {'speedup':>8s}")
+        pairs = {
+            "per category": (raw('category'), endpoint(get_categories)),
+            "brands in a category": (raw('brand', category=category),
+                                     endpoint(get_brands, category=category, limit=1000)),
+            "daily trend, category": (raw('day', category=category),
+                                      endpoint(analytics_trends, category=category, brand=None, bucket='day',
+                                               start_date=None, end_date=None)),
+            "weekly trend, brand": (raw('day', brand=brand),
+                                    endpoint(analytics_trends, category=None, brand=brand, bucket='week',
+                                             start_date=None, end_date=None)),
+        }
+        for label, (raw_fn, cube_fn) in pairs.items():
+            raw_ms, cube_ms = median_ms(raw_fn, args.repeat), median_ms(cube_fn, args.repeat)
+            print(f"{label:28s} {raw_ms:10.1f} {cube_ms:10.2f} {raw_ms / cube_ms:7.0f}x")
+
+        # One more day's observations of every product, as a load writes them, folded into the cube
+        columns = ['product_id', 'price', 'discount_pct', 'in_stock', 'rating', 'reviews', 'scraped_at']
+        with engine.begin() as conn:
+            newest = conn.execute(select(func.max(PriceHistory.scraped_at))).scalar()
+            day = [dict(row, scraped_at=row['scraped_at'] + timedelta(days=1)) for row in conn.execute(
+                select(*[PriceHistory.__table__.c[c] for c in columns])
+                .where(PriceHistory.scraped_at > newest - timedelta(days=1))).mappings()]
+            marks = high_water_marks(conn)
+            conn.execute(insert(PriceHistory.__table__), day)
+            started = time.perf_counter()
+            refresh_rollup(conn, marks)
+            refresh_ms = (time.perf_counter() - started) * 1000
+        print(f"\nrefresh after a {len(day):,}-row load: {refresh_ms:.1f} ms")
+        with engine.connect() as conn:
+            started = time.perf_counter()
+            differences = reconcile(conn)
+            print(f"reconciliation: {len(differences)} differences in {time.perf_counter() - started:.2f} s")
+        with engine.begin() as conn:
+            started = time.perf_counter()
+            written = rebuild_rollup(conn)
+            print(f"full rebuild: {time.perf_counter() - started:.2f} s ({written:,} cube rows)")
+    finally:
+        loop.run_until_complete(dispose_engine())
+
+
+if __name__ == '__main__':
+    main()
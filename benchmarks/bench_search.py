@@ -0,0 +1,89 @@
+"""
+Benchmark: /search latency (p50/p99) on a large synthetic catalog, against a LIKE scan.
+
+Populates SQLite with --products products (one observation each), then times /search
+end to end (httpx ASGI transport) for whole words, partial words, misspellings and a
+category filter, after timing the first request (which builds the index), and the full
+`name LIKE '%term%'` scan an exact-substring search needs without the index.
+
+    python benchmarks/bench_search.py --products 1000000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, ROOT)
+
+from common import FORCE_POPULATE, measure, percentiles, timed_async, use_bench_database  # noqa: E402
+
+use_bench_database('bench_search.db')
+
+import httpx  # noqa: E402
+
+QUERIES = [
+    ("words", {"q": "bluetooth speaker"}),
+    ("brand + noun", {"q": "novaora power bank"}),
+    ("partial word", {"q": "plantai"}),
+    ("misspelled", {"q": "bluetoth speakr"}),
+    ("misspelled, rare", {"q": "vitamn zinc tablts"}),
+    ("words + category", {"q": "smart tv", "category": "electronics"}),
+]
+
+
+async def main_async(args):
+    from sqlalchemy import func, select
+    from api.db import dispose_engine, open_session
+    from api.main import app
+    from models import Product
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            started = time.perf_counter()
+            (await client.get("/search", params={"q": "warmup"})).raise_for_status()
+            elapsed = (time.perf_counter() - started) * 1000
+            results.append(("index build (first request)", elapsed, elapsed, ""))
+            for label, params in QUERIES:
+                timings, response = await measure(client, "GET", "/search", args.repeats,
+                                                  params={**params, "limit": args.limit})
+                top = response.json()[0]["name"] if response.json() else "-"
+                results.append((f"/search {label}",) + percentiles(timings) + (top,))
+        async with open_session() as session:
+            async def count():
+                return (await session.execute(select(func.count()).where(Product.name.like("%speaker%")))).scalar()
+            timings, matches = await timed_async(count, max(args.repeats // 10, 1))
+            results.append(("LIKE '%speaker%' count",) + percentiles(timings) + (f"{matches} matches",))
+    finally:
+        await dispose_engine()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--reuse", action="store_true", help="reuse the database from a previous run")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        from models import engine
+        from synthetic_data import populate
+        started = time.perf_counter()
+        populate(engine, args.products, 1, force=FORCE_POPULATE)
+        print(f"Generated and indexed {args.products} products in {time.perf_counter() - started:.1f}s")
+
+    results = asyncio.run(main_async(args))
+    print(f"{args.products} products, limit {args.limit}, {args.repeats} repeats")
+    print(f"{'request':28s} {'p50 ms':>8s} {'p99 ms':>8s}  top result")
+    for label, p50, p99, top in results:
+        print(f"{label:28s} {p50:8.1f} {p99:8.1f}  {top}")
+
+
+if __name__ == '__main__':
+    main()
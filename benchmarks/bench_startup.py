@@ -0,0 +1,155 @@
+"""
+Benchmark: API cold start, as import time and time to first response.
+
+Each measurement runs in a fresh interpreter, --repeats times (median and max reported):
+- import: `python -X importtime -c "import api.main"`; the total and the slowest modules
+  imported by the api package. scikit-learn and pandas must not be among them: the price
+  model, the /predict features and the /search index are built in the background after
+  startup, and the script exits non-zero when either is imported
+- first response: a fresh `uvicorn api.main:app` process, from spawn until GET / answers,
+  and until the first database-backed request (GET /products) answers
+
+The API serves a small synthetic database. With --max-import-ms / --max-first-response-ms
+the script exits non-zero when a median exceeds the budget, so startup regressions (a heavy
+import at module level, work moved back into the import path) fail a CI step.
+
+    python benchmarks/bench_startup.py --max-import-ms 1500 --max-first-response-ms 3000
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, ROOT)
+
+from common import FORCE_POPULATE, use_bench_database  # noqa: E402
+
+use_bench_database('bench_startup.db')
+
+import httpx  # noqa: E402
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+DEFERRED_IMPORTS = ('sklearn', 'pandas')  # loaded after startup, never by `import api.main`
+
+
+def import_profile():
+    """(total ms, {module: cumulative ms} for modules imported by api.*, DEFERRED_IMPORTS imported)
+    of one fresh `import api.main`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import api.main'],
+                            cwd=ROOT, capture_output=True, text=True, env=os.environ.copy())
+    if result.returncode:
+        raise RuntimeError(f"import api.main failed:\n{result.stderr[-2000:]}")
+    # a module's line follows the lines of the modules it imported (indented one level deeper)
+    total, modules, children, deferred = 0.0, {}, [], set()
+    for match in IMPORT_LINE.finditer(result.stderr):
+        cumulative, indent, name = int(match[2]) / 1000, len(match[3]), match[4]
+        if name in DEFERRED_IMPORTS:
+            deferred.add(name)
+        if indent == 3:
+            children.append((name, cumulative))
+        elif indent == 1:  # top level: interpreter startup, then the api package
+            if name.split('.')[0] == 'api':
+                total += cumulative
+                for child, ms in children:
+                    modules[child] = modules.get(child, 0.0) + ms
+            children = []
+    return total, modules, sorted(deferred)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def first_response(timeout=60):
+    """(ms until GET / answers, ms until GET /products answers) for a fresh uvicorn process."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT, env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        with httpx.Client(base_url=f'http://127.0.0.1:{port}', timeout=timeout) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited:\n{server.stderr.read().decode()[-2000:]}")
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"no response within {timeout}s")
+                try:
+                    client.get('/').raise_for_status()
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = (time.perf_counter() - started) * 1000
+            client.get('/products', params={'limit': 20}).raise_for_status()
+            return ready, (time.perf_counter() - started) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summary(timings):
+    return float(np.median(timings)), float(np.max(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports listed")
+    parser.add_argument("--max-import-ms", type=float, help="fail when the median import time exceeds this")
+    parser.add_argument("--max-first-response-ms", type=float,
+                        help="fail when the median time to the first GET /products response exceeds this")
+    parser.add_argument("--reuse", action="store_true", help="reuse the database from a previous run")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        from models import create_tables, get_engine
+        from synthetic_data import populate
+        create_tables()
+        populate(get_engine(), args.products, 2, force=FORCE_POPULATE)
+        print(f"Generated {args.products} products")
+
+    profiles = [import_profile() for _ in range(args.repeats)]
+    totals = [total for total, _, _ in profiles]
+    modules = {name: float(np.median([p[1].get(name, 0.0) for p in profiles])) for name in profiles[-1][1]}
+    starts = [first_response() for _ in range(args.repeats)]
+
+    print(f"{args.repeats} fresh processes per measurement")
+    print(f"{'measurement':36s} {'median ms':>10s} {'max ms':>10s}")
+    results = {
+        'import api.main': summary(totals),
+        'uvicorn spawn -> GET /': summary([ready for ready, _ in starts]),
+        'uvicorn spawn -> GET /products': summary([first for _, first in starts]),
+    }
+    for label, (median, worst) in results.items():
+        print(f"{label:36s} {median:10.1f} {worst:10.1f}")
+    deferred = sorted({name for profile in profiles for name in profile[2]})
+    heavy = ', '.join(deferred) + ' imported' if deferred else 'no scikit-learn or pandas'
+    print(f"\nSlowest imports under api ({heavy}):")
+    for name, ms in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:34s} {ms:10.1f}")
+
+    failed = [f"{name} imported by api.main" for name in deferred]
+    if args.max_import_ms and results['import api.main'][0] > args.max_import_ms:
+        failed.append(f"import {results['import api.main'][0]:.0f} ms > {args.max_import_ms:.0f} ms")
+    first = results['uvicorn spawn -> GET /products'][0]
+    if args.max_first_response_ms and first > args.max_first_response_ms:
+        failed.append(f"first response {first:.0f} ms > {args.max_first_response_ms:.0f} ms")
+    if failed:
+        print("\nStartup budget exceeded: " + "; ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: feature building, training and model loading time and memory per row count.
+
+Generates a synthetic price history (data_collection/synthetic_data.py, one run per day),
+then for each row count, in a fresh subprocess so peak RSS is per size: builds the features,
+fits the forest with n_jobs=1 and n_jobs=-1, refits incrementally on one new day of data,
+and loads the saved model with and without memory-mapping.
+
+    python benchmarks/bench_training.py --rows 50000 200000 --trees 50
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, os.path.join(ROOT, 'ml'))
+
+from common import timed  # noqa: E402
+from synthetic_data import generate_catalog, iter_observations  # noqa: E402
+
+OBSERVATIONS = 40  # per product; the last day is held back for the incremental refit
+
+
+def synthetic_history(n_rows, seed=42):
+    """features.HISTORY_COLUMNS for about n_rows observations: OBSERVATIONS daily runs."""
+    catalog = generate_catalog(max(1, n_rows // OBSERVATIONS), seed)
+    history = pd.concat([frame for _, frame in iter_observations(catalog, OBSERVATIONS, seed=seed)],
+                        ignore_index=True)
+    history["category"] = history["product_id"].map(catalog.set_index("product_id")["category"])
+    return history
+
+
+def seconds(timings):
+    return timings[0] / 1000
+
+
+def run_size(n_rows, trees):
+    """One row count; prints a JSON result line."""
+    from features import build_features
+    from model import load_model, refit_model, train_model
+    history = synthetic_history(n_rows)
+    cutoff = history["scraped_at"].max().normalize()  # the day of the last run
+    older = history[history["scraped_at"] < cutoff]
+    path = os.path.join(tempfile.gettempdir(), f"bench_training_{n_rows}.joblib")
+
+    features, _ = timed(lambda: build_features(older), 1)
+    fit_1, _ = timed(lambda: train_model(older, n_estimators=trees, n_jobs=1, save=False), 1)
+    fit_all, bundle = timed(lambda: train_model(older, n_estimators=trees, n_jobs=-1, path=path), 1)
+    refit, _ = timed(lambda: refit_model(bundle, history, path=path), 1)
+    load, _ = timed(lambda: load_model(path, mmap=False), 1)
+    load_mmap, _ = timed(lambda: load_model(path, mmap=True), 1)
+    print(json.dumps({
+        "rows": len(older), "features_s": seconds(features), "fit_n_jobs_1_s": seconds(fit_1),
+        "fit_n_jobs_all_s": seconds(fit_all), "refit_s": seconds(refit), "load_s": seconds(load),
+        "load_mmap_s": seconds(load_mmap),
+        "model_mib": os.path.getsize(path) / 2**20,
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[25000, 50000, 100000])
+    parser.add_argument("--trees", type=int, default=50)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_size(args.worker, args.trees)
+        return
+
+    print(f"{os.cpu_count()} CPUs, {args.trees} trees")
+    print(f"{'rows':>8s} {'features s':>10s} {'fit 1 job':>10s} {'fit all':>8s} {'refit s':>8s} "
+          f"{'load s':>7s} {'mmap s':>7s} {'model MiB':>9s} {'peak MiB':>9s}")
+    for n_rows in args.rows:
+        output = subprocess.run([sys.executable, __file__, "--worker", str(n_rows), "--trees", str(args.trees)],
+                                check=True, capture_output=True, text=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{r['rows']:8d} {r['features_s']:10.2f} {r['fit_n_jobs_1_s']:10.2f} {r['fit_n_jobs_all_s']:8.2f} "
+              f"{r['refit_s']:8.2f} {r['load_s']:7.3f} {r['load_mmap_s']:7.3f} {r['model_mib']:9.1f} "
+              f"{r['peak_rss_mib']:9.0f}")
+
+
+if __name__ == '__main__':
+    main()
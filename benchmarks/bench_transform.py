@@ -0,0 +1,129 @@
+"""
+Benchmark: ETL transform stage on a synthetic scrape (default 1M rows).
+
+- legacy:     drop_duplicates/fillna/to_numeric, then iterrows() to build the load records
+- vectorized: transform.clean() (canonical categoricals, product keys, sanity checks, compact
+              dtypes) and transform.load_columns() zipped into records
+
+Reports wall time, tracemalloc peak and the size of the cleaned frame. No database is touched.
+
+    python benchmarks/bench_transform.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+from common import use_bench_database  # noqa: E402
+
+use_bench_database('bench_transform.db')
+
+from transform import clean, load_columns  # noqa: E402
+
+CATEGORIES = [
+    "snacks", "beverages", "dairies", "personal-care", "dietary-supplements",
+    "electronics", "fashion-women", "fashion-men", "home-living", "phones-accessories"
+]
+WORDS = ["Classic", "Premium", "Original", "Fresh", "Organic", "Smart", "Wireless", "Cotton",
+         "Pack", "Bottle", "Phone", "Cream", "Juice", "Shirt", "Lamp", "Rice"]
+
+
+def synthetic_scrape(n_rows, seed=42):
+    """Raw scrape records as pd.read_json returns them, with the messiness the scrapers produce:
+    ~5% repeated products with spacing/case variants, brand spelling variants and placeholders,
+    missing or zero prices and out-of-range discounts."""
+    rng = np.random.default_rng(seed)
+    n_products = int(n_rows * 0.95)
+    product = np.concatenate([np.arange(n_products), rng.integers(0, n_products, n_rows - n_products)])
+    words = np.array(WORDS, dtype=object)
+    names = (words[product % len(WORDS)] + " " + words[(product // len(WORDS)) % len(WORDS)] + " "
+             + product.astype(str).astype(object))
+    repeated = np.arange(n_rows) >= n_products
+    names[repeated] = np.char.upper(names[repeated].astype(str)).astype(object) + "  "
+    brand_ids = rng.integers(0, 500, n_rows)
+    brands = ("Brand " + brand_ids.astype(str).astype(object))
+    variant = rng.random(n_rows)
+    brands[variant < 0.05] = " " + brands[variant < 0.05] + " "
+    brands[(variant >= 0.05) & (variant < 0.15)] = None
+    brands[(variant >= 0.15) & (variant < 0.17)] = "N/A"
+    prices = np.round(rng.uniform(500, 50000, n_rows), 2).astype(object)
+    prices[rng.random(n_rows) < 0.01] = None
+    prices[rng.random(n_rows) < 0.005] = 0
+    discounts = rng.choice([0, 0, 0, 10, 25, 150], n_rows)
+    categories = np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), n_rows)]
+    return pd.DataFrame({
+        "name": names,
+        "brand": brands,
+        "price": prices,
+        "discount_pct": discounts,
+        "rating": np.round(rng.uniform(0, 5, n_rows), 1),
+        "reviews": rng.integers(0, 2000, n_rows),
+        "in_stock": rng.random(n_rows) > 0.05,
+        "category": categories,
+        "link": "https://www.jumia.com.ng/p-" + product.astype(str).astype(object) + ".html",
+    })
+
+
+def legacy_transform(df):
+    """The transform stage before vectorization, minus the database round trips."""
+    df = df.drop_duplicates(subset=["name", "brand", "category"])
+    df = df.fillna({"brand": "Unknown", "discount_pct": 0, "rating": 0, "reviews": 0, "in_stock": True})
+    df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0)
+    df["discount_pct"] = pd.to_numeric(df["discount_pct"], errors="coerce").fillna(0)
+    df["rating"] = pd.to_numeric(df["rating"], errors="coerce").fillna(0)
+    df["reviews"] = pd.to_numeric(df["reviews"], errors="coerce").fillna(0)
+    records = []
+    for _, row in df.iterrows():
+        records.append({
+            "name": row["name"], "brand": row["brand"], "category": row["category"],
+            "link": row.get("link", None), "price": row["price"], "discount_pct": row["discount_pct"],
+            "in_stock": bool(row["in_stock"]), "rating": row["rating"], "reviews": int(row["reviews"])
+        })
+    return df, records
+
+
+def vectorized_transform(df):
+    df = clean(df)
+    cols = load_columns(df)
+    records = [dict(zip(cols, values)) for values in zip(*cols.values())]
+    return df, records
+
+
+def profile(transform, raw):
+    tracemalloc.start()
+    started = time.perf_counter()
+    df, records = transform(raw.copy())
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, df.memory_usage(deep=True).sum(), len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="the iterrows() baseline takes minutes at 1M rows")
+    args = parser.parse_args()
+
+    raw = synthetic_scrape(args.rows)
+    print(f"{args.rows:,} synthetic scrape rows ({raw.memory_usage(deep=True).sum() / 2**20:,.0f} MiB raw)")
+    runs = [("vectorized", vectorized_transform)]
+    if not args.skip_legacy:
+        runs.insert(0, ("legacy", legacy_transform))
+    results = [(label,) + profile(transform, raw) for label, transform in runs]
+
+    print(f"{'transform':12s} {'seconds':>9s} {'peak MiB':>9s} {'frame MiB':>10s} {'records':>10s}")
+    for label, elapsed, peak, frame_bytes, n_records in results:
+        print(f"{label:12s} {elapsed:9.2f} {peak / 2**20:9.0f} {frame_bytes / 2**20:10.0f} {n_records:10,d}")
+    if len(results) == 2:
+        print(f"speedup: {results[0][1] / results[1][1]:.1f}x, peak memory: {results[0][2] / results[1][2]:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
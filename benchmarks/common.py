@@ -0,0 +1,74 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks drop and recreate every table, so they never touch the shell's DATABASE_URL
+(the ETL's database): each script points DATABASE_URL at BENCH_DATABASE_URL when that is
+set, else at its own SQLite file in the temp directory. Setting BENCH_DATABASE_URL is the
+explicit go-ahead to recreate that database, so populate() may run on it even when it is
+not SQLite. MODEL_PATH is likewise pointed at a temp file, so training benchmarks never
+overwrite the served model.
+
+The timing helpers below report milliseconds per call.
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+FORCE_POPULATE = bool(os.environ.get('BENCH_DATABASE_URL'))
+_selected = {}
+
+
+def use_bench_database(filename, model_filename='bench_model.joblib'):
+    """Point DATABASE_URL (and the API's engine) and MODEL_PATH at the benchmark's own files;
+    returns the database URL. Paths are relative to the temp directory unless absolute.
+
+    The first call in a process wins, so run_suite keeps its database when it imports
+    functions from the other benchmark scripts.
+    """
+    if not _selected:
+        _selected['DATABASE_URL'] = (os.environ.get('BENCH_DATABASE_URL')
+                                     or f"sqlite:///{os.path.join(tempfile.gettempdir(), filename)}")
+        _selected['MODEL_PATH'] = os.path.join(tempfile.gettempdir(), model_filename)
+    os.environ.update(_selected)
+    os.environ.pop('ASYNC_DATABASE_URL', None)
+    return _selected['DATABASE_URL']
+
+
+def percentiles(timings):
+    """(p50, p99) of a list of milliseconds."""
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+
+def timed(fn, repeats):
+    """Milliseconds of each of `repeats` calls of fn(), and the last call's result."""
+    timings, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, result
+
+
+async def timed_async(fn, repeats, before=None):
+    """timed() for a coroutine function; `before()`, e.g. clearing a cache, runs untimed
+    ahead of each call."""
+    timings, result = [], None
+    for _ in range(repeats):
+        if before:
+            before()
+        started = time.perf_counter()
+        result = await fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, result
+
+
+async def measure(client, method, url, repeats, before=None, **kwargs):
+    """timed_async() of `repeats` requests (any error status raises): milliseconds of each,
+    and the last response."""
+    async def request():
+        response = await client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+    return await timed_async(request, repeats, before)
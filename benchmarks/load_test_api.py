@@ -0,0 +1,116 @@
+"""
+Load test: concurrent requests against the API, reporting p50/p99 latency and requests/second.
+
+By default the app runs in-process (httpx ASGI transport) on a synthetic SQLite database
+served through aiosqlite; pass --base-url to target a running server instead.
+
+    python benchmarks/load_test_api.py --concurrency 32 --requests 2000
+    DB_POOL_SIZE=4 python benchmarks/load_test_api.py      # compare pool settings
+    python benchmarks/load_test_api.py --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, ROOT)
+
+from common import FORCE_POPULATE, use_bench_database  # noqa: E402
+
+use_bench_database('load_test_api.db')
+
+import httpx  # noqa: E402
+
+ENDPOINTS = [
+    "/products?category=electronics&limit=100",
+    "/price-history?product_id={product_id}",
+    "/categories",
+    "/top-rated?limit=20",
+    "/most-reviewed?limit=20&category=snacks",
+    "/analytics/summary",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_load(client, n_requests, concurrency, n_products):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    queue = asyncio.Queue()
+    rng = random.Random(7)
+    for i in range(n_requests):
+        queue.put_nowait(ENDPOINTS[i % len(ENDPOINTS)])
+
+    async def worker():
+        while not queue.empty():
+            template = queue.get_nowait()
+            url = template.format(product_id=rng.randint(1, n_products))
+            started = time.perf_counter()
+            response = await client.get(url)
+            latencies[template].append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors[template] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(latencies, errors, elapsed):
+    print(f"{'endpoint':45s} {'n':>6s} {'p50 ms':>9s} {'p99 ms':>9s} {'errors':>7s}")
+    for template, values in latencies.items():
+        print(f"{template:45s} {len(values):6d} {statistics.median(values):9.2f} "
+              f"{percentile(values, 99):9.2f} {errors[template]:7d}")
+    everything = [v for values in latencies.values() for v in values]
+    print(f"{'all':45s} {len(everything):6d} {statistics.median(everything):9.2f} "
+          f"{percentile(everything, 99):9.2f} {sum(errors.values()):7d}")
+    print(f"\n{len(everything) / elapsed:,.1f} requests/s over {elapsed:.2f}s")
+
+
+async def main_async(args):
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+            return await run_load(client, args.requests, args.concurrency, args.products)
+
+    from api.db import dispose_engine
+    from api.main import app
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            return await run_load(client, args.requests, args.concurrency, args.products)
+    finally:
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--observations", type=int, default=10, help="price rows per product")
+    parser.add_argument("--reuse", action="store_true", help="reuse the database from a previous run")
+    parser.add_argument("--base-url", help="target a running API instead of the in-process app")
+    args = parser.parse_args()
+
+    if not args.base_url and not args.reuse:
+        from models import engine
+        from synthetic_data import populate
+        populate(engine, args.products, args.observations, force=FORCE_POPULATE)
+
+    latencies, errors, elapsed = asyncio.run(main_async(args))
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    report(latencies, errors, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+"""
+Benchmark suite: ETL load throughput, API endpoint latency and dashboard data loading on SQLite.
+
+Data comes from data_collection/synthetic_data.py, so a run is reproducible at any scale:
+- etl: every synthetic scrape run cleaned and loaded with load_bulk (one committed load per
+  run), storing every observation and with --changes-only; rows/s
+- api: every GET/POST route of api/main.py through the ASGI app, p50/p99 with the response
+  cache cleared before each request and p50 when served from it. Routes without a case
+  are reported as uncovered
+- dashboard: dashboard/sources.py loading from the Parquet store (all / one category) and
+  the CSV export, and the live mode's API calls
+- startup: bench_startup.py's cold start, `import api.main` and a fresh uvicorn process's
+  first responses (median of --startup-repeats processes)
+
+Results are written to benchmarks/results/<timestamp>-<commit>.json; --compare prints the
+change against an earlier results file.
+
+    python benchmarks/run_suite.py --products 2000 --days 30
+    python benchmarks/run_suite.py --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import fastapi
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+sys.path.insert(0, os.path.join(ROOT, 'ml'))
+sys.path.insert(0, os.path.join(ROOT, 'dashboard'))
+sys.path.insert(0, ROOT)
+
+WORK_DIR = os.path.join(tempfile.gettempdir(), 'bench_suite')
+os.makedirs(WORK_DIR, exist_ok=True)
+
+from common import FORCE_POPULATE, measure, percentiles, timed, timed_async, use_bench_database  # noqa: E402
+
+use_bench_database(os.path.join(WORK_DIR, 'suite.db'), os.path.join(WORK_DIR, 'price_model.joblib'))
+
+import httpx  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def summary(timings):
+    p50, p99 = percentiles(timings)
+    return {'p50_ms': round(p50, 3), 'p99_ms': round(p99, 3)}
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    try:
+        return git('rev-parse', '--short', 'HEAD') or 'unknown', bool(git('status', '--porcelain', '--untracked-files=no'))
+    except OSError:
+        return 'unknown', False
+
+
+def bench_etl(args):
+    """Load every synthetic scrape run the way the ETL does, once per storage mode."""
+    from models import Base, SessionLocal, engine
+    from synthetic_data import iter_scrapes
+    from transform import bump_data_version, clean, load_bulk
+
+    results = {}
+    for mode, changes_only in (('full', False), ('changes_only', True)):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        records = written = 0
+        elapsed = 0.0
+        for run_started, scrape in iter_scrapes(args.products, args.days * args.runs_per_day, args.runs_per_day,
+                                                args.seed):
+            started = time.perf_counter()
+            with SessionLocal() as session, contextlib.redirect_stdout(io.StringIO()):
+                _, prices = load_bulk(session, clean(scrape), scraped_at=run_started, changes_only=changes_only)
+                bump_data_version(session)
+                session.commit()
+            elapsed += time.perf_counter() - started
+            records += len(scrape)
+            written += prices
+        results[mode] = {'records': records, 'rows_written': written, 'seconds': round(elapsed, 3),
+                         'records_per_s': round(records / elapsed), 'rows_per_s': round(written / elapsed)}
+        print(f"etl {mode:13s} {records:>9,} records -> {written:>9,} rows in {elapsed:6.1f}s "
+              f"({records / elapsed:,.0f} records/s)")
+    return results
+
+
+def api_cases(sample):
+    """(route, label, method, request kwargs) for every endpoint case."""
+    pid, name, brand, category = sample
+    ids = ','.join(str(i) for i in range(1, 51))
+    title = name.split(' {')[0]  # synthetic names end with their SKU
+    longest = max(title.split(), key=len)
+    return [
+        ('/', '/', 'GET', {}),
+        ('/metrics', '/metrics', 'GET', {}),
+        ('/data-version', '/data-version', 'GET', {}),
+        ('/products', '/products', 'GET', {}),
+        ('/products', '/products?category&brand', 'GET', {'params': {'category': category, 'brand': brand}}),
+        ('/products', '/products?min_price&max_price', 'GET', {'params': {'min_price': 1000, 'max_price': 5000}}),
+        ('/products', '/products?format=csv&limit=1000', 'GET', {'params': {'format': 'csv', 'limit': 1000}}),
+        ('/price-history', '/price-history?product_id', 'GET', {'params': {'product_id': pid}}),
+        ('/price-history', '/price-history?product_name', 'GET', {'params': {'product_name': name}}),
+        ('/price-history', '/price-history?product_id&max_points=100', 'GET',
+         {'params': {'product_id': pid, 'max_points': 100}}),
+        ('/price-history', '/price-history?product_ids(50)&bucket=week', 'GET',
+         {'params': {'product_ids': ids, 'bucket': 'week'}}),
+        ('/search', '/search?q', 'GET', {'params': {'q': title}}),
+        ('/search', '/search?q(misspelled)&category', 'GET',
+         {'params': {'q': longest[:-2] + longest[-1], 'category': category}}),
+        ('/alerts', '/alerts', 'GET', {}),
+        ('/alerts', '/alerts?kind&category', 'GET', {'params': {'kind': 'price_drop', 'category': category}}),
+        ('/categories', '/categories', 'GET', {}),
+        ('/brands', '/brands?category', 'GET', {'params': {'category': category}}),
+        ('/analytics/trends', '/analytics/trends?category', 'GET', {'params': {'category': category}}),
+        ('/analytics/trends', '/analytics/trends?brand&bucket=week', 'GET',
+         {'params': {'brand': brand, 'bucket': 'week'}}),
+        ('/top-rated', '/top-rated', 'GET', {}),
+        ('/top-rated', '/top-rated?category', 'GET', {'params': {'category': category}}),
+        ('/most-reviewed', '/most-reviewed', 'GET', {}),
+        ('/analytics/summary', '/analytics/summary', 'GET', {}),
+        ('/analytics/summary', '/analytics/summary?group_by=brand', 'GET', {'params': {'group_by': 'brand'}}),
+        ('/predict', '/predict?product_id', 'GET', {'params': {'product_id': pid}}),
+        ('/predict', '/predict?product_ids(50)', 'GET', {'params': {'product_ids': ids}}),
+        ('/predict/batch', 'POST /predict/batch (50 ids)', 'POST',
+         {'content': json.dumps({'product_ids': list(range(1, 51))}),
+          'headers': {'Content-Type': 'application/json'}}),
+    ]
+
+
+async def bench_api_async(args, sample):
+    from fastapi.routing import APIRoute
+    from api.cache import response_cache
+    from api.db import dispose_engine
+    from api.main import app
+    from api.predict import predictor
+    from sources import LIVE_REQUESTS
+
+    predictor.load()  # the ASGI transport does not run the lifespan
+    cases = api_cases(sample)
+    results = {}
+    dashboard = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=120) as client:
+            for route, label, method, kwargs in cases:
+                await measure(client, method, route, 1, **kwargs)  # warm-up (feature and search index builds, pool)
+                timings, _ = await measure(client, method, route, args.repeats, response_cache.backend.clear, **kwargs)
+                result = summary(timings)
+                cached, _ = await measure(client, method, route, args.repeats, **kwargs)
+                result['cached_p50_ms'] = summary(cached)['p50_ms']
+                results[label] = result
+                print(f"api {label:50s} {result['p50_ms']:8.2f} {result['p99_ms']:8.2f} "
+                      f"{result['cached_p50_ms']:8.2f}")
+
+            async def render():
+                for path, params in LIVE_REQUESTS:
+                    (await client.get(path, params=params)).raise_for_status()
+
+            async def live_render(clear_cache):
+                before = response_cache.backend.clear if clear_cache else None
+                timings, _ = await timed_async(render, args.repeats, before)
+                return timings
+            dashboard['live first render'] = summary(await live_render(True))
+            dashboard['live rerun (cached)'] = summary(await live_render(False))
+            for label, result in dashboard.items():
+                print(f"dashboard {label:44s} {result['p50_ms']:8.2f} {result['p99_ms']:8.2f}")
+    finally:
+        await dispose_engine()
+
+    covered = {route for route, *_ in cases}
+    uncovered = sorted(
+        f"{method} {route.path}" for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods & {'GET', 'POST'} if route.path not in covered
+    )
+    for route in uncovered:
+        print(f"api {route:50s} no benchmark case")
+    return results, uncovered, dashboard
+
+
+def bench_api(args):
+    from sqlalchemy import select
+    from models import Product, engine
+    from synthetic_data import populate
+    from bench_predict import train
+
+    started = time.perf_counter()
+    written = populate(engine, args.products, args.days * args.runs_per_day, args.runs_per_day, seed=args.seed,
+                       force=FORCE_POPULATE)
+    print(f"api data: {args.products:,} products / {written:,} price rows in {time.perf_counter() - started:.1f}s")
+    with contextlib.redirect_stdout(io.StringIO()):
+        train(engine, args.trees)
+    with engine.connect() as conn:
+        sample = conn.execute(
+            select(Product.product_id, Product.name, Product.brand, Product.category)
+            .where(Product.brand != 'Unknown').order_by(Product.product_id).limit(1)
+        ).one()
+    return asyncio.run(bench_api_async(args, tuple(sample)))
+
+
+def bench_dashboard(args):
+    """Local-mode loads; run after bench_api, on the database it populated."""
+    from parquet_store import read_latest
+    from sources import PRODUCT_COLUMNS, load_local_products, local_categories
+    from transform import export_parquet
+
+    store = os.path.join(WORK_DIR, 'price_history')
+    csv_path = os.path.join(WORK_DIR, 'products.csv')
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        export_parquet(path=store)
+    results = {'parquet export': {'seconds': round(time.perf_counter() - started, 3)}}
+    print(f"dashboard parquet export in {results['parquet export']['seconds']:.2f}s")
+    read_latest(PRODUCT_COLUMNS, path=store).to_csv(csv_path, index=False)
+    category = local_categories(store)[0]
+    results['local parquet (all)'] = summary(timed(lambda: load_local_products(path=store), args.repeats)[0])
+    results['local parquet (1 category)'] = summary(timed(lambda: load_local_products([category], path=store),
+                                                          args.repeats)[0])
+    results['local csv'] = summary(timed(lambda: load_local_products(path=os.path.join(WORK_DIR, 'missing'),
+                                                                     csv_path=csv_path), args.repeats)[0])
+    for label, result in results.items():
+        if 'p50_ms' in result:
+            print(f"dashboard {label:44s} {result['p50_ms']:8.2f} {result['p99_ms']:8.2f}")
+    return results
+
+
+def bench_startup(args):
+    """Cold start of the API on the suite's database (created empty when the api part did not run)."""
+    from models import create_tables
+    from bench_startup import first_response, import_profile
+
+    create_tables()
+    imports = [import_profile()[0] for _ in range(args.startup_repeats)]
+    starts = [first_response() for _ in range(args.startup_repeats)]
+    results = {}
+    for label, timings in (('import api.main', imports), ('uvicorn spawn -> GET /', [s[0] for s in starts]),
+                           ('uvicorn spawn -> GET /products', [s[1] for s in starts])):
+        results[label] = {'median_ms': round(float(np.median(timings)), 1),
+                          'max_ms': round(float(np.max(timings)), 1)}
+        print(f"startup {label:44s} {results[label]['median_ms']:8.1f} {results[label]['max_ms']:8.1f}")
+    return results
+
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{key} | ')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f'{prefix}{key}', value
+
+
+def compare(old, new, threshold):
+    """Print every metric present in both runs; flag changes beyond `threshold` (a fraction)."""
+    parts = ('etl', 'api', 'dashboard', 'startup')
+    old_values = dict(flatten({k: old[k] for k in parts if k in old}))
+    new_values = dict(flatten({k: new[k] for k in parts if k in new}))
+    print(f"\nComparing with {old['meta']['commit']} ({old['meta']['timestamp']})")
+    scale = ('products', 'days', 'runs_per_day', 'seed', 'trees')
+    if any(old['meta'].get(key) != new['meta'].get(key) for key in scale):
+        print("Note: the runs used different data scales or models; only rates are comparable.")
+    print(f"{'metric':80s} {'old':>10s} {'new':>10s} {'change':>8s}")
+    for key, after in new_values.items():
+        before = old_values.get(key)
+        if not before or key.endswith(('records', 'rows_written')):
+            continue
+        change = after / before - 1
+        worse = change < -threshold if key.endswith('_per_s') else change > threshold
+        better = change > threshold if key.endswith('_per_s') else change < -threshold
+        flag = '  REGRESSION' if worse else '  faster' if better else ''
+        print(f"{key:80s} {before:10.2f} {after:10.2f} {change:+8.1%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30, help="days of synthetic scrape runs")
+    parser.add_argument("--runs-per-day", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=30, help="timed requests / loads per case")
+    parser.add_argument("--trees", type=int, default=20, help="trees in the model served by /predict")
+    parser.add_argument("--startup-repeats", type=int, default=3, help="fresh processes per startup measurement")
+    parser.add_argument("--only", choices=["etl", "api", "dashboard", "startup"], action="append",
+                        help="run only these parts (repeatable; dashboard implies api)")
+    parser.add_argument("--output", default=RESULTS_DIR, help="directory for the results JSON")
+    parser.add_argument("--compare", help="an earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change flagged by --compare")
+    args = parser.parse_args()
+    parts = set(args.only or ["etl", "api", "dashboard", "startup"])
+
+    commit, dirty = git_revision()
+    now = datetime.now()
+    results = {'meta': {
+        'timestamp': now.isoformat(timespec='seconds'), 'commit': commit, 'dirty': dirty,
+        'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+        'database': 'sqlite', 'products': args.products, 'days': args.days, 'runs_per_day': args.runs_per_day,
+        'seed': args.seed, 'repeats': args.repeats, 'trees': args.trees,
+        'packages': {'numpy': np.__version__, 'pandas': pd.__version__,
+                     'sqlalchemy': sqlalchemy.__version__, 'fastapi': fastapi.__version__},
+    }}
+    if 'etl' in parts:
+        results['etl'] = bench_etl(args)
+    if parts & {'api', 'dashboard'}:
+        results['api'], results['uncovered_routes'], results['dashboard'] = bench_api(args)
+    if 'dashboard' in parts:
+        results['dashboard'].update(bench_dashboard(args))
+    if 'startup' in parts:
+        results['startup'] = bench_startup(args)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{now.strftime('%Y%m%d-%H%M%S')}-{commit}{'-dirty' if dirty else ''}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {path}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
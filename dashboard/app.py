@@ -1,14 +1,126 @@
 import streamlit as st
 import pandas as pd
+import httpx
+import plotly.express as px
 import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+from sources import has_store, load_local_products, local_categories  # noqa: E402
 
 st.title("Real-Time Jumia Price Dashboard")
 
-# Load cleaned data
-data_path = os.path.join(os.path.dirname(__file__), '..', 'etl', 'output', 'jumia_products_clean.csv')
-if os.path.exists(data_path):
-    df = pd.read_csv(data_path)
+# Live mode reads the FastAPI service; local mode reads the ETL's Parquet store / CSV export
+API_URL = os.environ.get("API_URL", "http://localhost:8000")
+DASHBOARD_SOURCE = os.environ.get("DASHBOARD_SOURCE", "local")
+MAX_POINTS = 500  # points per price chart, downsampled by the API
+
+
+@st.cache_resource
+def api_client():
+    return httpx.Client(base_url=API_URL, timeout=30)
+
+
+def data_version():
+    """Current ETL data version (one tiny request per rerun; everything else is cached on it)."""
+    response = api_client().get('/data-version')
+    response.raise_for_status()
+    return response.json()['data_version']
+
+
+@st.cache_data(max_entries=128)
+def fetch(path, version, **params):
+    """GET an API endpoint. Cached per data version, so only a new ETL load triggers a refetch."""
+    response = api_client().get(path, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def price_series(product_id, version):
+    """A product's price points: the downsampled history on first view, then on each new data
+    version only the points scraped since the newest one already held."""
+    held = st.session_state.setdefault('series', {}).get(product_id)
+    if held is not None and held['version'] == version:
+        return held['df']
+    if held is None or held['df'].empty:
+        df = pd.DataFrame(fetch('/price-history', version, product_id=product_id, max_points=MAX_POINTS))
+    else:
+        new = pd.DataFrame(fetch('/price-history', version, product_id=product_id,
+                                 start_date=held['df']['scraped_at'].max().isoformat(), limit=5000))
+        # the newest row comes back again with its valid_to extended
+        df = pd.concat([held['df'], new]).drop_duplicates('price_id', keep='last')
+    if not df.empty:
+        df['scraped_at'] = pd.to_datetime(df['scraped_at'])
+        df['valid_to'] = pd.to_datetime(df['valid_to'])
+        df = df.sort_values('scraped_at').reset_index(drop=True)
+    st.session_state['series'][product_id] = {'version': version, 'df': df}
+    return df
+
+
+def price_chart(df):
+    # Rows are run-length (one per change): draw steps and extend the last one to valid_to
+    points = pd.concat([df[['scraped_at', 'price']],
+                        pd.DataFrame({'scraped_at': [df['valid_to'].iloc[-1]], 'price': [df['price'].iloc[-1]]})])
+    points = points.dropna(subset=['scraped_at'])
+    return px.line(points, x='scraped_at', y='price', line_shape='hv', markers=True)
+
+
+def live_dashboard():
+    refresh = st.sidebar.checkbox("Auto refresh", value=True)
+    interval = st.sidebar.slider("Refresh every (s)", 5, 300, 30)
+    version = data_version()
+    st.caption(f"API {API_URL} · data version {version} · refreshed {time.strftime('%H:%M:%S')}")
+
+    summary = fetch('/analytics/summary', version)
+    cols = st.columns(4)
+    cols[0].metric("Products", f"{summary['total_products']:,}")
+    cols[1].metric("Categories", summary['total_categories'])
+    cols[2].metric("Average price", f"₦ {summary['average_price']:,.2f}")
+    cols[3].metric("Average rating", summary['average_rating'])
+
+    st.subheader("Categories")
+    by_category = pd.DataFrame(fetch('/analytics/summary', version, group_by='category'))
+    if not by_category.empty:
+        st.bar_chart(by_category.set_index('category')['average_price'])
+    st.dataframe(pd.DataFrame(fetch('/categories', version)), hide_index=True)
+
+    st.subheader("Price history")
+    top = pd.DataFrame(fetch('/top-rated', version, limit=50))
+    if not top.empty:
+        labels = dict(zip(top['product_id'], top['name']))
+        product_id = st.selectbox("Product", list(labels), format_func=lambda pid: f"{labels[pid]} (#{pid})")
+        product_id = st.number_input("…or product ID", min_value=1, value=int(product_id), step=1)
+        series = price_series(int(product_id), version)
+        if series.empty:
+            st.info("No price history for this product.")
+        else:
+            st.plotly_chart(price_chart(series), use_container_width=True)
+
+    if refresh:
+        time.sleep(interval)
+        st.rerun()
+
+
+def local_dashboard():
+    # Load cleaned data: the partitioned Parquet store (only the selected categories and the
+    # displayed columns are read), falling back to the CSV export
+    selected = st.sidebar.multiselect("Categories", local_categories()) if has_store() else None
+    df = load_local_products(selected)
+    if df is None:
+        st.warning("No data found. Please run ETL transform first.")
+        return
     st.write(f"Loaded {len(df)} products")
     st.dataframe(df.head(10))
+
+
+sources = ["api", "local"]
+source = st.sidebar.radio("Data source", sources, index=sources.index(DASHBOARD_SOURCE),
+                          format_func={"api": "Live (API)", "local": "Local export"}.get)
+if source == "api":
+    try:
+        live_dashboard()
+    except httpx.HTTPError as e:
+        st.error(f"Cannot reach the API at {API_URL}: {e}")
 else:
-    st.warning("No data found. Please run ETL transform first.")
+    local_dashboard()
@@ -0,0 +1,38 @@
+"""
+Data loading behind the dashboard, kept free of Streamlit so benchmarks can time it.
+
+- load_local_products(): newest observation per product from the ETL's Parquet store
+  (only the requested categories and PRODUCT_COLUMNS are read), falling back to the CSV export.
+- LIVE_REQUESTS: the API calls one live-mode render makes before any product is selected.
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'etl'))
+from parquet_store import PARQUET_DIR, has_store, list_partitions, read_latest  # noqa: E402
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'etl', 'output', 'jumia_products_clean.csv')
+PRODUCT_COLUMNS = ['product_id', 'name', 'brand', 'category', 'price', 'discount_pct', 'rating',
+                   'reviews', 'in_stock', 'scraped_at']
+LIVE_REQUESTS = [
+    ('/data-version', {}),
+    ('/analytics/summary', {}),
+    ('/analytics/summary', {'group_by': 'category'}),
+    ('/categories', {}),
+    ('/top-rated', {'limit': 50}),
+]
+
+
+def local_categories(path=PARQUET_DIR):
+    return sorted({category for category, _ in list_partitions(path)})
+
+
+def load_local_products(categories=None, path=PARQUET_DIR, csv_path=CSV_PATH):
+    """Products for local mode, or None when neither the Parquet store nor the CSV exists."""
+    if has_store(path):
+        return read_latest(PRODUCT_COLUMNS, categories=categories or None, path=path, arrow_dtypes=True)
+    if os.path.exists(csv_path):
+        return pd.read_csv(csv_path)
+    return None
@@ -0,0 +1,129 @@
+"""
+Offline Jumia stand-in: serves catalog pages rendered from the sample dataset so the scrapers
+can be run and benchmarked without network access.
+
+Pages use the same markup the scrapers select on (article.prd._fb, h3.name, div.prc, ...) and
+are served at /catalog/?q=<category>&page=<n>. Product pages are generated deterministically
+from test_data/sample_by_category.json; pages past --pages contain no products.
+
+    python data_collection/fixture_server.py --port 8765 --latency-ms 200
+    python data_collection/scrape_jumia_async.py --base-url http://127.0.0.1:8765
+"""
+import argparse
+import html
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), 'test_data', 'sample_by_category.json')
+ITEMS_PER_PAGE = 40
+
+
+def load_sample(path=SAMPLE_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def fixture_products(sample, category, page_num, items_per_page=ITEMS_PER_PAGE):
+    """Deterministic product records for one catalog page."""
+    rng = random.Random(f"{category}:{page_num}")
+    products = []
+    for i in range(items_per_page):
+        base = sample[(page_num * items_per_page + i) % len(sample)]
+        sku = f"{zlib.crc32(f'{category}:{page_num}:{i}'.encode()):010d}"
+        discount = rng.choice((0, 0, 0, 5, 10, 15, 30))
+        products.append({
+            "name": f"{base['name']} {category}-{page_num}-{i}",
+            "brand": base.get("brand"),
+            "price": round((base["price"] or 1000) * rng.uniform(0.8, 1.2)),
+            "discount_pct": discount,
+            "rating": base["rating"],
+            "reviews": base["reviews"],
+            "in_stock": rng.random() > 0.05,
+            "category": category,
+            "link": f"/fixture-{category}-{page_num}-{i}-{sku}.html",
+        })
+    return products
+
+
+def render_article(p):
+    parts = [f'<article class="prd _fb col c-prd"><a class="core" href="{html.escape(p["link"])}">']
+    if p["brand"]:
+        parts.append(f'<div class="brn">{html.escape(p["brand"])}</div>')
+    parts.append(f'<div class="info"><h3 class="name">{html.escape(p["name"])}</h3>')
+    parts.append(f'<div class="prc">₦ {p["price"]:,}</div>')
+    if p["discount_pct"]:
+        parts.append(f'<div class="bdg _dsct _fcm">{p["discount_pct"]}%</div>')
+    if p["rating"]:
+        parts.append(f'<div class="rev"><div class="stars _s">{p["rating"]} out of 5</div>({p["reviews"]})</div>')
+    if not p["in_stock"]:
+        parts.append('<div class="sold-out">Out of stock</div>')
+    parts.append('</div></a></article>')
+    return ''.join(parts)
+
+
+def render_catalog_page(products):
+    articles = '\n'.join(render_article(p) for p in products)
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Catalog</title></head>'
+        f'<body><section class="card -fh"><div class="-paxs row _no-g _4cl-3cm-shs">{articles}</div>'
+        '</section></body></html>'
+    )
+
+
+def make_handler(sample, max_pages, latency_ms, items_per_page):
+    class CatalogHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.rstrip('/') != '/catalog':
+                self.send_error(404)
+                return
+            query = parse_qs(url.query)
+            category = query.get('q', [''])[0]
+            page_num = int(query.get('page', ['1'])[0])
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            products = fixture_products(sample, category, page_num, items_per_page) if page_num <= max_pages else []
+            body = render_catalog_page(products).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return CatalogHandler
+
+
+def start_server(port=8765, max_pages=50, latency_ms=0, items_per_page=ITEMS_PER_PAGE):
+    """Start the fixture server on a daemon thread; returns (server, base_url)."""
+    handler = make_handler(load_sample(), max_pages, latency_ms, items_per_page)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve offline Jumia catalog fixtures.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=50, help="pages with products per category")
+    parser.add_argument("--latency-ms", type=int, default=0, help="simulated server latency per page")
+    args = parser.parse_args()
+    server, base_url = start_server(args.port, args.pages, args.latency_ms)
+    print(f"Serving fixtures at {base_url}/catalog/?q=<category>&page=<n> (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Bulk product extraction for Jumia catalog pages.
+
+- In the browser: one eval_on_selector_all call returns the raw text of every product card
+  on the page, instead of ~7 query_selector/inner_text round trips per card.
+- Offline: parse_listing_html() reads the same fields from saved HTML with lxml, so cached
+  snapshots can be re-parsed without a browser.
+
+Both paths feed normalize_item(), which applies the scrapers' field parsing rules.
+
+    python data_collection/jumia_extract.py snapshots/*.html > products.json
+"""
+import argparse
+import json
+import os
+import sys
+
+from lxml import html as lxml_html
+
+PRODUCT_SELECTOR = "article.prd._fb"
+
+# Runs in the page; receives every element matching PRODUCT_SELECTOR
+EXTRACT_JS = """
+cards => cards.map(card => {
+    const text = sel => { const el = card.querySelector(sel); return el ? el.innerText : null; };
+    const link = card.querySelector('a.core');
+    return {
+        name: text('h3.name'),
+        price: text('div.prc'),
+        href: link ? link.getAttribute('href') : null,
+        brand: text('div.brn'),
+        discount: text('div.bdg._dsct._fcm'),
+        rev: text('div.rev'),
+        sold_out: card.querySelector('div.sold-out') !== null
+    };
+})
+"""
+
+
+def _has_classes(*classes):
+    return ' and '.join(f"contains(concat(' ', normalize-space(@class), ' '), ' {c} ')" for c in classes)
+
+
+XPATHS = {
+    'card': f"//article[{_has_classes('prd', '_fb')}]",
+    'name': f".//h3[{_has_classes('name')}]",
+    'price': f".//div[{_has_classes('prc')}]",
+    'link': f".//a[{_has_classes('core')}]",
+    'brand': f".//div[{_has_classes('brn')}]",
+    'discount': f".//div[{_has_classes('bdg', '_dsct', '_fcm')}]",
+    'rev': f".//div[{_has_classes('rev')}]",
+    'sold_out': f".//div[{_has_classes('sold-out')}]",
+}
+
+
+def normalize_item(raw, category, base_url):
+    """Turn the raw strings of one product card into a product record."""
+    name = (raw["name"] or "").strip()
+    try:
+        price = float((raw["price"] or "").replace('₦', '').replace(',', ''))
+    except ValueError:
+        price = None
+    brand = raw["brand"].strip() if raw["brand"] else None
+    try:
+        discount_pct = int(raw["discount"].strip().replace('%', '')) if raw["discount"] else 0
+    except ValueError:
+        discount_pct = 0
+    rating, reviews = 0.0, 0
+    if raw["rev"]:
+        txt = raw["rev"].strip()
+        parts = txt.split()
+        rating = float(parts[0]) if parts else 0.0
+        if '(' in txt:
+            reviews = int(txt.split('(')[1].rstrip(')'))
+    return {
+        "name": name,
+        "brand": brand,
+        "price": price,
+        "discount_pct": discount_pct,
+        "rating": rating,
+        "reviews": reviews,
+        "in_stock": not raw["sold_out"],
+        "category": category,
+        "link": base_url + raw["href"] if raw["href"] else None
+    }
+
+
+def extract_page(page, category, base_url):
+    """Sync Playwright: all product cards on the loaded page in one evaluation."""
+    return [normalize_item(raw, category, base_url)
+            for raw in page.eval_on_selector_all(PRODUCT_SELECTOR, EXTRACT_JS)]
+
+
+async def extract_page_async(page, category, base_url):
+    """Async Playwright variant of extract_page."""
+    return [normalize_item(raw, category, base_url)
+            for raw in await page.eval_on_selector_all(PRODUCT_SELECTOR, EXTRACT_JS)]
+
+
+def parse_listing_html(content, category, base_url):
+    """Parse a saved catalog page (str or bytes) without a browser."""
+    tree = lxml_html.fromstring(content)
+
+    def first_text(card, key):
+        found = card.xpath(XPATHS[key])
+        return found[0].text_content() if found else None
+
+    products = []
+    for card in tree.xpath(XPATHS['card']):
+        link = card.xpath(XPATHS['link'])
+        products.append(normalize_item({
+            "name": first_text(card, 'name'),
+            "price": first_text(card, 'price'),
+            "href": link[0].get('href') if link else None,
+            "brand": first_text(card, 'brand'),
+            "discount": first_text(card, 'discount'),
+            "rev": first_text(card, 'rev'),
+            "sold_out": bool(card.xpath(XPATHS['sold_out'])),
+        }, category, base_url))
+    return products
+
+
+def snapshot_category(path):
+    """Category encoded in a snapshot file name: <category>-<page>.html."""
+    return os.path.basename(path).rsplit('-', 1)[0]
+
+
+def main():
+    from scrape_jumia_playwright import BASE_URL
+    parser = argparse.ArgumentParser(description="Parse saved Jumia catalog pages into product JSON.")
+    parser.add_argument("snapshots", nargs="+", help="HTML files named <category>-<page>.html")
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+    products = []
+    for path in args.snapshots:
+        with open(path, 'rb') as f:
+            products.extend(parse_listing_html(f.read(), snapshot_category(path), args.base_url))
+    json.dump(products, sys.stdout, indent=2, ensure_ascii=False)
+    print(f"Parsed {len(products)} products from {len(args.snapshots)} pages", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Concurrent Jumia scraper built on async Playwright.
+
+A pool of browser contexts (each with several pages) works through a queue of
+(category, page) jobs, reading each page's product cards in one evaluation
+(jumia_extract). Requests to a host are capped by a concurrency limit and a
+minimum interval between navigations; failed pages are retried with exponential
+backoff. Results are yielded per catalog page as soon as they are extracted and
+appended to the JSONL output (scrape_output), so --resume can pick up after a crash.
+
+    python data_collection/scrape_jumia_async.py --contexts 2 --pages-per-context 4
+    python data_collection/scrape_jumia_async.py --base-url http://127.0.0.1:8765   # offline fixtures
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError
+
+from jumia_extract import PRODUCT_SELECTOR, extract_page_async
+from scrape_output import JsonlScrapeWriter
+from scrape_jumia_playwright import (
+    BASE_URL, CATEGORIES, MAX_PRODUCTS_PER_CAT, PAGES_PER_CAT, output_file
+)
+
+
+class HostLimiter:
+    """Per-host cap on in-flight navigations plus a minimum spacing between their starts."""
+
+    def __init__(self, max_concurrent=4, requests_per_second=2.0):
+        self.max_concurrent = max_concurrent
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._semaphores = {}
+        self._locks = defaultdict(asyncio.Lock)
+        self._next_start = defaultdict(float)
+
+    def _semaphore(self, host):
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphores[host]
+
+    async def acquire(self, host):
+        await self._semaphore(host).acquire()
+        async with self._locks[host]:
+            now = time.monotonic()
+            wait = self._next_start[host] - now
+            self._next_start[host] = max(now, self._next_start[host]) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def release(self, host):
+        self._semaphore(host).release()
+
+
+async def fetch_page(page, url, limiter, retries, backoff):
+    """Navigate with retries; returns False when the page loaded but has no products."""
+    host = urlparse(url).netloc
+    for attempt in range(retries + 1):
+        await limiter.acquire(host)
+        try:
+            await page.goto(url, timeout=60000)
+            try:
+                await page.wait_for_selector(PRODUCT_SELECTOR, timeout=10000)
+            except TimeoutError:
+                return False
+            return True
+        except (TimeoutError, PlaywrightError) as e:
+            if attempt == retries:
+                raise
+            error = e
+        finally:
+            limiter.release(host)
+        # back off without holding the host's slot, so other pages keep using it
+        delay = backoff * 2 ** attempt * (1 + random.random())
+        print(f"Retrying {url} in {delay:.1f}s after: {error}")
+        await asyncio.sleep(delay)
+
+
+async def scrape_pages(categories=CATEGORIES, pages_per_cat=PAGES_PER_CAT, max_per_cat=MAX_PRODUCTS_PER_CAT,
+                       contexts=2, pages_per_context=4, max_per_host=4, requests_per_second=2.0,
+                       retries=3, backoff=1.0, base_url=BASE_URL, headless=True, snapshot_dir=None,
+                       skip_pages=None, collected=None, failed=None):
+    """Async generator yielding (category, page_num, products) as each catalog page finishes.
+
+    Once a category returns an empty page, or reaches max_per_cat products, its remaining
+    pages are skipped. With snapshot_dir, each page's HTML is saved as <category>-<page>.html
+    for offline re-parsing (jumia_extract.py). skip_pages/collected carry a resumed run's
+    completed pages and product counts per category; the categories of pages given up on
+    after the last retry are added to the `failed` set.
+    """
+    skip_pages = skip_pages or {}
+    jobs = asyncio.Queue()
+    for page_num in range(1, pages_per_cat + 1):  # interleave categories so hosts stay busy
+        for category in categories:
+            if page_num not in skip_pages.get(category, ()):
+                jobs.put_nowait((category, page_num))
+    results = asyncio.Queue()
+    last_page = {category: pages_per_cat for category in categories}
+    collected = defaultdict(int, collected or {})
+    limiter = HostLimiter(max_per_host, requests_per_second)
+    failed = set() if failed is None else failed
+
+    async def worker(page):
+        while True:
+            try:
+                category, page_num = jobs.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if page_num > last_page[category] or collected[category] >= max_per_cat:
+                continue
+            url = f"{base_url}/catalog/?q={category}&page={page_num}"
+            try:
+                has_products = await fetch_page(page, url, limiter, retries, backoff)
+            except (TimeoutError, PlaywrightError) as e:
+                print(f"Giving up on {url}: {e}")
+                failed.add(category)
+                continue
+            if not has_products:
+                last_page[category] = min(last_page[category], page_num - 1)
+                continue
+            products = await extract_page_async(page, category, base_url)
+            if snapshot_dir:
+                with open(os.path.join(snapshot_dir, f"{category}-{page_num}.html"), 'w', encoding='utf-8') as f:
+                    f.write(await page.content())
+            if not products:
+                last_page[category] = min(last_page[category], page_num - 1)
+                continue
+            products = products[:max(0, max_per_cat - collected[category])]
+            collected[category] += len(products)
+            await results.put((category, page_num, products))
+
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=headless)
+        pages = []
+        for _ in range(contexts):
+            context = await browser.new_context(user_agent="Mozilla/5.0")
+            context.set_default_navigation_timeout(60000)
+            pages.extend([await context.new_page() for _ in range(pages_per_context)])
+        workers = [asyncio.create_task(worker(page)) for page in pages]
+        done = asyncio.create_task(asyncio.wait(workers))
+        try:
+            while not (done.done() and results.empty()):
+                getter = asyncio.create_task(results.get())
+                await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            for task in workers:
+                task.result()  # surface unexpected worker errors
+        finally:
+            for task in workers:
+                task.cancel()
+            await browser.close()
+
+
+async def run(args, writer):
+    categories = [c for c in args.categories if not writer.is_done(c)]
+    started = time.perf_counter()
+    pages_done = 0
+    products_done = 0
+    failed = set()
+    async for category, page_num, products in scrape_pages(
+        categories=categories, pages_per_cat=args.pages, contexts=args.contexts,
+        pages_per_context=args.pages_per_context, max_per_host=args.max_per_host,
+        requests_per_second=args.rps, retries=args.retries, base_url=args.base_url,
+        snapshot_dir=args.snapshot_dir,
+        skip_pages={c: writer.completed_pages(c) for c in categories},
+        collected={c: writer.count(c) for c in categories}, failed=failed
+    ):
+        writer.write_page(category, page_num, products)
+        pages_done += 1
+        products_done += len(products)
+        print(f"{category} page {page_num}: {len(products)} products")
+    for category in categories:
+        if category in failed:  # left open, so --resume retries its missing pages
+            print(f"{category}: some pages failed; not marked done")
+        else:
+            writer.mark_done(category)
+    elapsed = time.perf_counter() - started
+    print(f"Total scraped products this run: {products_done} from {pages_done} pages in {elapsed:.1f}s "
+          f"({pages_done / elapsed:.2f} pages/s, {products_done / elapsed:.1f} products/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape Jumia categories with a pool of async Playwright pages.")
+    parser.add_argument("--categories", nargs="+", default=CATEGORIES)
+    parser.add_argument("--pages", type=int, default=PAGES_PER_CAT, help="max pages per category")
+    parser.add_argument("--contexts", type=int, default=2, help="browser contexts")
+    parser.add_argument("--pages-per-context", type=int, default=4)
+    parser.add_argument("--max-per-host", type=int, default=4, help="concurrent navigations per host")
+    parser.add_argument("--rps", type=float, default=2.0, help="max navigations started per second per host (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--base-url", default=BASE_URL, help="e.g. the fixture_server.py URL for offline runs")
+    parser.add_argument("--snapshot-dir", help="save each catalog page's HTML here")
+    parser.add_argument("--output", default=output_file)
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the output's checkpoint instead of starting over")
+    args = parser.parse_args()
+    if args.snapshot_dir:
+        os.makedirs(args.snapshot_dir, exist_ok=True)
+
+    with JsonlScrapeWriter(args.output, resume=args.resume) as writer:
+        asyncio.run(run(args, writer))
+    print(f"Data saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 from playwright.sync_api import sync_playwright, TimeoutError
-import json
+from jumia_extract import PRODUCT_SELECTOR, extract_page
+from scrape_output import JsonlScrapeWriter
+import argparse
 import os
 import math
 
@@ -10,6 +12,7 @@ Scraping product data from Jumia (a leading e-commerce platform in Nigeria) usin
 
 # Configuration
 data_collection = os.path.dirname(__file__)
+BASE_URL = "https://www.jumia.com.ng"  # fixture_server.py serves an offline stand-in
 # Configuration: expand to 10 categories
 CATEGORIES = [
     "snacks", "beverages", "dairies", "personal-care", "dietary-supplements",
@@ -23,89 +26,125 @@ PAGES_PER_CAT = math.ceil(MAX_PRODUCTS_PER_CAT / ITEMS_PER_PAGE)
 # Output
 data_dir = os.path.join(data_collection, 'data')
 os.makedirs(data_dir, exist_ok=True)
-output_file = os.path.join(data_dir, 'jumia_playwright.json')
+output_file = os.path.join(data_dir, 'jumia_playwright.jsonl')  # one product per line, appended per page
 
 
-def scrape_category(page, category):
+def extract_products_per_element(page, category, base_url=BASE_URL):
+    """Original extraction: one query_selector/inner_text round trip per field per card.
+
+    Kept as the baseline for benchmarks/bench_extraction.py; scraping uses extract_page().
+    """
     results = []
+    for item in page.query_selector_all(PRODUCT_SELECTOR):
+        # Core fields
+        name = item.query_selector("h3.name").inner_text().strip()
+        price_text = item.query_selector("div.prc").inner_text().replace('₦','').replace(',','')
+        try:
+            price = float(price_text)
+        except:
+            price = None
+        link = base_url + item.query_selector("a.core").get_attribute('href')
+        # Additional fields
+        brand_el = item.query_selector("div.brn")
+        brand = brand_el.inner_text().strip() if brand_el else None
+        disc_el = item.query_selector("div.bdg._dsct._fcm")
+        discount_pct = int(disc_el.inner_text().replace('%','')) if disc_el else 0
+        rev_el = item.query_selector("div.rev")
+        rating, reviews = 0.0, 0
+        if rev_el:
+            txt = rev_el.inner_text().strip()
+            parts = txt.split()
+            rating = float(parts[0]) if parts else 0.0
+            if '(' in txt:
+                reviews = int(txt.split('(')[1].rstrip(')'))
+        oos_el = item.query_selector("div.sold-out")
+        in_stock = not bool(oos_el)
+        results.append({
+            "name": name,
+            "brand": brand,
+            "price": price,
+            "discount_pct": discount_pct,
+            "rating": rating,
+            "reviews": reviews,
+            "in_stock": in_stock,
+            "category": category,
+            "link": link
+        })
+    return results
+
+
+def scrape_category(page, category, base_url=BASE_URL, skip_pages=(), collected=0, failed=None):
+    """Yield (page_num, products) for each catalog page of a category.
+
+    Pages in skip_pages (already scraped by a previous run) are not revisited; `collected`
+    is the number of products they held, counted towards MAX_PRODUCTS_PER_CAT. Pages that
+    time out are skipped and added to the `failed` set.
+    """
+    failed = set() if failed is None else failed
     # Loop through pages via URL to gather products
     for page_num in range(1, PAGES_PER_CAT + 1):
-        url = f"https://www.jumia.com.ng/catalog/?q={category}&page={page_num}"
+        if collected >= MAX_PRODUCTS_PER_CAT:
+            break
+        if page_num in skip_pages:
+            continue
+        url = f"{base_url}/catalog/?q={category}&page={page_num}"
         try:
             page.goto(url, timeout=60000)
         except TimeoutError as e:
             print(f"Timeout loading {url}: {e}. Skipping page {page_num} for {category}.")
+            failed.add(page_num)
             continue
         # Wait for products to load
         try:
-            page.wait_for_selector("article.prd._fb", timeout=10000)
+            page.wait_for_selector(PRODUCT_SELECTOR, timeout=10000)
         except TimeoutError:
             print(f"No products load at {url}. Skipping.")
             continue
-        
-        items = page.query_selector_all("article.prd._fb")
+
+        # All cards in a single page evaluation
+        items = extract_page(page, category, base_url)
         if not items:
             break
-        for item in items:
-            # Core fields
-            name = item.query_selector("h3.name").inner_text().strip()
-            price_text = item.query_selector("div.prc").inner_text().replace('₦','').replace(',','')
-            try:
-                price = float(price_text)
-            except:
-                price = None
-            link = 'https://www.jumia.com.ng' + item.query_selector("a.core").get_attribute('href')
-            # Additional fields
-            brand_el = item.query_selector("div.brn")
-            brand = brand_el.inner_text().strip() if brand_el else None
-            disc_el = item.query_selector("div.bdg._dsct._fcm")
-            discount_pct = int(disc_el.inner_text().replace('%','')) if disc_el else 0
-            rev_el = item.query_selector("div.rev")
-            rating, reviews = 0.0, 0
-            if rev_el:
-                txt = rev_el.inner_text().strip()
-                parts = txt.split()
-                rating = float(parts[0]) if parts else 0.0
-                if '(' in txt:
-                    reviews = int(txt.split('(')[1].rstrip(')'))
-            oos_el = item.query_selector("div.sold-out")
-            in_stock = not bool(oos_el)
-            results.append({
-                "name": name,
-                "brand": brand,
-                "price": price,
-                "discount_pct": discount_pct,
-                "rating": rating,
-                "reviews": reviews,
-                "in_stock": in_stock,
-                "category": category,
-                "link": link
-            })
-            if len(results) >= MAX_PRODUCTS_PER_CAT:
-                break
-        # stop if reached target
-        if len(results) >= MAX_PRODUCTS_PER_CAT:
-            break
-    return results
+        items = items[:MAX_PRODUCTS_PER_CAT - collected]
+        collected += len(items)
+        yield page_num, items
 
 
 def main():
-    all_products = []
-    with sync_playwright() as pw:
+    parser = argparse.ArgumentParser(description="Scrape Jumia categories into a JSONL file.")
+    parser.add_argument("--output", default=output_file)
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the output's checkpoint instead of starting over")
+    parser.add_argument("--base-url", default=BASE_URL, help="e.g. the fixture_server.py URL for offline runs")
+    args = parser.parse_args()
+
+    total = 0
+    with sync_playwright() as pw, JsonlScrapeWriter(args.output, resume=args.resume) as writer:
         browser = pw.chromium.launch(headless=True)
         page = browser.new_page(user_agent="Mozilla/5.0")
         # increase navigation timeout to 60s
         page.set_default_navigation_timeout(60000)
         for cat in CATEGORIES:
+            if writer.is_done(cat):
+                print(f"Skipping completed category: {cat}")
+                continue
             print(f"Scraping category: {cat}")
-            prods = scrape_category(page, cat)
-            print(f"Found {len(prods)} products in '{cat}'")
-            all_products.extend(prods)
+            found = 0
+            failed = set()
+            for page_num, prods in scrape_category(page, cat, args.base_url,
+                                                   skip_pages=writer.completed_pages(cat),
+                                                   collected=writer.count(cat), failed=failed):
+                writer.write_page(cat, page_num, prods)
+                found += len(prods)
+            if failed:  # left open, so --resume retries its missing pages
+                print(f"{cat}: pages {sorted(failed)} failed; not marked done")
+            else:
+                writer.mark_done(cat)
+            print(f"Found {found} products in '{cat}' ({writer.count(cat)} in total)")
+            total += found
         browser.close()
-    print(f"Total scraped products: {len(all_products)}")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_products, f, indent=2, ensure_ascii=False)
-    print(f"Data saved to {output_file}")
+    print(f"Total scraped products this run: {total}")
+    print(f"Data saved to {args.output}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,77 @@
+"""
+Append-only JSONL output with per-category checkpoints for the scrapers.
+
+Every catalog page is appended to the JSONL file as one line per product and flushed,
+then the checkpoint (<output>.checkpoint.json) records the page, the category's running
+product count and the file size after the write. The checkpoint is replaced atomically.
+A new run appends after whatever the file already holds, so the ETL's stored byte offset
+(ingest_offsets) stays valid and it loads exactly the new scrape. A resumed run truncates
+the JSONL back to the last checkpointed size (dropping any half-written page) and skips
+pages and categories that are already complete.
+
+Every record is stamped with its run's start time (`scraped_at`, kept in the checkpoint so a
+resumed run keeps it), which is how the ETL tells the runs of one file apart.
+"""
+import json
+import os
+from datetime import datetime
+
+
+class JsonlScrapeWriter:
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint.json'
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume and os.path.exists(self.checkpoint_path) and os.path.exists(path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+            self._file = open(path, 'r+b')
+            self._file.truncate(self.state['offset'])
+            self._file.seek(self.state['offset'])
+        else:
+            self._file = open(path, 'ab')
+            self.state = {'offset': self._file.tell(), 'categories': {}}
+        self.state.setdefault('scraped_at', datetime.now().isoformat(timespec='seconds'))
+
+    def _category(self, category):
+        return self.state['categories'].setdefault(category, {'pages': [], 'count': 0, 'done': False})
+
+    def completed_pages(self, category):
+        return set(self._category(category)['pages'])
+
+    def count(self, category):
+        return self._category(category)['count']
+
+    def is_done(self, category):
+        return self._category(category)['done']
+
+    def write_page(self, category, page_num, products):
+        scraped_at = self.state['scraped_at']
+        self._file.write(''.join(json.dumps({**p, 'scraped_at': scraped_at}, ensure_ascii=False) + '\n'
+                                 for p in products).encode('utf-8'))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        entry = self._category(category)
+        entry['pages'].append(page_num)
+        entry['count'] += len(products)
+        self.state['offset'] = self._file.tell()
+        self._save()
+
+    def mark_done(self, category):
+        self._category(category)['done'] = True
+        self._save()
+
+    def _save(self):
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,277 @@
+"""
+Synthetic Jumia-like catalogs and price histories for benchmarks and local development.
+
+- generate_catalog(): products with category-specific names and log-normal price levels,
+  Zipf-distributed brand popularity (~15% without a brand) and Jumia-style links ending
+  in a numeric SKU.
+- iter_observations(): one observation per product per scrape run. Prices step up or down
+  occasionally, promotions cut prices for a few days, items go out of stock and come back,
+  and reviews accumulate, with the rating converging on a per-product quality.
+- populate(): writes products, price_history, latest_price, price_stats, alerts, the
+  price_rollup cube and data_version with the schema of etl/models.py (every observation,
+  or only changes like the ETL's --changes-only); alerts come from the ETL's detector
+  (etl/alerts.py).
+- write_scrape_jsonl(): the same observations as raw scrape records (the ETL's input).
+
+Everything is seeded and vectorized with numpy, so 10k to 10M rows are reproducible.
+
+    python data_collection/synthetic_data.py --products 10000 --days 90 --database sqlite:///synthetic.db
+    python data_collection/synthetic_data.py --products 5000 --days 30 --jsonl data_collection/data/synthetic.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+START = datetime(2025, 1, 1, 2, 0)  # first scrape run; runs start at 02:00
+SCRAPE_WINDOW = timedelta(hours=3)  # a run visits every product within this window
+INSERT_BATCH_ROWS = 50000
+
+# category -> (median price in naira, product nouns)
+CATEGORY_PROFILES = {
+    "snacks": (1800, ["Chin Chin", "Plantain Chips", "Cookies", "Peanuts", "Crackers", "Wafers"]),
+    "beverages": (2500, ["Malt Drink", "Fruit Juice", "Instant Coffee", "Green Tea", "Cocoa Drink"]),
+    "dairies": (3000, ["Powdered Milk", "Evaporated Milk", "Yoghurt", "Butter", "Cheese Spread"]),
+    "personal-care": (4500, ["Body Lotion", "Shower Gel", "Toothpaste", "Deodorant", "Hair Cream"]),
+    "dietary-supplements": (9000, ["Vitamin C", "Omega 3", "Multivitamin", "Zinc Tablets", "Protein Powder"]),
+    "electronics": (65000, ["Smart TV", "Bluetooth Speaker", "Power Bank", "Blender", "Electric Kettle"]),
+    "fashion-women": (12000, ["Maxi Dress", "Handbag", "Sandals", "Blouse", "Wig"]),
+    "fashion-men": (11000, ["Polo Shirt", "Sneakers", "Wrist Watch", "Jeans", "Kaftan"]),
+    "home-living": (18000, ["Bedsheet Set", "Non-Stick Pot", "Wall Clock", "Curtain", "Storage Box"]),
+    "phones-accessories": (9000, ["Phone Case", "USB-C Cable", "Wireless Earbuds", "Fast Charger", "Smartphone"]),
+}
+ADJECTIVES = ["Classic", "Premium", "Original", "Fresh", "Organic", "Smart", "Deluxe", "Mini", "Pro", "Ultra"]
+SIZES = ["", "- 50g", "- 500ml", "- 1L", "- Pack of 6", "- 2 Pieces", "- Large", "- 128GB"]
+BRAND_PREFIXES = ["Nova", "Zen", "Alpha", "Prime", "Sun", "Golden", "Royal", "Eco", "Max", "Star", "Blue",
+                  "Green", "Happy", "Urban", "Tech", "Pure"]
+BRAND_SUFFIXES = ["tek", "ora", "ix", "line", "wave", "field", "gen", "vita", "plus", "mark", "craft", "land"]
+BRANDS = [prefix + suffix for prefix in BRAND_PREFIXES for suffix in BRAND_SUFFIXES]
+NO_BRAND_SHARE = 0.15
+SKU_BASE = 300_000_000
+HISTORY_COLUMNS = ["product_id", "price", "discount_pct", "in_stock", "rating", "reviews", "scraped_at"]
+VALUE_COLUMNS = ["price", "discount_pct", "in_stock", "rating", "reviews"]
+
+
+def generate_catalog(n_products, seed=42):
+    """products rows (product_id from 1) plus each product's base price and popularity."""
+    rng = np.random.default_rng(seed)
+    categories = np.array(list(CATEGORY_PROFILES), dtype=object)
+    category_idx = rng.integers(0, len(categories), n_products)
+    medians = np.array([median for median, _ in CATEGORY_PROFILES.values()])
+    # Zipf-like brand popularity; a brand's products spread over all categories
+    weights = 1 / np.arange(1, len(BRANDS) + 1) ** 1.1
+    brand = np.array(BRANDS, dtype=object)[rng.choice(len(BRANDS), n_products, p=weights / weights.sum())]
+    no_brand = rng.random(n_products) < NO_BRAND_SHARE
+    noun = np.array([rng.choice(CATEGORY_PROFILES[c][1]) for c in categories[category_idx]], dtype=object)
+    adjective = np.array(ADJECTIVES, dtype=object)[rng.integers(0, len(ADJECTIVES), n_products)]
+    size = np.array(SIZES, dtype=object)[rng.integers(0, len(SIZES), n_products)]
+    product_id = np.arange(1, n_products + 1)
+    sku = (SKU_BASE + product_id).astype(str).astype(object)
+    title = np.where(no_brand, "Generic", brand) + " " + adjective + " " + noun + " " + size
+    title = pd.Series(title).str.strip()
+    name = title + " " + pd.Series("{" + sku + "}")
+    slug = title.str.lower().str.replace(r"[^a-z0-9]+", "-", regex=True).str.strip("-")
+    return pd.DataFrame({
+        "product_id": product_id,
+        "name": name,
+        "brand": np.where(no_brand, "Unknown", brand),
+        "category": categories[category_idx],
+        "link": "https://www.jumia.com.ng/" + slug + "-" + pd.Series(sku) + ".html",
+        "base_price": np.round(medians[category_idx] * rng.lognormal(0, 0.6, n_products), -1).clip(100, 5_000_000),
+        "popularity": rng.lognormal(-3, 1.2, n_products),  # mean new reviews per run
+    })
+
+
+def iter_observations(catalog, runs, runs_per_day=1, start=START, change_rate=0.03, promo_rate=0.01, seed=42):
+    """Yield (run_started_at, DataFrame[HISTORY_COLUMNS]) for each scrape run, oldest first."""
+    rng = np.random.default_rng(seed + 1)
+    n = len(catalog)
+    list_price = catalog["base_price"].to_numpy(np.float64).copy()
+    popularity = catalog["popularity"].to_numpy()
+    quality = rng.uniform(2.5, 5.0, n)
+    rating_bias = rng.normal(0, 1, n)
+    reviews = rng.poisson(popularity * 200)
+    in_stock = rng.random(n) > 0.05
+    promo_left = np.zeros(n, dtype=np.int64)
+    promo_discount = np.zeros(n)
+    # a product is visited at the same point of every run's scrape window
+    visit_offset = pd.to_timedelta(rng.random(n) * SCRAPE_WINDOW.total_seconds(), unit="s").to_numpy()
+    interval = timedelta(days=1) / runs_per_day
+    for run in range(runs):
+        if run:
+            changed = rng.random(n) < change_rate
+            list_price[changed] = np.round(list_price[changed] * rng.uniform(0.9, 1.12, changed.sum()), -1)
+            reviews = reviews + rng.poisson(popularity)
+            stock_flip = rng.random(n) < np.where(in_stock, 0.005, 0.2)
+            in_stock = in_stock ^ stock_flip
+            promo_left = np.maximum(promo_left - 1, 0)
+        starting = (promo_left == 0) & (rng.random(n) < promo_rate)
+        promo_left[starting] = rng.integers(3, 15, starting.sum())
+        promo_discount[starting] = rng.choice([10, 15, 20, 25, 30, 40], starting.sum())
+        discount = np.where(promo_left > 0, promo_discount, 0.0)
+        # the rating only moves with new reviews, converging on the product's quality;
+        # no reviews shows as 0.0 like on Jumia
+        rating = np.where(reviews > 0, np.round(np.clip(quality + rating_bias / np.sqrt(np.maximum(reviews, 1)), 1, 5), 1), 0.0)
+        run_started = start + run * interval
+        yield run_started, pd.DataFrame({
+            "product_id": catalog["product_id"].to_numpy(),
+            "price": np.round(list_price * (1 - discount / 100), 0),
+            "discount_pct": discount,
+            "in_stock": in_stock,
+            "rating": rating,
+            "reviews": reviews,
+            "scraped_at": np.datetime64(run_started, "us") + visit_offset,
+        })
+
+
+def _changed_rows(frame, previous):
+    """Rows whose values differ from the product's previous observation (all rows on the first run)."""
+    if previous is None:
+        return frame
+    differs = np.zeros(len(frame), dtype=bool)
+    for column in VALUE_COLUMNS:
+        differs |= frame[column].to_numpy() != previous[column].to_numpy()
+    return frame[differs]
+
+
+def _insert_frame(conn, table, frame):
+    columns = list(frame.columns)
+    values = [frame[c].tolist() for c in columns]
+    for lo in range(0, len(frame), INSERT_BATCH_ROWS):
+        conn.execute(table.insert(), [dict(zip(columns, row)) for row in zip(*(v[lo:lo + INSERT_BATCH_ROWS]
+                                                                                  for v in values))])
+
+
+def populate(engine, n_products, n_observations, runs_per_day=1, changes_only=False, seed=42, force=False,
+             **dynamics):
+    """Recreate the schema on `engine` and fill it. Returns the number of price_history rows written.
+
+    n_observations scrape runs are generated per product; with changes_only only observations
+    that differ from the product's previous one are stored, and latest_price.last_seen_at is
+    the final run's visit. Every table is dropped first, so a database other than SQLite is
+    only populated with force=True (--force).
+    """
+    if engine.dialect.name != "sqlite" and not force:
+        raise ValueError(f"refusing to drop and recreate the tables of {engine.url.render_as_string()}: "
+                         "not SQLite (pass --force / force=True to populate it anyway)")
+    from sqlalchemy import bindparam, update
+    from models import Base, DataVersion, LatestPrice, PriceHistory, Product
+    from create_db_tables import backfill_latest_prices
+    from rollup import rebuild_rollup
+    from alerts import detect, insert_alerts, save_state
+    from identity import product_keys
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    catalog = generate_catalog(n_products, seed)
+    written = 0
+    previous = None
+    state = None
+    with engine.begin() as conn:
+        products = catalog[["product_id", "name", "brand", "category", "link"]].assign(
+            product_key=product_keys(catalog["link"], catalog["name"]))
+        _insert_frame(conn, Product.__table__, products)
+        for _, frame in iter_observations(catalog, n_observations, runs_per_day, seed=seed, **dynamics):
+            rows = _changed_rows(frame, previous) if changes_only else frame
+            _insert_frame(conn, PriceHistory.__table__, rows)
+            written += len(rows)
+            previous = frame
+            # every product is observed in every run, so the detector's state covers them all
+            alerts, state = detect(frame, state)
+            insert_alerts(conn, alerts, INSERT_BATCH_ROWS)
+        save_state(conn, state, INSERT_BATCH_ROWS)
+        backfill_latest_prices(conn)
+        rebuild_rollup(conn)
+        if changes_only and previous is not None:
+            conn.execute(
+                update(LatestPrice).where(LatestPrice.product_id == bindparam("pid"))
+                .values(last_seen_at=bindparam("seen")),
+                [{"pid": pid, "seen": seen} for pid, seen in
+                 zip(previous["product_id"].tolist(), previous["scraped_at"].dt.to_pydatetime())]
+            )
+        conn.execute(DataVersion.__table__.insert().values(id=1, version=1))
+    return written
+
+
+def scrape_records(catalog, frame):
+    """One run's observations as raw scrape records (the scrapers' JSONL fields, without the
+    run's scraped_at stamp)."""
+    products = catalog.set_index("product_id").loc[frame["product_id"]]
+    brand = products["brand"].to_numpy(dtype=object)
+    return pd.DataFrame({
+        "name": products["name"].to_numpy(),
+        "brand": np.where(brand == "Unknown", None, brand),
+        "price": frame["price"].to_numpy(),
+        "discount_pct": frame["discount_pct"].to_numpy(),
+        "rating": frame["rating"].to_numpy(),
+        "reviews": frame["reviews"].to_numpy(),
+        "in_stock": frame["in_stock"].to_numpy(),
+        "category": products["category"].to_numpy(),
+        "link": products["link"].to_numpy(),
+    })
+
+
+def iter_scrapes(n_products, runs, runs_per_day=1, seed=42, **dynamics):
+    """Yield (run_started_at, raw scrape DataFrame) per run."""
+    catalog = generate_catalog(n_products, seed)
+    for run_started, frame in iter_observations(catalog, runs, runs_per_day, seed=seed, **dynamics):
+        yield run_started, scrape_records(catalog, frame)
+
+
+def write_scrape_jsonl(path, n_products, runs, runs_per_day=1, seed=42, **dynamics):
+    """Append every run's scrape records to a JSONL file. Returns the records written."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for run_started, records in iter_scrapes(n_products, runs, runs_per_day, seed, **dynamics):
+            records = records.astype(object).where(records.notna(), None)  # missing brand -> null
+            records["scraped_at"] = run_started.isoformat(timespec="seconds")  # as JsonlScrapeWriter stamps it
+            for record in records.to_dict("records"):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            written += len(records)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=90, help="days of scrape runs")
+    parser.add_argument("--runs-per-day", type=int, default=1)
+    parser.add_argument("--change-rate", type=float, default=0.03, help="share of list prices changing per run")
+    parser.add_argument("--promo-rate", type=float, default=0.01, help="share of products starting a promotion per run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", help="SQLAlchemy URL to populate (tables are recreated)")
+    parser.add_argument("--force", action="store_true", help="populate --database even when it is not SQLite")
+    parser.add_argument("--changes-only", action="store_true",
+                        help="store only observations that differ from the previous one")
+    parser.add_argument("--jsonl", help="write raw scrape records to this JSONL file instead")
+    args = parser.parse_args()
+    if not args.database and not args.jsonl:
+        parser.error("pass --database and/or --jsonl")
+
+    runs = args.days * args.runs_per_day
+    dynamics = {"change_rate": args.change_rate, "promo_rate": args.promo_rate}
+    started = time.perf_counter()
+    if args.jsonl:
+        written = write_scrape_jsonl(args.jsonl, args.products, runs, args.runs_per_day, args.seed, **dynamics)
+        print(f"Wrote {written:,} scrape records to {args.jsonl} in {time.perf_counter() - started:.1f}s")
+    if args.database:
+        os.environ["DATABASE_URL"] = args.database
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "etl"))
+        from models import engine
+        try:
+            written = populate(engine, args.products, runs, args.runs_per_day, args.changes_only, args.seed,
+                               force=args.force, **dynamics)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Wrote {args.products:,} products and {written:,} price_history rows to {args.database} "
+              f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Price-change and anomaly detection during ingestion.
+
+Each product keeps constant-size rolling state: its latest_price snapshot (the previous
+observation) and an exponentially weighted mean and variance of its price in price_stats.
+A load batch is compared with that state in one vectorized pass, so detection costs
+O(batch) however long the history is:
+
+- price_drop / price_spike: the price moved by at least MIN_CHANGE_PCT from the previous
+  observation and lies Z_THRESHOLD EWMA standard deviations from the EWMA mean (any such
+  move counts while a product has fewer than WARMUP_OBSERVATIONS observations)
+- discount_jump: the discount rose by at least DISCOUNT_JUMP_PCT points
+- out_of_stock / back_in_stock: the stock flag flipped
+
+Alerts are appended to the alerts table; the API serves them from /alerts.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, insert, select, type_coerce
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Alert, LatestPrice, PriceStats
+from batching import CHUNK_SIZE, chunks, dialect_name
+
+EWMA_ALPHA = 0.2  # weight of the newest observation in the rolling mean/variance
+MIN_CHANGE_PCT = 5.0
+Z_THRESHOLD = 3.0
+WARMUP_OBSERVATIONS = 3
+DISCOUNT_JUMP_PCT = 10.0
+STD_FLOOR = 0.005  # of the mean: a flat price history does not make every move infinitely unusual
+
+BATCH_COLUMNS = ["product_id", "price", "discount_pct", "in_stock", "scraped_at"]
+STATE_COLUMNS = ["product_id", "price", "discount_pct", "in_stock", "ewma_mean", "ewma_var", "observations"]
+ALERT_COLUMNS = ["product_id", "kind", "old_value", "new_value", "change_pct", "zscore", "scraped_at"]
+
+
+def _flags(column):
+    """Boolean array from a column that may hold None/NaN (treated as True, like the loader)."""
+    values = column.to_numpy(dtype=object)
+    return np.where(pd.isna(values), True, values).astype(bool)
+
+
+def detect(batch, previous):
+    """Compare a batch of observations with the products' previous state.
+
+    `batch` has BATCH_COLUMNS (one row per product; later duplicates win), `previous` has
+    STATE_COLUMNS for products observed before (other products may be included), or is None.
+    Returns (alerts[ALERT_COLUMNS], state[STATE_COLUMNS + updated_at]) for the batch's products.
+    """
+    batch = batch[BATCH_COLUMNS].drop_duplicates("product_id", keep="last")
+    if previous is None or previous.empty:
+        previous = pd.DataFrame({c: pd.Series(dtype="int64" if c == "product_id" else "float64")
+                                 for c in STATE_COLUMNS})
+    df = batch.merge(previous[STATE_COLUMNS], on="product_id", how="left", suffixes=("", "_prev"))
+    price = df["price"].astype("float64").to_numpy()
+    discount = df["discount_pct"].astype("float64").fillna(0).to_numpy()
+    in_stock = _flags(df["in_stock"])
+    prev_price = df["price_prev"].astype("float64").to_numpy()
+    prev_discount = df["discount_pct_prev"].astype("float64").fillna(0).to_numpy()
+    prev_stock = _flags(df["in_stock_prev"])
+    seen = ~np.isnan(prev_price)
+    # A snapshot without statistics (loaded before the detector existed) seeds them
+    has_stats = df["observations"].notna().to_numpy()
+    mean = np.where(has_stats, df["ewma_mean"].astype("float64").to_numpy(), prev_price)
+    var = np.where(has_stats, df["ewma_var"].astype("float64").to_numpy(), 0.0)
+    n = np.where(has_stats, df["observations"].fillna(0).to_numpy(np.int64), seen.astype(np.int64))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = (price / prev_price - 1) * 100
+        zscore = (price - mean) / np.maximum(np.sqrt(var), np.abs(mean) * STD_FLOOR)
+    moved = seen & (np.abs(np.nan_to_num(change_pct)) >= MIN_CHANGE_PCT)
+    price_alert = moved & ((n < WARMUP_OBSERVATIONS) | (np.abs(zscore) >= Z_THRESHOLD))
+    discount_alert = seen & (discount - prev_discount >= DISCOUNT_JUMP_PCT)
+    stock_alert = seen & (in_stock != prev_stock)
+
+    masks = [price_alert, discount_alert, stock_alert]
+
+    def pick(*columns):  # one column of the alerts: the price, discount and stock alerts' values
+        return np.concatenate([column[mask] for column, mask in zip(columns, masks)])
+
+    none = np.full(len(df), np.nan)
+    found = pd.DataFrame({
+        "product_id": pick(*[df["product_id"].to_numpy()] * 3),
+        "kind": pick(np.where(change_pct < 0, "price_drop", "price_spike"), np.full(len(df), "discount_jump"),
+                     np.where(in_stock, "back_in_stock", "out_of_stock")),
+        "old_value": pick(prev_price, prev_discount, prev_stock.astype("float64")),
+        "new_value": pick(price, discount, in_stock.astype("float64")),
+        "change_pct": pick(change_pct, discount - prev_discount, none),
+        "zscore": pick(zscore, none, none),
+        "scraped_at": pick(*[df["scraped_at"].to_numpy()] * 3),
+    }, columns=ALERT_COLUMNS)
+
+    # Fold the observations into the EWMA (the first observation starts it)
+    diff = price - mean
+    increment = EWMA_ALPHA * diff
+    state = pd.DataFrame({
+        "product_id": df["product_id"].to_numpy(), "price": price, "discount_pct": discount, "in_stock": in_stock,
+        "ewma_mean": np.where(n > 0, mean + increment, price),
+        "ewma_var": np.where(n > 0, (1 - EWMA_ALPHA) * (var + diff * increment), 0.0),
+        "observations": n + 1, "updated_at": df["scraped_at"].to_numpy(),
+    })
+    return found, state
+
+
+def _values(column):
+    if column.hasnans:
+        return column.astype(object).where(column.notna(), None).tolist()
+    return column.tolist()
+
+
+def _records(frame, columns):
+    """Plain Python rows for executemany (numpy scalars and NaN are not accepted by every driver)."""
+    return [dict(zip(columns, row)) for row in zip(*(_values(frame[c]) for c in columns))]
+
+
+def _stats_upsert(dialect):
+    table = PriceStats.__table__
+    columns = ["ewma_mean", "ewma_var", "observations", "updated_at"]
+    if dialect == "mysql":
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns})
+    if dialect == "sqlite":
+        stmt = sqlite_insert(table)
+        return stmt.on_conflict_do_update(index_elements=[table.c.product_id],
+                                          set_={c: stmt.excluded[c] for c in columns})
+    raise NotImplementedError(f"price_stats upsert not supported on {dialect}")
+
+
+def load_previous(conn, product_ids, chunk_size=CHUNK_SIZE):
+    """STATE_COLUMNS for the given products, one primary-key lookup query per chunk."""
+    rows = []
+    for chunk in chunks(product_ids, chunk_size):
+        rows += conn.execute(
+            # as floats: Decimal conversion of every row costs more than the detection itself
+            select(LatestPrice.product_id, type_coerce(LatestPrice.price, Float),
+                   type_coerce(LatestPrice.discount_pct, Float), LatestPrice.in_stock,
+                   PriceStats.ewma_mean, PriceStats.ewma_var, PriceStats.observations)
+            .outerjoin(PriceStats, PriceStats.product_id == LatestPrice.product_id)
+            .where(LatestPrice.product_id.in_(chunk))
+        ).all()
+    return pd.DataFrame(rows, columns=STATE_COLUMNS)
+
+
+def save_state(conn, state, chunk_size=CHUNK_SIZE):
+    stmt = _stats_upsert(dialect_name(conn))
+    for chunk in chunks(_records(state, ["product_id", "ewma_mean", "ewma_var", "observations", "updated_at"]),
+                         chunk_size):
+        conn.execute(stmt, chunk)
+
+
+def insert_alerts(conn, alerts, chunk_size=CHUNK_SIZE):
+    for chunk in chunks(_records(alerts, ALERT_COLUMNS), chunk_size):
+        conn.execute(insert(Alert.__table__), chunk)
+
+
+def detect_alerts(conn, history, chunk_size=CHUNK_SIZE):
+    """Run the detector on a load batch (price_history row dicts) before latest_price is updated.
+
+    Writes the alerts and the new rolling state; returns the number of alerts.
+    """
+    if not history:
+        return 0
+    batch = pd.DataFrame.from_records(history, columns=BATCH_COLUMNS)
+    previous = load_previous(conn, list(dict.fromkeys(batch["product_id"].tolist())), chunk_size)
+    alerts, state = detect(batch, previous)
+    save_state(conn, state, chunk_size)
+    insert_alerts(conn, alerts, chunk_size)
+    return len(alerts)
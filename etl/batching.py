@@ -0,0 +1,14 @@
+"""
+Helpers shared by the ETL's batched SQL writers (transform.py, alerts.py, rollup.py).
+"""
+CHUNK_SIZE = 1000  # rows per multi-row INSERT / keys per lookup query
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def dialect_name(conn):
+    """Dialect name of a Session or Connection."""
+    return conn.get_bind().dialect.name if hasattr(conn, "get_bind") else conn.dialect.name
@@ -1,8 +1,165 @@
 """
 Script to create MySQL tables using SQLAlchemy models
+
+Run with --migrate on an existing database to add the columns and indexes defined in
+models.py. Products without a product_key, or with one an earlier key function derived, get
+the current key (identity.py); products that turn out to share a key (the same listing under
+two categories or names) are merged onto the oldest product_id, with their price history and
+alerts re-pointed and latest_price and the rollup cube rebuilt. Indexes the models no longer
+define (RETIRED_INDEXES) are dropped.
+An empty latest_price snapshot or price_rollup cube is backfilled from price_history.
 """
-from models import create_tables
+import argparse
+import pandas as pd
+from sqlalchemy import bindparam, func, inspect, insert, or_, select, text, update, delete
+from models import (Base, Product, PriceHistory, LatestPrice, PriceStats, PriceRollup, Alert, SNAPSHOT_VALUES,
+                    engine, create_tables)
+from identity import product_keys
+from rollup import rebuild_rollup
+
+# table -> indexes dropped by --migrate; the products natural key gave way to product_key
+RETIRED_INDEXES = {'products': ['uq_products_name_brand_category']}
+KEY_BATCH_ROWS = 1000
+
+
+def merge_products(conn, pairs):
+    """Fold each (duplicate product_id, kept product_id) pair into the kept product."""
+    for dup_id, keep_id in pairs:
+        for model in (PriceHistory, Alert):
+            conn.execute(update(model).where(model.product_id == dup_id).values(product_id=keep_id))
+    dup_ids = [dup_id for dup_id, _ in pairs]
+    for start in range(0, len(dup_ids), KEY_BATCH_ROWS):
+        chunk = dup_ids[start:start + KEY_BATCH_ROWS]
+        for model in (LatestPrice, PriceStats, Product):
+            conn.execute(delete(model).where(model.product_id.in_(chunk)))
+
+
+def backfill_product_keys(conn):
+    """Key the products whose product_key is missing or stale, merging products that share a key.
+    Returns rows merged."""
+    rows = conn.execute(
+        select(Product.product_id, Product.link, Product.name, Product.product_key).order_by(Product.product_id)
+    ).all()
+    products = pd.DataFrame({
+        'product_id': [row[0] for row in rows], 'link': [row[1] for row in rows], 'name': [row[2] for row in rows],
+        'product_key': pd.array([row[3] for row in rows], dtype='Int64'),  # not float: keys use all 64 bits
+    })
+    keys = pd.array(product_keys(products['link'], products['name']), dtype='Int64')
+    missing = (products['product_key'] != keys).fillna(True).to_numpy(dtype=bool)
+    if not missing.any():
+        return 0
+    products['product_key'] = keys
+    keep_ids = products.groupby('product_key')['product_id'].transform('min')
+    duplicate = (products['product_id'] != keep_ids).to_numpy()
+    pairs = list(zip(products.loc[duplicate, 'product_id'].tolist(), keep_ids[duplicate].tolist()))
+    merge_products(conn, pairs)
+    keyed = products[missing & ~duplicate]
+    stmt = update(Product).where(Product.product_id == bindparam('pid')).values(product_key=bindparam('key'))
+    rows = [{'pid': pid, 'key': key} for pid, key in
+            zip(keyed['product_id'].tolist(), keyed['product_key'].tolist())]
+    for start in range(0, len(rows), KEY_BATCH_ROWS):
+        conn.execute(stmt, rows[start:start + KEY_BATCH_ROWS])
+    if pairs:
+        backfill_latest_prices(conn)
+        rebuild_rollup(conn)
+    return len(pairs)
+
+
+def drop_retired_indexes():
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, names in RETIRED_INDEXES.items():
+            existing = {ix['name'] for ix in inspector.get_indexes(table_name)}
+            for name in names:
+                if name in existing:
+                    on_table = f' ON {table_name}' if engine.dialect.name == 'mysql' else ''
+                    conn.execute(text(f'DROP INDEX {name}{on_table}'))
+                    print(f"Dropped index {name} on {table_name}")
+
+
+def migrate_columns():
+    """Add nullable model columns missing from the live schema (ALTER TABLE ... ADD COLUMN)."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"Added column {column.name} to {table.name}")
+        # Snapshots written before last_seen_at existed were last seen when they were scraped
+        conn.execute(update(LatestPrice).where(LatestPrice.last_seen_at.is_(None))
+                     .values(last_seen_at=LatestPrice.scraped_at))
+
+
+def migrate_indexes():
+    """Create any model index missing from the live schema."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                if index.name in existing:
+                    continue
+                index.create(conn)
+                print(f"Created index {index.name} on {table.name}")
+
+
+def backfill_latest_prices(conn):
+    """Rebuild latest_price from the newest price_history row of every product. Returns rows written."""
+    latest = (
+        select(PriceHistory.product_id, func.max(PriceHistory.scraped_at).label('latest_scraped_at'))
+        .group_by(PriceHistory.product_id)
+        .subquery()
+    )
+    newest_ids = (
+        select(func.max(PriceHistory.price_id))
+        .join(latest, (PriceHistory.product_id == latest.c.product_id)
+              & (PriceHistory.scraped_at == latest.c.latest_scraped_at))
+        .group_by(PriceHistory.product_id)
+    )
+    columns = ['product_id', 'price', 'discount_pct', 'in_stock', 'rating', 'reviews', 'scraped_at']
+    conn.execute(delete(LatestPrice))
+    result = conn.execute(
+        insert(LatestPrice).from_select(
+            columns + ['last_seen_at'],
+            select(*[PriceHistory.__table__.c[c] for c in columns], PriceHistory.scraped_at)
+            .where(PriceHistory.price_id.in_(newest_ids))
+        )
+    )
+    # scraped_at is when the snapshot's values were first observed, as the loaders keep it:
+    # the first observation after the product's last one with different values
+    snapshot, changed, same = LatestPrice.__table__, PriceHistory.__table__.alias(), PriceHistory.__table__.alias()
+    last_change = select(func.max(changed.c.scraped_at)).where(
+        changed.c.product_id == snapshot.c.product_id,
+        or_(*(changed.c[c].is_distinct_from(snapshot.c[c]) for c in SNAPSHOT_VALUES)),
+    ).correlate(snapshot).scalar_subquery()
+    first_seen = select(func.min(same.c.scraped_at)).where(
+        same.c.product_id == snapshot.c.product_id,
+        or_(last_change.is_(None), same.c.scraped_at > last_change),
+    ).scalar_subquery()
+    conn.execute(update(snapshot).values(scraped_at=first_seen))
+    return result.rowcount
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create tables and, with --migrate, missing columns and indexes.")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Add columns and indexes missing from an existing database")
+    args = parser.parse_args()
     create_tables()
     print("Tables created successfully!")
+    if args.migrate:
+        migrate_columns()
+        with engine.begin() as conn:
+            print(f"Merged {backfill_product_keys(conn)} products sharing a product key")
+        drop_retired_indexes()
+        migrate_indexes()
+        print("Index migration complete!")
+        with engine.begin() as conn:
+            if conn.execute(select(func.count()).select_from(LatestPrice)).scalar() == 0:
+                print(f"Backfilled {backfill_latest_prices(conn)} latest_price rows")
+            if conn.execute(select(func.count()).select_from(PriceRollup)).scalar() == 0:
+                print(f"Backfilled {rebuild_rollup(conn)} price_rollup rows")
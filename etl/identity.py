@@ -0,0 +1,59 @@
+"""
+Product identity across scrape runs.
+
+A product is identified by a 64-bit BLAKE2b hash of the SKU that ends its Jumia link
+(`...-chinchin-40g-401725300.html`, `...-generic-mpg9952227.html`), so the same listing
+scraped under two search categories, or retitled by the seller, keeps one product_id and
+one price history. Records without a recognizable link fall back to their normalized name.
+
+BLAKE2b (hashlib) is specified and stable across Python and library versions, which a
+persisted key needs. The key is stored in products.product_key (unique index). Loads resolve it from a
+key -> product_id dict preloaded once per run (load_key_index), so matching costs a dict
+lookup per record and a query only for the keys of new products.
+"""
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from models import Product
+
+# trailing "-<letters><digits>.html", before any query string or fragment
+SKU_PATTERN = r"-([a-z]*\d+)\.html?(?:[?#].*)?$"
+
+
+def name_key(names):
+    """Dedup key for product names: NFKC, case-folded, punctuation and repeated spaces removed."""
+    return (names.str.normalize("NFKC").str.casefold()
+            .str.replace(r"[^\w]+", " ", regex=True).str.strip())
+
+
+def sku_from_link(links):
+    """Lower-cased SKU of each Jumia product link; NaN where the link has none."""
+    return pd.Series(links, dtype="str").str.extract(SKU_PATTERN, flags=re.IGNORECASE, expand=False).str.lower()
+
+
+def key_hashes(bases):
+    """int64 array of the 64-bit BLAKE2b digests of key basis strings, read as big-endian signed ints."""
+    digests = b"".join([hashlib.blake2b(basis.encode(), digest_size=8).digest() for basis in bases])
+    return np.frombuffer(digests, dtype=">i8").astype(np.int64)
+
+
+def product_keys(links, names):
+    """int64 product keys for aligned Series of links and names (SKU first, name as fallback)."""
+    basis = ("sku:" + sku_from_link(links)).reset_index(drop=True)
+    missing = basis.isna().to_numpy()
+    if missing.any():
+        names = pd.Series(names, dtype="str").reset_index(drop=True)[missing]
+        basis[missing] = "name:" + name_key(names)
+    return key_hashes(basis.fillna("name:").tolist())
+
+
+def load_key_index(session):
+    """{product_key: product_id} for every product, in one streamed query."""
+    result = session.execute(
+        select(Product.product_key, Product.product_id).where(Product.product_key.is_not(None))
+        .execution_options(yield_per=50000)
+    )
+    return {key: product_id for key, product_id in result}
@@ -1,32 +1,74 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, Text, DateTime, ForeignKey, DECIMAL, func
+from sqlalchemy import create_engine, Column, BigInteger, Integer, String, Float, Boolean, Text, Date, DateTime, ForeignKey, DECIMAL, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
-from config import DB_CONFIG
 from urllib.parse import quote_plus
 
 import os
-# print("DEBUG: MYSQL_PASSWORD from env =", os.environ.get("MYSQL_PASSWORD"))
 
-# Build the MySQL connection URL with URL-encoded password
-password = quote_plus(DB_CONFIG['password'])
-DATABASE_URL = f"mysql+pymysql://{DB_CONFIG['user']}:{password}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine)
+# SQL statement logging is off unless SQL_ECHO=1
+SQL_ECHO = os.environ.get("SQL_ECHO", "0").lower() in ("1", "true", "yes")
 Base = declarative_base()
 
+
+def database_url():
+    """DATABASE_URL (e.g. sqlite:///prices.db for local runs/benchmarks), else the MySQL URL from config.py."""
+    url = os.environ.get("DATABASE_URL")
+    if url:
+        return url
+    from config import DB_CONFIG
+    # Build the MySQL connection URL with URL-encoded password
+    password = quote_plus(DB_CONFIG['password'])
+    return f"mysql+pymysql://{DB_CONFIG['user']}:{password}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+
+
+def get_engine():
+    """The ETL's sync engine, created on first use: importing the models (as the API does)
+    neither reads config.py nor loads a database driver."""
+    global engine, SessionLocal
+    if 'engine' not in globals():
+        engine = create_engine(database_url(), echo=SQL_ECHO)
+        SessionLocal = sessionmaker(bind=engine)
+    return engine
+
+
+def __getattr__(name):
+    # `from models import engine, SessionLocal, DATABASE_URL` keeps working, lazily
+    if name in ('engine', 'SessionLocal'):
+        get_engine()
+        return globals()[name]
+    if name == 'DATABASE_URL':
+        return database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# What the ETL stores for a product scraped without a brand / category
+NO_BRAND, NO_CATEGORY = "Unknown", "unknown"
+
 class Product(Base):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Identity used by the ETL (identity.py): hash of the link's SKU, or of the normalized name
+        Index('uq_products_product_key', 'product_key', unique=True),
+        # Lookups by name; MySQL can only index a prefix of a TEXT column
+        Index('ix_products_name_brand_category', 'name', 'brand', 'category', mysql_length={'name': 255}),
+        Index('ix_products_category_brand', 'category', 'brand'),
+        Index('ix_products_brand', 'brand'),
+    )
     product_id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(Text, nullable=False)
     brand = Column(String(100))
     category = Column(String(100))
     link = Column(Text)
+    product_key = Column(BigInteger)  # set by the ETL; nullable only for migrated databases
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     price_history = relationship('PriceHistory', back_populates='product')
+    latest_price = relationship('LatestPrice', back_populates='product', uselist=False)
 
 class PriceHistory(Base):
     __tablename__ = 'price_history'
+    __table_args__ = (
+        Index('ix_price_history_product_scraped', 'product_id', 'scraped_at'),
+    )
     price_id = Column(Integer, primary_key=True, autoincrement=True)
     product_id = Column(Integer, ForeignKey('products.product_id'))
     price = Column(DECIMAL(10, 2), nullable=False)
@@ -37,6 +79,85 @@ class PriceHistory(Base):
     scraped_at = Column(DateTime, server_default=func.now())
     product = relationship('Product', back_populates='price_history')
 
+class LatestPrice(Base):
+    """Snapshot of the most recent price_history observation per product, maintained by the ETL."""
+    __tablename__ = 'latest_price'
+    __table_args__ = (
+        Index('ix_latest_price_rating_reviews', 'rating', 'reviews'),
+        Index('ix_latest_price_reviews_rating', 'reviews', 'rating'),
+    )
+    product_id = Column(Integer, ForeignKey('products.product_id'), primary_key=True)
+    price = Column(DECIMAL(10, 2), nullable=False)
+    discount_pct = Column(DECIMAL(5, 2), default=0)
+    in_stock = Column(Boolean, default=True)
+    rating = Column(Float)
+    reviews = Column(Integer, default=0)
+    scraped_at = Column(DateTime, nullable=False)  # when these values were first observed
+    last_seen_at = Column(DateTime)  # last ETL run that observed them
+    product = relationship('Product', back_populates='latest_price')
+
+# The observed values a latest_price snapshot holds; scraped_at moves only when one changes
+SNAPSHOT_VALUES = ['price', 'discount_pct', 'in_stock', 'rating', 'reviews']
+
+class PriceStats(Base):
+    """Rolling price statistics per product (EWMA mean/variance), updated by the ETL's detector."""
+    __tablename__ = 'price_stats'
+    product_id = Column(Integer, ForeignKey('products.product_id'), primary_key=True)
+    ewma_mean = Column(Float, nullable=False)
+    ewma_var = Column(Float, nullable=False, default=0)
+    observations = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)  # scraped_at of the last observation folded in
+
+ALERT_KINDS = ("price_drop", "price_spike", "discount_jump", "out_of_stock", "back_in_stock")
+
+class Alert(Base):
+    """A significant change detected while loading a scrape: price drop/spike, discount jump, stock flip."""
+    __tablename__ = 'alerts'
+    __table_args__ = (
+        Index('ix_alerts_product_alert', 'product_id', 'alert_id'),
+        Index('ix_alerts_kind_alert', 'kind', 'alert_id'),
+    )
+    alert_id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, ForeignKey('products.product_id'), nullable=False)
+    kind = Column(String(20), nullable=False)
+    old_value = Column(DECIMAL(10, 2))
+    new_value = Column(DECIMAL(10, 2))
+    change_pct = Column(Float)
+    zscore = Column(Float)  # price alerts: distance from the EWMA mean in EWMA standard deviations
+    scraped_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+class PriceRollup(Base):
+    """price_history aggregated per (category, brand, day), maintained by the ETL (rollup.py)."""
+    __tablename__ = 'price_rollup'
+    __table_args__ = (
+        Index('ix_price_rollup_brand_day', 'brand', 'day'),
+    )
+    category = Column(String(100), primary_key=True)
+    brand = Column(String(100), primary_key=True)
+    day = Column(Date, primary_key=True)
+    observations = Column(Integer, nullable=False, default=0)  # price_history rows
+    products_added = Column(Integer, nullable=False, default=0)  # products first observed that day
+    in_stock = Column(Integer, nullable=False, default=0)  # observations in stock
+    price_sum = Column(DECIMAL(20, 2), nullable=False, default=0)
+    price_min = Column(DECIMAL(10, 2))
+    price_max = Column(DECIMAL(10, 2))
+    discount_sum = Column(DECIMAL(20, 2), nullable=False, default=0)
+
+class DataVersion(Base):
+    """Single-row counter bumped by every committed ETL load; API caches are keyed on it."""
+    __tablename__ = 'data_version'
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class IngestOffset(Base):
+    """Byte offset of the last JSONL record loaded from each scrape file; committed with the data."""
+    __tablename__ = 'ingest_offsets'
+    source = Column(String(255), primary_key=True)
+    byte_offset = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
 # Create tables if they don't exist
 def create_tables():
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(get_engine())
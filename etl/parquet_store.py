@@ -0,0 +1,135 @@
+"""
+Partitioned Parquet store for price history, read by the dashboard and model training
+instead of re-parsing the CSV export.
+
+Layout (hive partitioning, written by transform.export_parquet):
+    etl/output/price_history/category=<category>/scrape_date=<YYYY-MM-DD>/part-<n>.parquet
+
+Readers prune partitions from category/date predicates, push other filters down to
+Parquet row-group statistics, decode only the requested columns and memory-map the files.
+Results come back as Arrow tables or as DataFrames (optionally Arrow-backed).
+"""
+import operator
+import os
+import shutil
+from datetime import date, datetime
+from functools import reduce
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pds
+from pyarrow import fs
+
+PARQUET_DIR = os.path.join(os.path.dirname(__file__), 'output', 'price_history')
+ROW_COLUMNS = ["price_id", "product_id", "name", "brand", "category", "price", "discount_pct",
+               "in_stock", "rating", "reviews", "scraped_at"]
+SCHEMA = pa.schema([
+    ("price_id", pa.int64()),
+    ("product_id", pa.int32()),
+    ("name", pa.string()),
+    ("brand", pa.dictionary(pa.int32(), pa.string())),
+    ("category", pa.string()),
+    ("price", pa.float64()),
+    ("discount_pct", pa.float32()),
+    ("in_stock", pa.bool_()),
+    ("rating", pa.float32()),
+    ("reviews", pa.int32()),
+    ("scraped_at", pa.timestamp("us")),
+    ("scrape_date", pa.date32()),
+])
+PARTITIONING = pds.partitioning(
+    pa.schema([("category", pa.string()), ("scrape_date", pa.date32())]), flavor="hive"
+)
+
+
+def batch_from_rows(rows):
+    """RecordBatch in SCHEMA from price_history rows ordered like ROW_COLUMNS."""
+    df = pd.DataFrame.from_records(rows, columns=ROW_COLUMNS)
+    df["price"] = df["price"].astype("float64")
+    df["discount_pct"] = df["discount_pct"].fillna(0).astype("float32")
+    df["in_stock"] = df["in_stock"].fillna(True).astype(bool)
+    df["rating"] = df["rating"].fillna(0).astype("float32")
+    df["reviews"] = df["reviews"].fillna(0).astype("int32")
+    df["scraped_at"] = pd.to_datetime(df["scraped_at"])
+    df["scrape_date"] = df["scraped_at"].dt.date
+    return pa.RecordBatch.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+
+def write_partitions(batches, path=PARQUET_DIR, replace_all=False):
+    """Write an iterable of RecordBatches into the store.
+
+    Partitions receiving rows are replaced as a whole, so re-exporting a scrape date is
+    idempotent. With replace_all the store is rebuilt from scratch.
+    """
+    if replace_all and os.path.exists(path):
+        shutil.rmtree(path)
+    counter = {"rows": 0}
+
+    def counted():
+        for batch in batches:
+            counter["rows"] += batch.num_rows
+            yield batch
+    pds.write_dataset(
+        counted(), path, schema=SCHEMA, format="parquet", partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching", basename_template="part-{i}.parquet"
+    )
+    return counter["rows"]
+
+
+def has_store(path=PARQUET_DIR):
+    return os.path.isdir(path) and any(files for _, _, files in os.walk(path))
+
+
+def open_dataset(path=PARQUET_DIR):
+    """The store as a pyarrow Dataset over memory-mapped files (nothing is read yet)."""
+    return pds.dataset(os.path.abspath(path), format="parquet", partitioning=PARTITIONING,
+                       filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def list_partitions(path=PARQUET_DIR):
+    """Sorted (category, scrape_date) pairs present in the store, from file paths alone."""
+    return sorted({
+        (keys.get("category"), keys.get("scrape_date"))
+        for keys in (pds.get_partition_keys(f.partition_expression) for f in open_dataset(path).get_fragments())
+    }, key=lambda pair: (pair[0] or "", pair[1] or date.min))
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else date.fromisoformat(str(value))
+
+
+def price_history_filter(categories=None, start_date=None, end_date=None, product_ids=None):
+    """Dataset filter expression; category and date terms prune whole partitions."""
+    terms = []
+    if categories:
+        terms.append(pds.field("category").isin(list(categories)))
+    if start_date:
+        terms.append(pds.field("scrape_date") >= _as_date(start_date))
+    if end_date:
+        terms.append(pds.field("scrape_date") <= _as_date(end_date))
+    if product_ids:
+        terms.append(pds.field("product_id").isin(list(product_ids)))
+    return reduce(operator.and_, terms) if terms else None
+
+
+def read_price_table(columns=None, categories=None, start_date=None, end_date=None, product_ids=None,
+                     path=PARQUET_DIR):
+    """Arrow table with only the requested columns and matching rows."""
+    return open_dataset(path).to_table(
+        columns=columns, filter=price_history_filter(categories, start_date, end_date, product_ids)
+    )
+
+
+def read_price_history(columns=None, categories=None, start_date=None, end_date=None, product_ids=None,
+                       path=PARQUET_DIR, arrow_dtypes=False):
+    """DataFrame view of read_price_table; arrow_dtypes keeps the columns Arrow-backed (no copy to NumPy)."""
+    table = read_price_table(columns, categories, start_date, end_date, product_ids, path)
+    return table.to_pandas(types_mapper=pd.ArrowDtype) if arrow_dtypes else table.to_pandas()
+
+
+def read_latest(columns=None, categories=None, path=PARQUET_DIR, arrow_dtypes=False):
+    """Newest observation per product (one row per product, like the CSV export)."""
+    needed = None if columns is None else list(dict.fromkeys(list(columns) + ["product_id", "scraped_at"]))
+    df = read_price_history(needed, categories, path=path, arrow_dtypes=arrow_dtypes)
+    df = df.sort_values("scraped_at").drop_duplicates("product_id", keep="last").reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
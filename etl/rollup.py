@@ -0,0 +1,152 @@
+"""
+Category/brand rollup cube: price_history aggregated per (category, brand, day).
+
+Each row holds the day's observation count, the products first observed that day, the
+in-stock observation count and the price sum/min/max and discount sum, so the API's
+category, brand and trend endpoints answer from a table whose size grows with days, not
+with price rows (averages and in-stock ratios are sums over counts).
+
+- refresh_rollup: folds the rows a load wrote (price_id above the high-water mark taken
+  before it) into the cube, in the load's transaction. Products with a product_id above
+  the mark are the load's new products
+- rebuild_rollup: recomputes the cube from the whole history (migrations, bulk imports)
+- reconcile: compares the cube with that full recomputation, key by key
+
+    python etl/rollup.py --check      # exit status 1 on any difference
+    python etl/rollup.py --rebuild
+"""
+import argparse
+import math
+import sys
+
+from sqlalchemy import DECIMAL, Date, case, delete, func, insert, literal_column, select, type_coerce
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import NO_BRAND, NO_CATEGORY, PriceHistory, PriceRollup, Product
+from batching import CHUNK_SIZE, chunks, dialect_name
+
+KEY_COLUMNS = ["category", "brand", "day"]
+SUM_COLUMNS = ["observations", "products_added", "in_stock", "price_sum", "discount_sum"]
+ROLLUP_COLUMNS = KEY_COLUMNS + SUM_COLUMNS + ["price_min", "price_max"]
+
+
+def rollup_query(first_observation):
+    """SELECT of ROLLUP_COLUMNS grouped by key; `first_observation` marks a product's first price row."""
+    # the ETL's placeholders, for products stored before it filled them in; as literals:
+    # MySQL's ONLY_FULL_GROUP_BY would not match two separately bound placeholders
+    category = func.coalesce(Product.category, literal_column(f"'{NO_CATEGORY}'"))
+    brand = func.coalesce(Product.brand, literal_column(f"'{NO_BRAND}'"))
+    day = func.date(PriceHistory.scraped_at, type_=Date)
+    return (
+        select(
+            category.label("category"), brand.label("brand"), day.label("day"),
+            func.count().label("observations"),
+            func.count(func.distinct(case((first_observation, PriceHistory.product_id)))).label("products_added"),
+            # NULL in_stock counts as in stock, as the loader reads it
+            func.sum(case((PriceHistory.in_stock.is_(False), 0), else_=1)).label("in_stock"),
+            type_coerce(func.sum(PriceHistory.price), DECIMAL(20, 2)).label("price_sum"),
+            type_coerce(func.sum(func.coalesce(PriceHistory.discount_pct, 0)), DECIMAL(20, 2)).label("discount_sum"),
+            func.min(PriceHistory.price).label("price_min"),
+            func.max(PriceHistory.price).label("price_max"),
+        )
+        .join(Product, Product.product_id == PriceHistory.product_id)
+        .group_by(category, brand, day)
+    )
+
+
+def _full_query():
+    # an uncorrelated IN: evaluated once into a lookup table (a join to it is a nested loop on SQLite)
+    first_ids = select(func.min(PriceHistory.price_id)).group_by(PriceHistory.product_id)
+    return rollup_query(PriceHistory.price_id.in_(first_ids))
+
+
+def _rollup_upsert(dialect, rows=None):
+    """Upsert that adds aggregates to existing cube rows: of the `rows` SELECT (SQLite), or of
+    the parameter rows (multi-row VALUES; MySQL's ON DUPLICATE KEY UPDATE row alias, which
+    SQLAlchemy emits for MySQL 8, cannot follow INSERT ... SELECT)."""
+    table = PriceRollup.__table__
+    if dialect == "mysql":
+        stmt = mysql_insert(table)
+        new, least, greatest = stmt.inserted, func.least, func.greatest
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(table)
+        if rows is not None:
+            stmt = stmt.from_select(ROLLUP_COLUMNS, rows)  # rows has a WHERE, as SQLite's parser needs here
+        new, least, greatest = stmt.excluded, func.min, func.max  # SQLite's 2-argument min/max
+    else:
+        raise NotImplementedError(f"price_rollup upsert not supported on {dialect}")
+    values = {c: table.c[c] + new[c] for c in SUM_COLUMNS}
+    values["price_min"] = least(table.c.price_min, new.price_min)
+    values["price_max"] = greatest(table.c.price_max, new.price_max)
+    if dialect == "mysql":
+        return stmt.on_duplicate_key_update(values)
+    return stmt.on_conflict_do_update(index_elements=[table.c[c] for c in KEY_COLUMNS], set_=values)
+
+
+def high_water_marks(conn):
+    """(newest product_id, newest price_id), taken before a load; both 0 on an empty database."""
+    return (conn.execute(select(func.coalesce(func.max(Product.product_id), 0))).scalar(),
+            conn.execute(select(func.coalesce(func.max(PriceHistory.price_id), 0))).scalar())
+
+
+def refresh_rollup(conn, marks, chunk_size=CHUNK_SIZE):
+    """Fold the price rows written since `marks` (high_water_marks) into the cube."""
+    newest_product_id, newest_price_id = marks
+    rows = rollup_query(PriceHistory.product_id > newest_product_id).where(PriceHistory.price_id > newest_price_id)
+    dialect = dialect_name(conn)
+    if dialect == "sqlite":  # in one statement, without a round trip through Python
+        conn.execute(_rollup_upsert(dialect, rows))
+        return
+    stmt = _rollup_upsert(dialect)
+    for chunk in chunks([dict(row) for row in conn.execute(rows).mappings()], chunk_size):
+        conn.execute(stmt, chunk)
+
+
+def rebuild_rollup(conn, chunk_size=CHUNK_SIZE):
+    """Recompute the whole cube from price_history. Returns cube rows written."""
+    rows = conn.execute(_full_query()).mappings().all()
+    conn.execute(delete(PriceRollup))
+    for chunk in chunks([dict(row) for row in rows], chunk_size):
+        conn.execute(insert(PriceRollup.__table__), chunk)
+    return len(rows)
+
+
+def _same(a, b):
+    if a is None or b is None:
+        return a is b
+    return math.isclose(float(a), float(b), rel_tol=1e-9, abs_tol=0.005)
+
+
+def reconcile(conn):
+    """Differences between the cube and the raw aggregate over price_history, as
+    (category, brand, day, column, cube value, raw value); empty when they agree."""
+    stored = {tuple(row[c] for c in KEY_COLUMNS): row
+              for row in conn.execute(select(PriceRollup.__table__)).mappings()}
+    raw = {tuple(row[c] for c in KEY_COLUMNS): row for row in conn.execute(_full_query()).mappings()}
+    differences = []
+    for key in sorted(stored.keys() | raw.keys(), key=str):
+        cube_row, raw_row = stored.get(key), raw.get(key)
+        for column in ROLLUP_COLUMNS[len(KEY_COLUMNS):]:
+            cube_value = cube_row[column] if cube_row else None
+            raw_value = raw_row[column] if raw_row else None
+            if not _same(cube_value, raw_value):
+                differences.append((*key, column, cube_value, raw_value))
+    return differences
+
+
+if __name__ == "__main__":
+    from models import get_engine
+    parser = argparse.ArgumentParser(description="Rebuild or check the category/brand rollup cube.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the cube from price_history")
+    parser.add_argument("--check", action="store_true", help="compare the cube with the raw aggregate")
+    args = parser.parse_args()
+    if args.rebuild:
+        with get_engine().begin() as conn:
+            print(f"Rebuilt price_rollup: {rebuild_rollup(conn)} rows")
+    if args.check or not args.rebuild:
+        with get_engine().connect() as conn:
+            differences = reconcile(conn)
+        for difference in differences[:20]:
+            print("Mismatch: category={} brand={} day={} {}: cube {} != raw {}".format(*difference))
+        print(f"{len(differences)} differences between price_rollup and price_history")
+        sys.exit(1 if differences else 0)
@@ -0,0 +1,100 @@
+"""
+Loading a JSONL scrape that holds several appended runs (transform.load_jsonl_incremental),
+on a temporary SQLite database.
+
+    python -m pytest etl/test_load_jsonl.py
+"""
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'etl'))
+sys.path.insert(0, os.path.join(ROOT, 'data_collection'))
+WORK_DIR = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'test.db')}"
+
+import pytest  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from models import Base, LatestPrice, PriceHistory, SessionLocal, get_engine  # noqa: E402
+from scrape_output import JsonlScrapeWriter  # noqa: E402
+from synthetic_data import write_scrape_jsonl  # noqa: E402
+from transform import load_jsonl_incremental  # noqa: E402
+
+
+def record(sku, price, category='phones'):
+    return {'name': f'Phone {sku}', 'brand': 'Acme', 'price': price, 'discount_pct': 0, 'rating': 4.0,
+            'reviews': 1, 'in_stock': True, 'category': category,
+            'link': f'https://www.jumia.com.ng/phone-{sku}.html'}
+
+
+@pytest.fixture
+def session():
+    Base.metadata.drop_all(get_engine())
+    Base.metadata.create_all(get_engine())
+    with SessionLocal() as session:
+        yield session
+
+
+def history(session):
+    return session.execute(select(PriceHistory.scraped_at, func.count()).group_by(PriceHistory.scraped_at)
+                           .order_by(PriceHistory.scraped_at)).all()
+
+
+@pytest.mark.parametrize('mode', ['bulk', 'rows'])
+def test_each_run_is_loaded_at_its_own_time(session, mode):
+    path = os.path.join(WORK_DIR, f'synthetic-{mode}.jsonl')
+    write_scrape_jsonl(path, n_products=50, runs=3)
+    load_jsonl_incremental(path, mode=mode, chunk_rows=40)  # runs span chunks and chunks span runs
+    rows = history(session)
+    assert [count for _, count in rows] == [50, 50, 50]
+    assert len({scraped_at.date() for scraped_at, _ in rows}) == 3
+    newest = rows[-1][0]
+    assert session.execute(select(func.count()).where(LatestPrice.last_seen_at == newest)).scalar() == 50
+
+
+def test_duplicates_are_dropped_within_a_run_only(session):
+    path = os.path.join(WORK_DIR, 'runs.jsonl')
+    with open(path, 'w'):
+        pass
+    for day, price in ((1, 100), (2, 90)):
+        with JsonlScrapeWriter(path) as writer:
+            writer.state['scraped_at'] = datetime(2025, 1, day).isoformat()
+            # the same listing under two search categories, on pages of separate chunks
+            writer.write_page('phones', 1, [record(1, price), record(2, 50)])
+            writer.write_page('gadgets', 1, [record(1, price + 1, 'gadgets')])
+    load_jsonl_incremental(path, chunk_rows=2)
+    assert history(session) == [(datetime(2025, 1, 1), 2), (datetime(2025, 1, 2), 2)]
+    prices = session.execute(select(PriceHistory.price).where(PriceHistory.product_id == 1)
+                             .order_by(PriceHistory.scraped_at)).scalars().all()
+    assert [float(p) for p in prices] == [100, 90]
+
+
+def test_records_without_a_run_stamp_load_as_one_run(session):
+    path = os.path.join(WORK_DIR, 'legacy.jsonl')
+    with open(path, 'w') as f:
+        for item in (record(1, 100), record(2, 50), record(1, 100, 'gadgets')):
+            f.write(json.dumps(item) + '\n')
+    load_jsonl_incremental(path)
+    assert [count for _, count in history(session)] == [2]
+
+
+def snapshot(session):
+    return session.execute(select(LatestPrice.product_id, LatestPrice.price, LatestPrice.scraped_at,
+                                  LatestPrice.last_seen_at).order_by(LatestPrice.product_id)).all()
+
+
+def test_changes_only_leaves_the_same_snapshot(session):
+    path = os.path.join(WORK_DIR, 'synthetic-changes.jsonl')
+    write_scrape_jsonl(path, n_products=50, runs=4)
+    load_jsonl_incremental(path, chunk_rows=40)
+    full = snapshot(session)
+    Base.metadata.drop_all(get_engine())
+    Base.metadata.create_all(get_engine())
+    load_jsonl_incremental(path, chunk_rows=40, changes_only=True)
+    assert snapshot(session) == full
+    # scraped_at is when the values were first observed, last_seen_at the newest run
+    assert len({scraped_at for _, _, scraped_at, _ in full}) > 1
+    assert len({last_seen_at for _, _, _, last_seen_at in full}) == 1
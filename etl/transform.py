@@ -1,94 +1,546 @@
 
+import argparse
+import json
 import os
+import time
+from datetime import datetime, time as dt_time
+import numpy as np
 import pandas as pd
+from sqlalchemy import and_, case, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from models import Product, PriceHistory, SessionLocal
+from models import (NO_BRAND, NO_CATEGORY, SNAPSHOT_VALUES, Product, PriceHistory, LatestPrice, DataVersion, IngestOffset,
+                    SessionLocal, engine)
+from batching import CHUNK_SIZE, chunks
+from parquet_store import PARQUET_DIR, ROW_COLUMNS, batch_from_rows, has_store, write_partitions
+from alerts import detect_alerts
+from rollup import high_water_marks, refresh_rollup
+from identity import load_key_index, product_keys
 
 """
 ETL Transform:
-- Reads raw JSON from Jumia scrape
-- Cleans and normalizes
+- Reads the Jumia scrape: JSONL incrementally (only records after the last loaded
+  byte offset, in bounded chunks) or a legacy JSON array in one go
+- Cleans and normalizes, keying every record to a product by its link's SKU (identity.py)
+- Flags significant price, discount and stock changes (alerts.py)
+- Folds each load into the per-(category, brand, day) rollup cube (rollup.py)
 - Loads to MySQL using SQLAlchemy models
+- Exports price history to the partitioned Parquet store (parquet_store.py) and the CSV
 """
 
-def main():
-    # 1. Extract: Load raw JSON data
-    raw_path = os.path.join(os.path.dirname(__file__), '..', 'data_collection', 'data', 'jumia_playwright.json')
-    if not os.path.exists(raw_path):
-        print(f"File not found: {raw_path}")
-        return
-    df = pd.read_json(raw_path)
-    print(f"Loaded {len(df)} records from {raw_path}")
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data_collection', 'data')
+RAW_JSONL_PATH = os.path.join(DATA_DIR, 'jumia_playwright.jsonl')
+RAW_PATH = os.path.join(DATA_DIR, 'jumia_playwright.json')
+CLEAN_CSV_PATH = os.path.join(os.path.dirname(__file__), 'output', 'jumia_products_clean.csv')
+INGEST_CHUNK_ROWS = 5000  # JSONL records loaded and committed per transaction
+EXPORT_BATCH_ROWS = 50000  # price_history rows per Parquet record batch
 
-    # 2. Transform: Clean and normalize data
-    df = df.drop_duplicates(subset=["name", "brand", "category"])  # Remove duplicates
-    df = df.fillna({
-        "brand": "Unknown",
-        "discount_pct": 0,
-        "rating": 0,
-        "reviews": 0,
-        "in_stock": True
+
+# Brand strings the scrape uses for "no brand"; all map to NO_BRAND
+BRAND_PLACEHOLDERS = {"", "na", "n/a", "none", "null", "nan", "unknown"}
+MAX_PRICE = 99_999_999.99  # largest value price_history.price (DECIMAL(10, 2)) can hold
+LOAD_COLUMNS = ["name", "brand", "category", "link", "price", "discount_pct", "rating", "reviews", "in_stock"]
+# the start of the scrape run a record belongs to (scrape_output.py); missing in older scrapes
+RUN_COLUMN = "scraped_at"
+
+
+def _collapse_whitespace(values):
+    return values.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def _canonical_categorical(series, canonicalize, missing):
+    """Canonicalize the distinct values of a column once and return it as a categorical."""
+    codes, uniques = pd.factorize(series)
+    canonical = canonicalize(pd.Series(uniques, dtype="object").astype(str)).to_numpy(dtype=object)
+    values = np.where(codes >= 0, canonical[np.maximum(codes, 0)], missing) if len(canonical) else \
+        np.full(len(codes), missing, dtype=object)
+    return pd.Categorical(values)
+
+
+def _canonical_brand(values):
+    values = _collapse_whitespace(values)
+    return values.where(~values.str.lower().isin(BRAND_PLACEHOLDERS), NO_BRAND)
+
+
+def _canonical_category(values):
+    return _collapse_whitespace(values).str.lower().str.replace(" ", "-", regex=False)
+
+
+def clean(df):
+    """Vectorized normalization of a scrape batch.
+
+    Canonicalizes brand/category (as categoricals), collapses whitespace in names, drops rows
+    without a usable name or price, clamps discount/rating/reviews to their valid ranges, adds
+    the product_key (identity.py), de-duplicates it within each scrape run (the records'
+    scraped_at, NaT when they have none) and stores numbers as float32/int32.
+    Price stays float64: DECIMAL(10, 2) needs more significant digits than float32 has.
+    """
+    # A JSONL chunk may consist only of records that omit some optional fields
+    df = df.reindex(columns=df.columns.union(LOAD_COLUMNS + [RUN_COLUMN], sort=False))
+    out = pd.DataFrame({
+        "name": _collapse_whitespace(df["name"].fillna("").astype(str)),
+        "brand": _canonical_categorical(df["brand"], _canonical_brand, NO_BRAND),
+        "category": _canonical_categorical(df["category"], _canonical_category, NO_CATEGORY),
+        "link": df["link"].astype(object).where(df["link"].notna(), None),
+        "price": pd.to_numeric(df["price"], errors="coerce").astype("float64"),
+        "discount_pct": pd.to_numeric(df["discount_pct"], errors="coerce").fillna(0).clip(0, 100).astype("float32"),
+        "rating": pd.to_numeric(df["rating"], errors="coerce").fillna(0).clip(0, 5).astype("float32"),
+        "reviews": pd.to_numeric(df["reviews"], errors="coerce").fillna(0).clip(lower=0).astype("int32"),
+        "in_stock": df["in_stock"].astype(object).where(df["in_stock"].notna(), True).astype(bool),
+        RUN_COLUMN: pd.to_datetime(df[RUN_COLUMN], errors="coerce", format="ISO8601"),
     })
-    # Ensure correct data types
-    df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0)
-    df["discount_pct"] = pd.to_numeric(df["discount_pct"], errors="coerce").fillna(0)
-    df["rating"] = pd.to_numeric(df["rating"], errors="coerce").fillna(0)
-    df["reviews"] = pd.to_numeric(df["reviews"], errors="coerce").fillna(0)
+    valid = (out["name"] != "") & out["price"].between(0.01, MAX_PRICE)
+    if not valid.all():
+        print(f"Dropped {int((~valid).sum())} records with an empty name or a missing/out-of-range price")
+    out = out[valid].reset_index(drop=True)
+    # the same listing can turn up under several search categories in one scrape run
+    out["product_key"] = product_keys(out["link"], out["name"])
+    out = out[~out.duplicated([RUN_COLUMN, "product_key"])]
+    return out.reset_index(drop=True)
 
-    # 3. Load: Insert into MySQL using SQLAlchemy models
-    session = SessionLocal()
+
+def load_columns(df):
+    """Plain Python column lists for the loader: categoricals decoded, float32 rounded back."""
+    keys = df["product_key"] if "product_key" in df else product_keys(df["link"], df["name"])
+    return {
+        "product_key": pd.Series(keys).astype("int64").tolist(),
+        "name": df["name"].tolist(),
+        "brand": df["brand"].astype(object).tolist(),
+        "category": df["category"].astype(object).tolist(),
+        "link": df["link"].astype(object).where(df["link"].notna(), None).tolist(),
+        "price": df["price"].astype("float64").round(2).tolist(),
+        "discount_pct": df["discount_pct"].astype("float64").round(2).tolist(),
+        "rating": df["rating"].astype("float64").round(2).tolist(),
+        "reviews": df["reviews"].astype("int64").tolist(),
+        "in_stock": df["in_stock"].astype(bool).tolist(),
+    }
+
+
+def _product_insert(dialect_name):
+    """Multi-row product INSERT that tolerates rows already present under the product key."""
+    table = Product.__table__
+    if dialect_name == 'mysql':
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update(link=stmt.inserted.link)
+    if dialect_name == 'sqlite':
+        return sqlite_insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+
+def _resolve_product_ids(session, keys, chunk_size):
+    """Map product keys to product_id with one query per chunk of keys."""
+    product_ids = {}
+    for chunk in chunks(keys, chunk_size):
+        product_ids.update(session.execute(
+            select(Product.product_key, Product.product_id).where(Product.product_key.in_(chunk))
+        ).all())
+    return product_ids
+
+
+def _latest_price_upsert(dialect_name):
+    """Multi-row latest_price upsert: insert new products, overwrite older snapshots.
+
+    scraped_at is when the snapshot's values were first observed, last_seen_at when they were
+    last observed: an observation with the same values as the snapshot only moves
+    last_seen_at, as in a --changes-only load, so both mean the same after either mode.
+    """
+    table = LatestPrice.__table__
+    if dialect_name == 'mysql':
+        stmt = mysql_insert(table)
+        new = stmt.inserted
+    elif dialect_name == 'sqlite':
+        stmt = sqlite_insert(table)
+        new = stmt.excluded
+    else:
+        raise NotImplementedError(f"latest_price upsert not supported on {dialect_name}")
+    def comparable(columns, name):  # rating is a FLOAT column: compare at the loader's precision
+        return func.round(columns[name], 2) if name == "rating" else columns[name]
+    unchanged = and_(*(comparable(table.c, c).is_not_distinct_from(comparable(new, c)) for c in SNAPSHOT_VALUES))
+    # scraped_at first: MySQL assigns left to right, so it must see the snapshot's old values
+    assignments = [("scraped_at", case((unchanged, table.c.scraped_at), else_=new.scraped_at))]
+    assignments += [(c, new[c]) for c in SNAPSHOT_VALUES + ["last_seen_at"]]
+    if dialect_name == 'mysql':
+        # Loads run in scrape order, so the incoming row is always the newest
+        return stmt.on_duplicate_key_update(assignments)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.product_id],
+        set_=dict(assignments),
+        where=new.scraped_at >= func.coalesce(table.c.last_seen_at, table.c.scraped_at)
+    )
+
+
+def upsert_latest_prices(session: Session, history, chunk_size=CHUNK_SIZE):
+    """Fold a batch of price_history rows into the latest_price snapshot table."""
+    latest = {}
+    for row in history:
+        current = latest.get(row["product_id"])
+        if current is None or row["scraped_at"] >= current["scraped_at"]:
+            latest[row["product_id"]] = row
+    stmt = _latest_price_upsert(session.bind.dialect.name)
+    rows = [dict(row, last_seen_at=row["scraped_at"]) for row in latest.values()]
+    for chunk in chunks(rows, chunk_size):
+        session.execute(stmt, chunk)
+    return len(rows)
+
+
+def _snapshot_values(price, discount_pct, in_stock, rating, reviews):
+    """Comparable form of an observation; DECIMAL columns come back as Decimal."""
+    return (
+        round(float(price), 2),
+        round(float(discount_pct or 0), 2),
+        bool(in_stock),
+        round(float(rating or 0), 2),
+        int(reviews or 0),
+    )
+
+
+def split_unchanged(session: Session, history, chunk_size=CHUNK_SIZE):
+    """Compare observations with the latest_price snapshot in batched lookups.
+
+    Returns (changed, unchanged_product_ids); products without a snapshot count as changed.
+    """
+    current = {}
+    product_ids = [row["product_id"] for row in history]
+    for chunk in chunks(product_ids, chunk_size):
+        rows = session.execute(
+            select(LatestPrice.product_id, LatestPrice.price, LatestPrice.discount_pct, LatestPrice.in_stock,
+                   LatestPrice.rating, LatestPrice.reviews)
+            .where(LatestPrice.product_id.in_(chunk))
+        )
+        for product_id, *values in rows:
+            current[product_id] = _snapshot_values(*values)
+    changed = []
+    unchanged = []
+    for row in history:
+        values = _snapshot_values(row["price"], row["discount_pct"], row["in_stock"], row["rating"], row["reviews"])
+        if current.get(row["product_id"]) == values:
+            unchanged.append(row["product_id"])
+        else:
+            changed.append(row)
+    return changed, unchanged
+
+
+def touch_latest_prices(session: Session, product_ids, seen_at, chunk_size=CHUNK_SIZE):
+    """Record that unchanged products were observed again, without writing price_history."""
+    for chunk in chunks(product_ids, chunk_size):
+        session.execute(
+            update(LatestPrice).where(LatestPrice.product_id.in_(chunk)).values(last_seen_at=seen_at)
+        )
+
+
+def bump_data_version(session: Session):
+    """Increment the data version in the load's transaction so API caches see the commit."""
+    result = session.execute(
+        update(DataVersion).where(DataVersion.id == 1).values(version=DataVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        session.execute(insert(DataVersion).values(id=1, version=1))
+    return session.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar()
+
+
+def load_bulk(session: Session, df, chunk_size=CHUNK_SIZE, scraped_at=None, changes_only=False,
+              key_index=None):
+    """Set-based load: in-memory product key lookups, multi-row product upsert, chunked price inserts.
+
+    key_index is the {product_key: product_id} dict from identity.load_key_index (loaded here
+    when not given); products created by the load are added to it, so one dict can serve every
+    chunk of a run. A product keeps the name, brand and category it was first seen with.
+
+    With changes_only, observations identical to the product's latest_price snapshot are not
+    written to price_history; only the snapshot's last_seen_at moves forward, so the history
+    stores one row per run of identical values.
+
+    Every observation (stored or not) goes through the change detector (alerts.py) first;
+    the rows written are then folded into the rollup cube (rollup.py).
+
+    Returns (products_added, prices_added).
+    """
+    scraped_at = scraped_at or datetime.now()
+    cols = load_columns(df)
+    product_ids = load_key_index(session) if key_index is None else key_index
+    marks = high_water_marks(session)
+
+    new_products = {}
+    for key, name, brand, category, link in zip(cols["product_key"], cols["name"], cols["brand"],
+                                                cols["category"], cols["link"]):
+        if key not in product_ids and key not in new_products:
+            new_products[key] = {"product_key": key, "name": name, "brand": brand, "category": category,
+                                 "link": link}
+    stmt = _product_insert(session.bind.dialect.name)
+    for chunk in chunks(list(new_products.values()), chunk_size):
+        session.execute(stmt, chunk)
+    if new_products:
+        product_ids.update(_resolve_product_ids(session, list(new_products), chunk_size))
+
+    history = [
+        {
+            "product_id": product_ids[key], "price": price, "discount_pct": discount_pct,
+            "in_stock": in_stock, "rating": rating, "reviews": reviews, "scraped_at": scraped_at
+        }
+        for key, price, discount_pct, in_stock, rating, reviews in zip(
+            cols["product_key"], cols["price"], cols["discount_pct"], cols["in_stock"], cols["rating"], cols["reviews"]
+        )
+    ]
+    alerts = detect_alerts(session, history, chunk_size)
+    if alerts:
+        print(f"Raised {alerts} price/stock alerts")
+    if changes_only:
+        history, unchanged = split_unchanged(session, history, chunk_size)
+        touch_latest_prices(session, unchanged, scraped_at, chunk_size)
+        print(f"Skipped {len(unchanged)} unchanged observations, writing {len(history)}")
+    for chunk in chunks(history, chunk_size):
+        session.execute(insert(PriceHistory.__table__), chunk)
+    upsert_latest_prices(session, history, chunk_size)
+    refresh_rollup(session, marks, chunk_size)
+    return len(new_products), len(history)
+
+
+def load_rows(session: Session, df, scraped_at=None):
+    """Row-by-row load (one lookup and flush per product). Kept for comparison with load_bulk,
+    with the same change detection, latest_price snapshot and rollup refresh."""
+    scraped_at = scraped_at or datetime.now()
     products_added = 0
     prices_added = 0
-    try:
-        for _, row in df.iterrows():
-            # Check if product already exists
-            product = session.query(Product).filter_by(
-                name=row["name"], brand=row["brand"], category=row["category"]
-            ).first()
-            if not product:
-                product = Product(
-                    name=row["name"],
-                    brand=row["brand"],
-                    category=row["category"],
-                    link=row.get("link", None)
-                )
-                session.add(product)
-                session.flush()  # Assign product_id
-                products_added += 1
-            # Add price history
-            price_hist = PriceHistory(
-                product_id=product.product_id,
-                price=row["price"],
-                discount_pct=row["discount_pct"],
-                in_stock=bool(row["in_stock"]),
-                rating=row["rating"],
-                reviews=int(row["reviews"])
+    history = []
+    cols = load_columns(df)
+    marks = high_water_marks(session)
+    for row in (dict(zip(cols, values)) for values in zip(*cols.values())):
+        # Check if product already exists
+        product = session.query(Product).filter_by(product_key=row["product_key"]).first()
+        if not product:
+            product = Product(
+                product_key=row["product_key"],
+                name=row["name"],
+                brand=row["brand"],
+                category=row["category"],
+                link=row["link"]
             )
-            session.add(price_hist)
-            prices_added += 1
-        session.commit()
-        print(f"Inserted {products_added} new products and {prices_added} price records into MySQL.")
+            session.add(product)
+            session.flush()  # Assign product_id
+            products_added += 1
+        # Add price history
+        price_hist = PriceHistory(
+            product_id=product.product_id,
+            price=row["price"],
+            discount_pct=row["discount_pct"],
+            in_stock=row["in_stock"],
+            rating=row["rating"],
+            reviews=row["reviews"],
+            scraped_at=scraped_at
+        )
+        session.add(price_hist)
+        prices_added += 1
+        history.append({
+            "product_id": product.product_id, "price": price_hist.price,
+            "discount_pct": price_hist.discount_pct, "in_stock": price_hist.in_stock,
+            "rating": price_hist.rating, "reviews": price_hist.reviews, "scraped_at": scraped_at
+        })
+    session.flush()
+    alerts = detect_alerts(session, history)
+    if alerts:
+        print(f"Raised {alerts} price/stock alerts")
+    upsert_latest_prices(session, history)
+    refresh_rollup(session, marks)
+    return products_added, prices_added
+
+
+def iter_jsonl_chunks(path, start_offset=0, max_rows=INGEST_CHUNK_ROWS):
+    """Yield (records, end_offset) for complete JSONL lines after start_offset.
+
+    A trailing line without a newline is still being written by the scraper and is left
+    for the next run.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        offset = start_offset
+        records = []
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            if line.strip():
+                records.append(json.loads(line))
+            if len(records) >= max_rows:
+                yield records, offset
+                records = []
+        if records:
+            yield records, offset
+
+
+def split_runs(df, scraped_at=None):
+    """Yield (scraped_at, rows) for each scrape run in a cleaned batch, oldest first. Records
+    without a run stamp (older scrapes) form one run at `scraped_at` (default: now)."""
+    stamps = df[RUN_COLUMN].fillna(pd.Timestamp(scraped_at or datetime.now()))
+    for stamp, rows in df.groupby(stamps, sort=True):
+        yield stamp.to_pydatetime(), rows
+
+
+def _load(session, df, mode, chunk_size, changes_only=False, key_index=None, run_keys=None):
+    """Load each scrape run in the batch at its own scraped_at. run_keys ({scraped_at: product
+    keys}) carries the newest run's keys from chunk to chunk, since a run can span chunks."""
+    products_added = prices_added = 0
+    for scraped_at, rows in split_runs(df):
+        if run_keys is not None:
+            if scraped_at not in run_keys:
+                run_keys.clear()
+            seen = run_keys.setdefault(scraped_at, set())
+            rows = rows[~rows["product_key"].isin(seen)]
+            seen.update(rows["product_key"].tolist())
+        if mode == "bulk":
+            added, prices = load_bulk(session, rows, chunk_size, scraped_at, changes_only, key_index)
+        else:
+            added, prices = load_rows(session, rows, scraped_at)
+        products_added += added
+        prices_added += prices
+    return products_added, prices_added
+
+
+def load_jsonl_incremental(path, mode="bulk", chunk_size=CHUNK_SIZE, chunk_rows=INGEST_CHUNK_ROWS,
+                           from_start=False, changes_only=False):
+    """Load only the records appended since the previous run, committing one chunk at a time.
+
+    The byte offset is stored in ingest_offsets in the same transaction as the chunk, so an
+    interrupted run resumes exactly after the last committed record.
+    """
+    source = os.path.realpath(path)
+    session = SessionLocal()
+    products_added = prices_added = 0
+    started = time.perf_counter()
+    try:
+        state = session.get(IngestOffset, source)
+        offset = 0 if from_start or state is None else state.byte_offset
+        if offset > os.path.getsize(path):
+            print(f"{path} is shorter than the stored offset {offset}; loading it from the start.")
+            offset = 0
+        # one preload per run; an error ends the run, so ids from a rolled-back chunk are never reused
+        key_index = load_key_index(session) if mode == "bulk" else None
+        run_keys = {}
+        for records, end_offset in iter_jsonl_chunks(path, offset, chunk_rows):
+            df = clean(pd.DataFrame.from_records(records))
+            added, prices = _load(session, df, mode, chunk_size, changes_only, key_index, run_keys)
+            session.merge(IngestOffset(source=source, byte_offset=end_offset))
+            version = bump_data_version(session)
+            session.commit()
+            products_added += added
+            prices_added += prices
+            print(f"Loaded {len(records)} records up to byte {end_offset} (data version {version}).")
     except Exception as e:
         print("Error during ETL:", e)
         session.rollback()
     finally:
         session.close()
+    elapsed = time.perf_counter() - started
+    rate = prices_added / elapsed if elapsed else float("inf")
+    print(f"Inserted {products_added} new products and {prices_added} price records "
+          f"in {elapsed:.2f}s ({rate:,.0f} rows/s, mode={mode}).")
 
-if __name__ == '__main__':
-    main()
 
-    # Load raw Jumia JSON
-    raw_path = os.path.join(os.path.dirname(__file__), '..', 'data_collection', 'data', 'jumia_playwright.json')
-    df = pd.read_json(raw_path)
-    print(f"Loaded {len(df)} records from Jumia JSON.")
+def load_json(path, mode="bulk", chunk_size=CHUNK_SIZE, changes_only=False):
+    """Load a whole JSON array scrape in one transaction."""
+    # 1. Extract: Load raw JSON data
+    df = pd.read_json(path)
+    print(f"Loaded {len(df)} records from {path}")
 
-    # TODO: Data cleaning (e.g., drop duplicates, fill NAs)
+    # 2. Transform: Clean and normalize data
+    df = clean(df)
 
-    # Example: Export to CSV for analysis
-    out_csv = os.path.join(os.path.dirname(__file__), 'output', 'jumia_products_clean.csv')
+    # 3. Load: Insert into the database using SQLAlchemy models
+    session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        products_added, prices_added = _load(session, df, mode, chunk_size, changes_only)
+        version = bump_data_version(session)
+        session.commit()
+        elapsed = time.perf_counter() - started
+        rate = prices_added / elapsed if elapsed else float("inf")
+        print(f"Inserted {products_added} new products and {prices_added} price records "
+              f"in {elapsed:.2f}s ({rate:,.0f} rows/s, mode={mode}). Data version is now {version}.")
+    except Exception as e:
+        print("Error during ETL:", e)
+        session.rollback()
+    finally:
+        session.close()
+
+
+def export_csv(raw_path, out_csv=CLEAN_CSV_PATH, chunk_rows=INGEST_CHUNK_ROWS):
+    """Export the raw scrape to CSV for analysis (dashboard, ML), streaming JSONL in chunks."""
     os.makedirs(os.path.dirname(out_csv), exist_ok=True)
-    df.to_csv(out_csv, index=False)
-    print(f"Clean data exported to {out_csv}")
+    if raw_path.endswith('.jsonl'):
+        rows = 0
+        with open(out_csv, 'w', encoding='utf-8', newline='') as f:
+            for i, (records, _) in enumerate(iter_jsonl_chunks(raw_path, 0, chunk_rows)):
+                pd.DataFrame.from_records(records).to_csv(f, index=False, header=(i == 0))
+                rows += len(records)
+    else:
+        df = pd.read_json(raw_path)
+        df.to_csv(out_csv, index=False)
+        rows = len(df)
+    print(f"Clean data exported to {out_csv} ({rows} rows)")
+
+
+def export_parquet(since=None, path=PARQUET_DIR, batch_rows=EXPORT_BATCH_ROWS):
+    """Export price_history with product attributes to the partitioned Parquet store.
+
+    With `since` (a date) only the scrape-date partitions from that day on are rewritten;
+    otherwise the store is rebuilt. Rows are streamed from the database in batches.
+    """
+    columns = {**PriceHistory.__table__.c, **{c: Product.__table__.c[c] for c in ("name", "brand", "category")}}
+    query = (
+        select(*[columns[c] for c in ROW_COLUMNS])
+        .join(Product, Product.product_id == PriceHistory.product_id)
+        .order_by(PriceHistory.price_id)
+    )
+    if since:
+        query = query.where(PriceHistory.scraped_at >= datetime.combine(since, dt_time.min))
+    started = time.perf_counter()
+
+    def batches():
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_rows).execute(query)
+            for rows in result.partitions():
+                yield batch_from_rows(rows)
+    rows = write_partitions(batches(), path, replace_all=since is None)
+    scope = f"scrape dates from {since}" if since else "full rebuild"
+    print(f"Exported {rows} price history rows to {path} ({scope}) in {time.perf_counter() - started:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the Jumia scrape into the database.")
+    parser.add_argument("--input", default=RAW_JSONL_PATH if os.path.exists(RAW_JSONL_PATH) else RAW_PATH,
+                        help="Scrape to load: .jsonl (incremental) or a JSON array")
+    parser.add_argument("--mode", choices=["bulk", "rows"], default="bulk",
+                        help="bulk: set-based upserts (default); rows: legacy per-row inserts")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunk-rows", type=int, default=INGEST_CHUNK_ROWS,
+                        help="JSONL records per committed chunk")
+    parser.add_argument("--from-start", action="store_true",
+                        help="ignore the stored JSONL offset and reload the whole file")
+    parser.add_argument("--changes-only", action="store_true",
+                        help="bulk mode: skip observations identical to the product's latest snapshot")
+    parser.add_argument("--no-export", action="store_true", help="skip the Parquet and CSV exports")
+    parser.add_argument("--export-only", action="store_true", help="skip loading, only run the exports")
+    parser.add_argument("--full-export", action="store_true",
+                        help="rebuild the whole Parquet store instead of the partitions of today's scrape")
+    args = parser.parse_args(argv)
+    if args.changes_only and args.mode != "bulk":
+        parser.error("--changes-only requires --mode bulk")
+
+    raw_path = args.input
+    if not os.path.exists(raw_path):
+        print(f"File not found: {raw_path}")
+        return
+    run_date = datetime.now().date()
+    if not args.export_only:
+        if raw_path.endswith('.jsonl'):
+            load_jsonl_incremental(raw_path, args.mode, args.chunk_size, args.chunk_rows, args.from_start,
+                                   args.changes_only)
+        else:
+            load_json(raw_path, args.mode, args.chunk_size, args.changes_only)
+    if not args.no_export:
+        export_parquet(since=None if args.full_export or not has_store() else run_date)
+        export_csv(raw_path)
+
 
 if __name__ == '__main__':
     main()
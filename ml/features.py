@@ -0,0 +1,77 @@
+"""
+Feature pipeline for the price model, built from price_history.
+
+Each row is one observation of a product; its features describe the product at that point
+(recent prices, discount history, rating/review movement, category) and its target is the
+price at the product's next observation. Everything is computed with vectorized
+groupby/shift/rolling operations over rows sorted by (product_id, scraped_at).
+"""
+import numpy as np
+import pandas as pd
+
+HISTORY_COLUMNS = ["product_id", "category", "price", "discount_pct", "in_stock", "rating", "reviews", "scraped_at"]
+LAGS = (1, 2, 3)
+ROLLING_WINDOW = 7  # observations per product for the discount statistics
+FEATURE_COLUMNS = (
+    ["price"] + [f"price_lag_{k}" for k in LAGS] + ["price_change_1"]
+    + ["discount_pct", "discount_mean", "discount_std", "discount_max"]
+    + ["in_stock", "rating", "rating_delta", "reviews", "reviews_delta", "days_since_prev", "category_code"]
+)
+
+
+def build_features(history, categories=None):
+    """Features (float32) for every observation, plus the next_price / next_scraped_at target.
+
+    `categories` fixes the category code mapping (a trained model's); unknown categories get -1.
+    By default the sorted categories in `history` are used.
+    """
+    df = history[HISTORY_COLUMNS].sort_values(["product_id", "scraped_at"], kind="stable").reset_index(drop=True)
+    df["scraped_at"] = pd.to_datetime(df["scraped_at"])
+    # float64 throughout (database rows may carry Decimal prices and None flags)
+    numeric = ["price", "discount_pct", "in_stock", "rating", "reviews"]
+    df[numeric] = df[numeric].astype("float64")
+    if categories is None:
+        categories = sorted(df["category"].dropna().unique())
+    by_product = df.groupby("product_id", sort=False)
+    price = df["price"]
+
+    out = pd.DataFrame({"product_id": df["product_id"].to_numpy(), "scraped_at": df["scraped_at"].to_numpy()})
+    out["price"] = price
+    for k in LAGS:
+        # no earlier observation yet: assume the price was flat
+        out[f"price_lag_{k}"] = by_product["price"].shift(k).fillna(price)
+    out["price_change_1"] = price / out["price_lag_1"].replace(0, np.nan) - 1
+
+    out["discount_pct"] = df["discount_pct"]
+    rolling = by_product["discount_pct"].rolling(ROLLING_WINDOW, min_periods=1)
+    out["discount_mean"] = rolling.mean().reset_index(level=0, drop=True)
+    out["discount_std"] = rolling.std().reset_index(level=0, drop=True)
+    out["discount_max"] = rolling.max().reset_index(level=0, drop=True)
+
+    out["in_stock"] = df["in_stock"]
+    out["rating"] = df["rating"]
+    out["rating_delta"] = out["rating"] - by_product["rating"].shift(1)
+    out["reviews"] = df["reviews"]
+    out["reviews_delta"] = out["reviews"] - by_product["reviews"].shift(1)
+    out["days_since_prev"] = by_product["scraped_at"].diff().dt.total_seconds() / 86400
+    out["category_code"] = pd.Categorical(df["category"], categories=categories).codes
+
+    out[FEATURE_COLUMNS] = out[FEATURE_COLUMNS].fillna(0).astype("float32")
+    out["next_price"] = by_product["price"].shift(-1)
+    out["next_scraped_at"] = by_product["scraped_at"].shift(-1)
+    return out
+
+
+def training_examples(features, since=None):
+    """(X, y, newest target time) for observations whose next price is known, optionally only
+    those whose target was observed after `since`."""
+    rows = features[features["next_price"].notna()]
+    if since is not None:
+        rows = rows[rows["next_scraped_at"] > since]
+    return (rows[FEATURE_COLUMNS].to_numpy(np.float32), rows["next_price"].to_numpy(np.float64),
+            rows["next_scraped_at"].max() if len(rows) else None)
+
+
+def latest_features(features):
+    """Each product's newest observation: the input for predicting its next price."""
+    return features.drop_duplicates("product_id", keep="last").reset_index(drop=True)
@@ -1,23 +1,110 @@
 """
-ML Model Placeholder
-- Load cleaned data
-- Train price prediction or discount forecasting model
+Next-price model trained on price_history features (ml/features.py).
+
+- Full fits use every core (RandomForestRegressor, n_jobs=-1).
+- Incremental refits add trees fitted only on examples whose target was observed after
+  the previous fit (warm_start), keeping the newest MAX_TREES trees.
+- Models are saved uncompressed with joblib, so joblib.load(mmap_mode='r') maps their
+  arrays from the file instead of copying them into each process.
+
+    python ml/model.py            # full fit
+    python ml/model.py --refit    # add trees for data loaded since the last fit
+
+The model is saved to MODEL_PATH (default ml/artifacts/price_model.joblib).
 """
 from sklearn.ensemble import RandomForestRegressor
-import pandas as pd
+from datetime import timedelta
+import argparse
+import joblib
 import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'etl'))
+sys.path.insert(0, os.path.dirname(__file__))
+from parquet_store import has_store, read_price_history  # noqa: E402
+from features import FEATURE_COLUMNS, HISTORY_COLUMNS, build_features, training_examples  # noqa: E402
+
+# the API (api/predict.py) loads the model from the same MODEL_PATH setting
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(os.path.dirname(__file__), 'artifacts', 'price_model.joblib'))
+N_ESTIMATORS = 100  # trees in a full fit
+REFIT_TREES = 20  # trees added by each incremental refit
+MAX_TREES = 300  # older trees are dropped beyond this
+MAX_DEPTH = 16  # bounds per-row predict cost and model size (the API predicts online)
+LOOKBACK_DAYS = 30  # history read before the last fit's cut-off so lags and rolling windows are complete
+
+
+def load_history(start_date=None, categories=None):
+    """price_history rows from the Parquet store, reading only the feature columns."""
+    if not has_store():
+        raise FileNotFoundError("No Parquet price history found. Please run the ETL transform first.")
+    return read_price_history(HISTORY_COLUMNS, categories=categories, start_date=start_date)
+
+
+def save_model(bundle, path=MODEL_PATH):
+    """Write atomically and uncompressed (compressed files cannot be memory-mapped)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, path)
 
-def train_model():
-    # Load data
-    data_path = os.path.join(os.path.dirname(__file__), '..', 'etl', 'output', 'jumia_products_clean.csv')
-    df = pd.read_csv(data_path)
-    # TODO: Feature engineering
-    X = df[['price']].fillna(0).values  # placeholder features
-    y = df['price'].values
-    model = RandomForestRegressor()
+
+def load_model(path=MODEL_PATH, mmap=True):
+    return joblib.load(path, mmap_mode='r' if mmap else None)
+
+
+def train_model(history=None, n_estimators=N_ESTIMATORS, n_jobs=-1, path=MODEL_PATH, save=True):
+    """Fit from scratch on the whole history. Returns the model bundle."""
+    history = load_history() if history is None else history
+    categories = sorted(history["category"].dropna().unique())
+    X, y, trained_until = training_examples(build_features(history, categories))
+    model = RandomForestRegressor(n_estimators=n_estimators, n_jobs=n_jobs, warm_start=True,
+                                  max_depth=MAX_DEPTH, min_samples_leaf=5, random_state=42)
     model.fit(X, y)
-    print("Model trained on price data. Placeholder only.")
-    return model
+    bundle = {"model": model, "features": FEATURE_COLUMNS, "categories": categories,
+              "trained_until": trained_until, "n_rows": len(y)}
+    print(f"Model trained on {len(y)} examples ({model.n_estimators} trees).")
+    if save:
+        save_model(bundle, path)
+    return bundle
+
+
+def refit_model(bundle=None, history=None, n_trees=REFIT_TREES, path=MODEL_PATH, save=True):
+    """Add n_trees fitted only on examples observed after the bundle's trained_until."""
+    bundle = load_model(path, mmap=False) if bundle is None else bundle
+    since = bundle["trained_until"]
+    if history is None:
+        history = load_history(start_date=since - timedelta(days=LOOKBACK_DAYS))
+    X, y, trained_until = training_examples(build_features(history, bundle["categories"]), since)
+    if not len(y):
+        print("No new training examples since", since)
+        return bundle
+    model = bundle["model"]
+    model.n_estimators = len(model.estimators_) + n_trees
+    model.fit(X, y)  # warm_start: only the new trees are fitted, on the new examples
+    if len(model.estimators_) > MAX_TREES:
+        model.estimators_ = model.estimators_[-MAX_TREES:]
+        model.n_estimators = MAX_TREES
+    bundle.update(trained_until=trained_until, n_rows=bundle["n_rows"] + len(y))
+    print(f"Model refitted on {len(y)} new examples ({len(model.estimators_)} trees).")
+    if save:
+        save_model(bundle, path)
+    return bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the next-price model from price history.")
+    parser.add_argument("--refit", action="store_true", help="add trees for new data instead of a full fit")
+    parser.add_argument("--trees", type=int, help="trees in a full fit, or added by --refit")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    if args.refit and os.path.exists(MODEL_PATH):
+        refit_model(n_trees=args.trees or REFIT_TREES)
+    else:
+        train_model(n_estimators=args.trees or N_ESTIMATORS, n_jobs=args.n_jobs)
+    print(f"Saved to {MODEL_PATH} in {time.perf_counter() - started:.1f}s")
+
 
 if __name__ == '__main__':
-    train_model()
+    main()